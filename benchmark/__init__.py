@@ -0,0 +1,6 @@
+"""
+Offline benchmarks for youcreep.
+
+The benchmarks run against synthetic YouTube pages generated by `benchmark.fixtures`, so they need neither network
+access nor a browser. Run a benchmark as a module from the repository root, e.g. `python -m benchmark.bench_parsers`.
+"""
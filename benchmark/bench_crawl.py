@@ -0,0 +1,85 @@
+"""
+End-to-end crawl throughput benchmark against the local stand-in site(`benchmark.mock_site`).
+
+It runs `YoutubeCommentCrawler` and `YoutubeVideoInfoCrawler` repeatedly and reports pages per minute and scroll-loop
+efficiency(cards loaded per scroll step). A Chromium for playwright is required(`playwright install chromium`).
+
+Usage:
+
+    python -m benchmark.bench_crawl --n-videos 5 --n-comments 300 --latency 0.05
+"""
+import time
+import asyncio
+import tempfile
+import argparse
+
+from benchmark.mock_site import MockYoutubeSite
+from youcreep.crawler import YoutubeCommentCrawler, YoutubeVideoInfoCrawler
+
+
+def _sum_metric(metric_dict: dict, name: str, field: str = None) -> float:
+    values = [value for (metric_name, _), value in metric_dict.items() if metric_name == name]
+    return sum(value[field] if field is not None else value for value in values)
+
+
+def _report(name: str, n_pages: int, seconds: float, metrics) -> dict:
+    n_steps = _sum_metric(metrics.counters, "scroll_steps")
+    n_loaded = _sum_metric(metrics.counters, "comments_loaded")
+    result = {
+        "case": name,
+        "pages": n_pages,
+        "seconds": seconds,
+        "pages_per_minute": n_pages / seconds * 60,
+        "scroll_steps": n_steps,
+        "scroll_seconds": _sum_metric(metrics.timers, "scroll_load", "sum"),
+        "comments_per_step": n_loaded / n_steps if n_steps else None,
+    }
+    print(result, flush=True)
+    return result
+
+
+async def bench_comment_crawler(site: MockYoutubeSite, n_videos: int, n_target: int, save_dir: str, headless: bool) -> dict:
+    crawler = await YoutubeCommentCrawler.instantiate(headless=headless)
+    crawler.browser_agent.home_url = site.url
+    async with crawler:
+        start = time.perf_counter()
+        for i in range(n_videos):
+            await crawler.crawl(video_url=site.video_url(f"video{i:06d}"), save_dir=save_dir, n_target=n_target)
+        seconds = time.perf_counter() - start
+    return _report("YoutubeCommentCrawler", n_videos, seconds, crawler.metrics)
+
+
+async def bench_video_info_crawler(site: MockYoutubeSite, n_searches: int, n_target: int, save_dir: str, headless: bool) -> dict:
+    crawler = await YoutubeVideoInfoCrawler.instantiate(headless=headless)
+    crawler.browser_agent.home_url = site.url
+    async with crawler:
+        start = time.perf_counter()
+        for i in range(n_searches):
+            await crawler.crawl(search_term=f"term {i}", n_target=n_target, save_dir=save_dir, filter_options={})
+        seconds = time.perf_counter() - start
+    return _report("YoutubeVideoInfoCrawler", n_searches, seconds, crawler.metrics)
+
+
+async def run(args) -> list:
+    with MockYoutubeSite(latency=args.latency, jitter=args.jitter, n_comments=args.n_comments,
+                         n_search_results=args.n_search_results) as site, tempfile.TemporaryDirectory() as save_dir:
+        return [
+            await bench_comment_crawler(site, args.n_videos, args.n_comments, save_dir, headless=not args.headful),
+            await bench_video_info_crawler(site, args.n_searches, args.n_search_results, save_dir, headless=not args.headful),
+        ]
+
+
+def main():
+    arg_parser = argparse.ArgumentParser(description="Benchmark youcreep crawlers against a local stand-in site.")
+    arg_parser.add_argument("--n-videos", type=int, default=3)
+    arg_parser.add_argument("--n-searches", type=int, default=3)
+    arg_parser.add_argument("--n-comments", type=int, default=300)
+    arg_parser.add_argument("--n-search-results", type=int, default=200)
+    arg_parser.add_argument("--latency", type=float, default=0.05)
+    arg_parser.add_argument("--jitter", type=float, default=0.)
+    arg_parser.add_argument("--headful", action="store_true")
+    asyncio.run(run(arg_parser.parse_args()))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,99 @@
+"""
+Import-time regression benchmark, each module is imported in a fresh interpreter.
+
+Lightweight entry points(parsers, url parser, selectors, metrics) must not pull in the heavy dependencies(Playwright,
+wrightyrion, pandas). The benchmark exits with a non-zero code when one of them does, or when `--budget-ms` is exceeded.
+
+Usage:
+
+    python -m benchmark.bench_import --repeat 5 --budget-ms 300
+"""
+import sys
+import json
+import argparse
+import statistics
+import subprocess
+from typing import List, Dict
+
+heavy_modules = ["playwright", "wrightyrion", "pandas", "numpy"]
+"""modules which only the browser or DataFrame features need"""
+
+light_entry_points = [
+    "youcreep.page_parser",
+    "youcreep.page_parser.video_page_parser",
+    "youcreep.page_parser.search_page_parser",
+    "youcreep.page_parser.channel_page_parser",
+    "youcreep.browser_agent.url_parser",
+    "youcreep.common",
+    "youcreep.common.pojo",
+    "youcreep.common.metrics",
+]
+"""entry points which must stay free of `heavy_modules`"""
+
+heavy_entry_points = [
+    "youcreep.browser_agent.agent",
+    "youcreep.crawler",
+]
+"""entry points which load the heavy dependencies, measured for reference"""
+
+_probe_code = """
+import sys, time, json
+start = time.perf_counter()
+import {module}
+seconds = time.perf_counter() - start
+print(json.dumps({{"seconds": seconds, "heavy": [m for m in {heavy!r} if m in sys.modules]}}))
+"""
+
+
+def measure_import(module: str, repeat: int = 3) -> Dict:
+    """
+    Import `module` in `repeat` fresh interpreters.
+
+    :param module: (str) the module to import
+    :param repeat: (int) the number of interpreters
+    :return: (dict) {'module': str, 'median_ms': float, 'min_ms': float, 'heavy': List[str]}
+    """
+    timings, heavy = [], []
+    for _ in range(repeat):
+        output = subprocess.run([sys.executable, "-c", _probe_code.format(module=module, heavy=heavy_modules)],
+                                check=True, capture_output=True, text=True).stdout
+        result = json.loads(output.strip().splitlines()[-1])
+        timings.append(result["seconds"] * 1000)
+        heavy = result["heavy"]
+    return {"module": module, "median_ms": statistics.median(timings), "min_ms": min(timings), "heavy": heavy}
+
+
+def run(repeat: int, budget_ms: float = None) -> List[str]:
+    """
+    Measure all entry points and check the regressions.
+
+    :param repeat: (int) the number of interpreters per entry point
+    :param budget_ms: (float) the maximum median import time of light entry points, None for no limit
+    :return: (List[str]) the regressions, empty when everything is fine
+    """
+    regressions = []
+    for module in light_entry_points + heavy_entry_points:
+        result = measure_import(module, repeat=repeat)
+        print(f"{module:<45} median={result['median_ms']:>8.1f}ms min={result['min_ms']:>8.1f}ms heavy={','.join(result['heavy']) or '-'}", flush=True)
+        if module not in light_entry_points:
+            continue
+        if result["heavy"]:
+            regressions.append(f"{module} imports {', '.join(result['heavy'])}")
+        if budget_ms is not None and result["median_ms"] > budget_ms:
+            regressions.append(f"{module} takes {result['median_ms']:.1f}ms to import, budget: {budget_ms}ms")
+    return regressions
+
+
+def main():
+    arg_parser = argparse.ArgumentParser(description="Benchmark youcreep import time.")
+    arg_parser.add_argument("--repeat", type=int, default=3)
+    arg_parser.add_argument("--budget-ms", type=float, default=None, help="maximum median import time of light entry points")
+    args = arg_parser.parse_args()
+    regressions = run(args.repeat, args.budget_ms)
+    for regression in regressions:
+        print(f"REGRESSION: {regression}")
+    sys.exit(1 if regressions else 0)
+
+
+if __name__ == "__main__":
+    main()
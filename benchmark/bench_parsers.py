@@ -0,0 +1,128 @@
+"""
+Parser benchmarks over synthetic fixture pages, reporting wall time and peak Python memory(tracemalloc).
+
+Usage:
+
+    python -m benchmark.bench_parsers --sizes 100 1000 10000 100000
+"""
+import time
+import tempfile
+import pathlib
+import argparse
+import tracemalloc
+from typing import Callable, List, Tuple
+
+import pandas as pd
+
+from benchmark.fixtures import write_fixture
+from youcreep.browser_agent.url_parser import YoutubeUrlParser
+from youcreep.page_parser.video_page_parser import VideoPageParser
+from youcreep.page_parser.search_page_parser import SearchPageParser
+from youcreep.page_parser.channel_page_parser import ChannelPageParser
+from youcreep.common.comment_thread import CommentThreadIndex
+from youcreep.page_parser.frame import records_to_frame
+
+
+def measure(func: Callable, repeat: int = 1) -> Tuple[float, int]:
+    """
+    Measure the best wall time and the peak traced memory of `func`.
+
+    The wall time is measured without tracing, since tracemalloc slows down allocation-heavy code by several times. The
+    peak memory is measured in one extra traced run.
+
+    :param func: (Callable) the function to measure, called without arguments
+    :param repeat: (int) the number of timed runs, the best wall time is reported
+    :return: (float, int) the best wall time in seconds and the peak memory in bytes
+    """
+    best_time = float("inf")
+    for _ in range(repeat):
+        start = time.perf_counter()
+        func()
+        best_time = min(best_time, time.perf_counter() - start)
+    tracemalloc.start()
+    func()
+    peak = tracemalloc.get_traced_memory()[1]
+    tracemalloc.stop()
+    return best_time, peak
+
+
+def bench_parse_comments(file_path: pathlib.Path, use_pandas: bool = False):
+    parser = VideoPageParser()
+    parser.load_webpage(file_path)
+    return parser.parse_comments(use_pandas=use_pandas)
+
+
+def bench_parse_videos(file_path: pathlib.Path, use_pandas: bool = False):
+    parser = SearchPageParser()
+    parser.load_webpage(file_path)
+    return parser.parse_videos(use_pandas=use_pandas)
+
+
+def bench_parse_channel_videos(file_path: pathlib.Path, use_pandas: bool = False):
+    parser = ChannelPageParser()
+    parser.load_webpage(file_path)
+    return parser.parse_videos(use_pandas=use_pandas)
+
+
+def bench_parse_url(urls: List[str]):
+    return [YoutubeUrlParser.parse_url(url) for url in urls]
+
+
+def bench_to_pandas(records: list):
+    return pd.DataFrame([record.to_dict() for record in records])
+
+
+def run(sizes: List[int], repeat: int, fixture_dir: pathlib.Path) -> List[dict]:
+    """
+    Run all parser benchmarks.
+
+    :param sizes: (List[int]) the fixture sizes(number of comments / videos)
+    :param repeat: (int) the number of runs of each benchmark
+    :param fixture_dir: (pathlib.Path) the directory to write fixtures
+    :return: (List[dict]) the results
+    """
+    results = []
+    for size in sizes:
+        watch_path = write_fixture("watch", size, fixture_dir)
+        search_path = write_fixture("search", size, fixture_dir)
+        channel_path = write_fixture("channel", size, fixture_dir)
+        comments = bench_parse_comments(watch_path)
+        videos = bench_parse_videos(search_path)
+        urls = [f"/watch?v={comment.video_id}&lc={comment.comment_id}" for comment in comments]
+        cases = {
+            "VideoPageParser.parse_comments": lambda: bench_parse_comments(watch_path),
+            "SearchPageParser.parse_videos": lambda: bench_parse_videos(search_path),
+            "ChannelPageParser.parse_videos": lambda: bench_parse_channel_videos(channel_path),
+            "YoutubeUrlParser.parse_url": lambda: bench_parse_url(urls),
+            "CommentThreadIndex build + top_threads": lambda: CommentThreadIndex(comments).top_threads(10),
+            "comments to pandas.DataFrame": lambda: bench_to_pandas(comments),
+            "videos to pandas.DataFrame": lambda: bench_to_pandas(videos),
+            "comments to compact DataFrame": lambda: records_to_frame(comments, VideoPageParser.record_cls),
+            "videos to compact DataFrame": lambda: records_to_frame(videos, SearchPageParser.record_cls),
+        }
+        for name, func in cases.items():
+            seconds, peak = measure(func, repeat=repeat)
+            results.append({"case": name, "size": size, "seconds": seconds, "peak_mb": peak / 2 ** 20})
+            print(format_result(results[-1]), flush=True)
+    return results
+
+
+def format_result(result: dict) -> str:
+    return f"{result['case']:<48} size={result['size']:<8} time={result['seconds']:>9.4f}s peak={result['peak_mb']:>9.2f}MB"
+
+
+def main():
+    arg_parser = argparse.ArgumentParser(description="Benchmark youcreep parsers on synthetic pages.")
+    arg_parser.add_argument("--sizes", type=int, nargs="+", default=[100, 1000, 10000])
+    arg_parser.add_argument("--repeat", type=int, default=1)
+    arg_parser.add_argument("--fixture-dir", default=None, help="where to write fixtures, default is a temp dir")
+    args = arg_parser.parse_args()
+    if args.fixture_dir is not None:
+        run(args.sizes, args.repeat, pathlib.Path(args.fixture_dir))
+    else:
+        with tempfile.TemporaryDirectory() as fixture_dir:
+            run(args.sizes, args.repeat, pathlib.Path(fixture_dir))
+
+
+if __name__ == "__main__":
+    main()
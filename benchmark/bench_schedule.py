@@ -0,0 +1,62 @@
+"""
+Makespan of a comment crawling batch scheduled in enqueue order(FIFO) vs longest-first(LPT), by simulation.
+
+The comment counts of a batch are heavy-tailed(log-normal): most videos have tens of comments, a few have hundreds of
+thousands. The cost of a job is taken as proportional to its comment count.
+
+Usage:
+
+    python -m benchmark.bench_schedule --n-jobs 500 --n-workers 8 --repeat 20
+"""
+import random
+import argparse
+import statistics
+from typing import List
+
+from youcreep.crawler.job_scheduler import simulate_makespan
+
+
+def generate_comment_counts(n_jobs: int, seed: int = 0, mu: float = 5., sigma: float = 2.) -> List[int]:
+    """
+    Generate the comment counts of a batch.
+
+    :param n_jobs: (int) the number of videos
+    :param seed: (int) the random seed
+    :param mu: (float) the mean of the log of the comment count
+    :param sigma: (float) the standard deviation of the log of the comment count
+    :return: (List[int]) the comment counts
+    """
+    rng = random.Random(seed)
+    return [int(rng.lognormvariate(mu, sigma)) for _ in range(n_jobs)]
+
+
+def run(n_jobs: int, n_workers: int, repeat: int) -> dict:
+    """
+    Simulate `repeat` batches.
+
+    :param n_jobs: (int) the number of jobs of each batch
+    :param n_workers: (int) the number of workers
+    :param repeat: (int) the number of batches
+    :return: (dict) the median ratio of the makespan to the lower bound(total cost / n_workers, or the largest job)
+    """
+    fifo_ratios, lpt_ratios = [], []
+    for seed in range(repeat):
+        costs = generate_comment_counts(n_jobs, seed=seed)
+        lower_bound = max(sum(costs) / n_workers, max(costs))
+        fifo_ratios.append(simulate_makespan(costs, n_workers, longest_first=False)[0] / lower_bound)
+        lpt_ratios.append(simulate_makespan(costs, n_workers, longest_first=True)[0] / lower_bound)
+    return {"fifo": statistics.median(fifo_ratios), "lpt": statistics.median(lpt_ratios)}
+
+
+def main():
+    arg_parser = argparse.ArgumentParser(description="Simulate the makespan of FIFO and LPT scheduling.")
+    arg_parser.add_argument("--n-jobs", type=int, default=500)
+    arg_parser.add_argument("--n-workers", type=int, default=8)
+    arg_parser.add_argument("--repeat", type=int, default=20)
+    args = arg_parser.parse_args()
+    result = run(args.n_jobs, args.n_workers, args.repeat)
+    print(f"makespan / lower bound, median of {args.repeat} batches: FIFO={result['fifo']:.3f} LPT={result['lpt']:.3f}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,347 @@
+"""
+Synthetic YouTube page generator.
+
+The generated watch and search pages have the same card structure as the real pages, as far as the parsers and the
+page handlers are concerned(`ytd-comment-renderer`, `ytd-video-renderer`, `#header-author`, `#vote-count-left`, ...),
+so that they can be parsed by `VideoPageParser` and `SearchPageParser`.
+
+Usage:
+
+    python -m benchmark.fixtures --kind watch --sizes 100 1000 10000 --out-dir ./fixtures
+"""
+import random
+import string
+import pathlib
+import argparse
+from html import escape
+from typing import Union, List
+
+_id_chars = string.ascii_letters + string.digits + "-_"
+_words = ["great", "video", "thanks", "youtube", "python", "crawler", "awesome", "learned", "lot", "music", "like",
+          "comment", "first", "again", "watching", "2023", "best", "part", "lol", "wow", "真的", "太好了", "学到了"]
+_times = ["1分钟前", "3小时前", "2天前", "1周前", "3周前", "2个月前", "1年前", "5年前"]
+_durations = ["1分钟", "5分钟", "12分钟", "1小时3分钟"]
+
+_page_head = ("<!DOCTYPE html><html><head><meta charset=\"utf-8\"><title>{title} - YouTube</title></head><body>"
+              "<ytd-app><div id=\"masthead\"><input id=\"search\"></div>")
+_page_tail = "</ytd-app></body></html>"
+
+
+def random_id(rng: random.Random, length: int) -> str:
+    return "".join(rng.choice(_id_chars) for _ in range(length))
+
+
+def random_text(rng: random.Random, n_min: int = 3, n_max: int = 30) -> str:
+    return " ".join(rng.choice(_words) for _ in range(rng.randint(n_min, n_max)))
+
+
+def comment_card_html(video_id: str, comment_id: str, author: str, text: str, like_count: int, publish_time: str,
+                      parent_comment_id: str = None) -> str:
+    """
+    Generate a `ytd-comment-renderer` card.
+
+    :param video_id: (str) the video id
+    :param comment_id: (str) the comment id
+    :param author: (str) the author handle, without "@"
+    :param text: (str) the comment text
+    :param like_count: (int) the like count, 0 is rendered as an empty string like YouTube does
+    :param publish_time: (str) the publish time text
+    :param parent_comment_id: (str) the parent comment id, None for a head comment
+    :return: (str) the html
+    """
+    lc = comment_id if parent_comment_id is None else f"{parent_comment_id}.{comment_id}"
+    css_class = "style-scope ytd-comment-thread-renderer" if parent_comment_id is None else "style-scope ytd-comment-replies-renderer"
+    return (
+        f'<ytd-comment-renderer id="comment" class="{css_class}">'
+        f'<div id="body" class="style-scope ytd-comment-renderer">'
+        f'<div id="author-thumbnail" class="style-scope ytd-comment-renderer"><a href="/@{author}">'
+        f'<yt-img-shadow><img id="img" class="style-scope yt-img-shadow" src="https://yt3.ggpht.com/{author}=s48-c-k-c0x00ffffff-no-rj"></yt-img-shadow></a></div>'
+        f'<div id="main" class="style-scope ytd-comment-renderer"><div id="header" class="style-scope ytd-comment-renderer">'
+        f'<div id="header-author" class="style-scope ytd-comment-renderer">'
+        f'<h3 class="style-scope ytd-comment-renderer"><a id="author-text" class="yt-simple-endpoint style-scope ytd-comment-renderer" href="/@{author}">'
+        f'<span class="style-scope ytd-comment-renderer"> @{author} </span></a></h3>'
+        f'<yt-formatted-string class="published-time-text style-scope ytd-comment-renderer">'
+        f'<a class="yt-simple-endpoint style-scope yt-formatted-string" href="/watch?v={video_id}&amp;lc={lc}">{publish_time}</a>'
+        f'</yt-formatted-string></div></div>'
+        f'<div id="comment-content" class="style-scope ytd-comment-renderer"><ytd-expander>'
+        f'<yt-formatted-string id="content-text" class="style-scope ytd-comment-renderer">{escape(text)}</yt-formatted-string>'
+        f'</ytd-expander></div>'
+        f'<div id="action-buttons" class="style-scope ytd-comment-renderer"><ytd-comment-action-buttons-renderer class="style-scope ytd-comment-renderer">'
+        f'<span id="vote-count-left" class="style-scope ytd-comment-action-buttons-renderer"> {like_count or ""} </span>'
+        f'</ytd-comment-action-buttons-renderer></div></div></div></ytd-comment-renderer>'
+    )
+
+
+def more_replies_button_html() -> str:
+    """Generate a "more replies" button of a comment thread."""
+    return ('<div id="more-replies" class="style-scope ytd-comment-replies-renderer"><yt-button-shape><button>'
+            '<yt-touch-feedback-shape><div aria-hidden="true"></div></yt-touch-feedback-shape></button></yt-button-shape></div>')
+
+
+def reply_continuation_html(offset: int) -> str:
+    """Generate the "Show more replies" continuation of an expanded comment thread, loading the replies from `offset`."""
+    return (f'<ytd-continuation-item-renderer class="style-scope ytd-comment-replies-renderer" data-offset="{offset}">'
+            f'<ytd-button-renderer><yt-button-shape><button>Show more replies</button></yt-button-shape></ytd-button-renderer>'
+            f'</ytd-continuation-item-renderer>')
+
+
+def comment_thread_html(video_id: str, head_card: str, reply_cards: List[str], collapsed: bool = False) -> str:
+    """
+    Generate a `ytd-comment-thread-renderer` with its head comment and replies.
+
+    :param video_id: (str) the video id
+    :param head_card: (str) the html of the head comment card
+    :param reply_cards: (List[str]) the html of the reply cards
+    :param collapsed: (bool) whether to render the replies collapsed behind a "more replies" button
+    :return: (str) the html
+    """
+    replies = ""
+    if reply_cards or collapsed:
+        button = more_replies_button_html() if collapsed else ""
+        contents = "" if collapsed else "".join(reply_cards)
+        replies = (f'<div id="replies" class="style-scope ytd-comment-thread-renderer"><ytd-comment-replies-renderer class="style-scope ytd-comment-thread-renderer">'
+                   f'{button}<div id="expander-contents"><div id="contents" class="style-scope ytd-comment-replies-renderer">{contents}</div></div>'
+                   f'</ytd-comment-replies-renderer></div>')
+    return f'<ytd-comment-thread-renderer class="style-scope ytd-item-section-renderer" data-video-id="{video_id}">{head_card}{replies}</ytd-comment-thread-renderer>'
+
+
+def generate_comment_threads(n_comments: int, video_id: str, reply_ratio: float = 0.3, seed: int = 0) -> List[dict]:
+    """
+    Generate the records of `n_comments` comments grouped into threads.
+
+    :param n_comments: (int) the total number of comments, including replies
+    :param video_id: (str) the video id
+    :param reply_ratio: (float) the ratio of replies among all comments
+    :param seed: (int) the random seed
+    :return: (List[dict]) [{"head": dict, "replies": List[dict]}], each record has the arguments of `comment_card_html`
+    """
+    rng = random.Random(seed)
+    n_authors = max(n_comments // 4, 1)
+    authors = [f"user-{random_id(rng, 6)}" for _ in range(n_authors)]
+
+    def record(parent_comment_id=None):
+        return {"video_id": video_id, "comment_id": random_id(rng, 26), "author": rng.choice(authors),
+                "text": random_text(rng), "like_count": int(rng.paretovariate(1.2)) - 1,
+                "publish_time": rng.choice(_times), "parent_comment_id": parent_comment_id}
+
+    threads, n_generated = [], 0
+    while n_generated < n_comments:
+        head = record()
+        n_replies = 0
+        if rng.random() < reply_ratio * 2:
+            n_replies = min(rng.randint(1, 10), n_comments - n_generated - 1)
+        threads.append({"head": head, "replies": [record(head["comment_id"]) for _ in range(n_replies)]})
+        n_generated += 1 + n_replies
+    return threads
+
+
+def watch_page_head_html(video_id: str, n_comments: int, view_count: int, padding: int = 0) -> str:
+    """
+    Generate the part of a watch page before the comment threads, including the player placeholder, meta info,
+    sidebar filler and the comment header.
+
+    :param video_id: (str) the video id
+    :param n_comments: (int) the comment count shown in the header
+    :param view_count: (int) the view count
+    :param padding: (int) the bytes of filler(scripts, recommendations) to mimic a real page size
+    :return: (str) the html
+    """
+    filler = f'<script>var ytInitialData = "{"x" * padding}";</script>' if padding > 0 else ""
+    return (
+        _page_head.format(title=video_id) +
+        f'<ytd-watch-flexy video-id="{video_id}"><div id="player"><video></video></div>'
+        f'<ytd-watch-metadata><div id="count" class="style-scope ytd-video-primary-info-renderer"><ytd-video-view-count-renderer>'
+        f'<span class="view-count style-scope ytd-video-view-count-renderer">{view_count:,}次观看</span>'
+        f'</ytd-video-view-count-renderer></div></ytd-watch-metadata>'
+        f'<div id="secondary">{filler}</div>'
+        f'<ytd-comments id="comments" class="style-scope ytd-watch-flexy"><ytd-item-section-renderer id="sections">'
+        f'<div id="header"><ytd-comments-header-renderer class="style-scope ytd-item-section-renderer">'
+        f'<h2 id="count" class="style-scope ytd-comments-header-renderer"><yt-formatted-string>{n_comments:,} 条评论</yt-formatted-string></h2>'
+        f'</ytd-comments-header-renderer></div><div id="contents" class="style-scope ytd-item-section-renderer">'
+    )
+
+
+def watch_page_tail_html() -> str:
+    """Generate the part of a watch page after the comment threads."""
+    return '</div></ytd-item-section-renderer></ytd-comments></ytd-watch-flexy>' + _page_tail
+
+
+def generate_watch_page(n_comments: int, video_id: str = None, reply_ratio: float = 0.3, padding: int = 0, seed: int = 0) -> str:
+    """
+    Generate a fully loaded watch page with `n_comments` comments(all replies expanded).
+
+    :param n_comments: (int) the total number of comments, including replies
+    :param video_id: (str) the video id, None for a random one
+    :param reply_ratio: (float) the ratio of replies among all comments
+    :param padding: (int) the bytes of filler(scripts, recommendations) to mimic a real page size
+    :param seed: (int) the random seed
+    :return: (str) the html
+    """
+    video_id = random_id(random.Random(seed), 11) if video_id is None else video_id
+    threads = generate_comment_threads(n_comments, video_id=video_id, reply_ratio=reply_ratio, seed=seed)
+    parts = [watch_page_head_html(video_id, n_comments=n_comments, view_count=n_comments * 37, padding=padding)]
+    for thread in threads:
+        parts.append(comment_thread_html(video_id, comment_card_html(**thread["head"]),
+                                         [comment_card_html(**reply) for reply in thread["replies"]]))
+    parts.append(watch_page_tail_html())
+    return "".join(parts)
+
+
+def video_card_html(video_id: str, title: str, channel: str, view_count: int, publish_time: str, duration: str,
+                    desc_text: str, is_short: bool = False) -> str:
+    """
+    Generate a `ytd-video-renderer` card of the search result page.
+
+    :return: (str) the html
+    """
+    href = f"/shorts/{video_id}" if is_short else f"/watch?v={video_id}&amp;pp=ygUGcHl0aG9u"
+    aria_label = f"{title} 来自 {channel} {publish_time} {duration} {view_count:,}次观看"
+    if is_short:
+        aria_label += " - 播放 Shorts 短视频"
+    return (
+        f'<ytd-video-renderer class="style-scope ytd-item-section-renderer"><div id="dismissible" class="style-scope ytd-video-renderer">'
+        f'<ytd-thumbnail><a id="thumbnail" href="{href}"><img src="https://i.ytimg.com/vi/{video_id}/hq720.jpg"></a></ytd-thumbnail>'
+        f'<div class="text-wrapper style-scope ytd-video-renderer"><div id="meta" class="style-scope ytd-video-renderer">'
+        f'<div id="title-wrapper" class="style-scope ytd-video-renderer"><h3 class="title-and-badge style-scope ytd-video-renderer">'
+        f'<a id="video-title" class="yt-simple-endpoint style-scope ytd-video-renderer" title="{escape(title)}" href="{href}" aria-label="{escape(aria_label)}">'
+        f'<yt-formatted-string class="style-scope ytd-video-renderer">{escape(title)}</yt-formatted-string></a></h3></div></div>'
+        f'<div id="channel-info" class="style-scope ytd-video-renderer"><a id="channel-thumbnail" href="/@{channel}"></a>'
+        f'<ytd-channel-name class="style-scope ytd-video-renderer">{channel}</ytd-channel-name></div>'
+        f'<yt-formatted-string class="metadata-snippet-text style-scope ytd-video-renderer">{escape(desc_text)}</yt-formatted-string>'
+        f'</div></div></ytd-video-renderer>'
+    )
+
+
+def generate_video_records(n_videos: int, short_ratio: float = 0.1, seed: int = 0) -> List[dict]:
+    """
+    Generate the records of `n_videos` search results.
+
+    :param n_videos: (int) the number of videos
+    :param short_ratio: (float) the ratio of shorts
+    :param seed: (int) the random seed
+    :return: (List[dict]) the records, each record has the arguments of `video_card_html`
+    """
+    rng = random.Random(seed)
+    channels = [f"channel-{random_id(rng, 5)}" for _ in range(max(n_videos // 10, 1))]
+    return [{"video_id": random_id(rng, 11), "title": random_text(rng, 3, 10), "channel": rng.choice(channels),
+             "view_count": rng.randint(0, 10 ** 7), "publish_time": rng.choice(_times),
+             "duration": rng.choice(_durations), "desc_text": random_text(rng, 5, 20),
+             "is_short": rng.random() < short_ratio} for _ in range(n_videos)]
+
+
+def search_page_head_html(search_term: str) -> str:
+    """Generate the part of a search result page before the video cards."""
+    return (_page_head.format(title=escape(search_term)) +
+            '<ytd-search><div id="filter-button"></div><ytd-section-list-renderer class="style-scope ytd-search">'
+            '<div id="contents" class="style-scope ytd-section-list-renderer"><ytd-item-section-renderer class="style-scope ytd-section-list-renderer">'
+            '<div id="contents" class="style-scope ytd-item-section-renderer">')
+
+
+def search_page_tail_html() -> str:
+    """Generate the part of a search result page after the video cards."""
+    return '</div></ytd-item-section-renderer></div></ytd-section-list-renderer></ytd-search>' + _page_tail
+
+
+def generate_search_page(n_videos: int, search_term: str = "python", short_ratio: float = 0.1, seed: int = 0) -> str:
+    """
+    Generate a fully loaded search result page with `n_videos` video cards.
+
+    :param n_videos: (int) the number of videos
+    :param search_term: (str) the search term
+    :param short_ratio: (float) the ratio of shorts
+    :param seed: (int) the random seed
+    :return: (str) the html
+    """
+    cards = [video_card_html(**record) for record in generate_video_records(n_videos, short_ratio=short_ratio, seed=seed)]
+    return search_page_head_html(search_term) + "".join(cards) + search_page_tail_html()
+
+
+def rich_item_html(video_id: str, title: str, view_count: int, publish_time: str, duration: str, is_short: bool = False,
+                   **kwargs) -> str:
+    """
+    Generate a `ytd-rich-item-renderer` card of a channel's videos or shorts tab.
+
+    :param video_id: (str) the video id
+    :param title: (str) the title
+    :param view_count: (int) the view count
+    :param publish_time: (str) the publish time text
+    :param duration: (str) the duration text
+    :param is_short: (bool) whether the video is a short
+    :return: (str) the html
+    """
+    if is_short:
+        return (f'<ytd-rich-item-renderer class="style-scope ytd-rich-grid-renderer"><div id="content">'
+                f'<a class="shortsLockupViewModelHostEndpoint" href="/shorts/{video_id}">'
+                f'<h3><span id="video-title">{escape(title)}</span></h3></a>'
+                f'<div id="metadata-line"><span class="inline-metadata-item">{view_count:,} views</span></div>'
+                f'</div></ytd-rich-item-renderer>')
+    return (
+        f'<ytd-rich-item-renderer class="style-scope ytd-rich-grid-renderer"><div id="content">'
+        f'<a id="thumbnail" href="/watch?v={video_id}"><ytd-thumbnail-overlay-time-status-renderer>'
+        f'<span id="text">{duration}</span></ytd-thumbnail-overlay-time-status-renderer></a>'
+        f'<a id="video-title-link" href="/watch?v={video_id}" title="{escape(title)}">'
+        f'<yt-formatted-string id="video-title">{escape(title)}</yt-formatted-string></a>'
+        f'<div id="metadata-line"><span class="inline-metadata-item">{view_count:,} views</span>'
+        f'<span class="inline-metadata-item">{publish_time}</span></div>'
+        f'</div></ytd-rich-item-renderer>'
+    )
+
+
+def generate_channel_page(n_videos: int, channel: str = "channel", short_ratio: float = 0.1, seed: int = 0) -> str:
+    """
+    Generate a fully loaded channel page with `n_videos` video cards in the grid.
+
+    :param n_videos: (int) the number of videos
+    :param channel: (str) the channel handle, without "@"
+    :param short_ratio: (float) the ratio of shorts
+    :param seed: (int) the random seed
+    :return: (str) the html
+    """
+    cards = [rich_item_html(**record) for record in generate_video_records(n_videos, short_ratio=short_ratio, seed=seed)]
+    return (_page_head.format(title=escape(channel)) +
+            '<ytd-browse page-subtype="channels">'
+            f'<div id="page-header"><h1><span>{escape(channel)}</span></h1><span>@{channel}</span></div>'
+            '<ytd-rich-grid-renderer><div id="contents">' + "".join(cards) +
+            '</div></ytd-rich-grid-renderer></ytd-browse>' + _page_tail)
+
+
+def write_fixture(kind: str, size: int, out_dir: Union[str, pathlib.Path], seed: int = 0, padding: int = 0) -> pathlib.Path:
+    """
+    Generate a fixture page and write it to `out_dir`.
+
+    :param kind: (str) "watch", "search" or "channel"
+    :param size: (int) the number of comments(watch) or videos(search, channel)
+    :param out_dir: (str, pathlib.Path) the output directory
+    :param seed: (int) the random seed
+    :param padding: (int) the bytes of filler of a watch page
+    :return: (pathlib.Path) the fixture path
+    """
+    out_dir = pathlib.Path(out_dir)
+    out_dir.mkdir(parents=True, exist_ok=True)
+    if kind == "watch":
+        html = generate_watch_page(size, seed=seed, padding=padding)
+    elif kind == "search":
+        html = generate_search_page(size, seed=seed)
+    elif kind == "channel":
+        html = generate_channel_page(size, seed=seed)
+    else:
+        raise ValueError(f"Unknown fixture kind: {kind}, it should be one of 'watch', 'search' and 'channel'")
+    file_path = out_dir / f"{kind}_{size}_{seed}.html"
+    file_path.write_text(html, encoding="utf-8")
+    return file_path
+
+
+def main():
+    arg_parser = argparse.ArgumentParser(description="Generate synthetic YouTube pages.")
+    arg_parser.add_argument("--kind", choices=["watch", "search", "channel"], default="watch")
+    arg_parser.add_argument("--sizes", type=int, nargs="+", default=[100, 1000, 10000])
+    arg_parser.add_argument("--out-dir", default="fixtures")
+    arg_parser.add_argument("--seed", type=int, default=0)
+    arg_parser.add_argument("--padding", type=int, default=0)
+    args = arg_parser.parse_args()
+    for size in args.sizes:
+        print(write_fixture(args.kind, size, args.out_dir, seed=args.seed, padding=args.padding))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,325 @@
+"""
+A local YouTube stand-in site for end-to-end crawl benchmarks.
+
+The site serves pages with the same selectors the page handlers rely on:
+
+- `/`: home page with the search box(`input#search`, clear button, `#search-icon-legacy`)
+- `/results?search_query=...`: search result page with the filter modal and infinitely scrolling `ytd-video-renderer` cards
+- `/watch?v=...`: watch page with meta info, infinitely scrolling comment threads, "more replies" buttons and
+  "Show more replies" continuations
+
+Cards are rendered by `benchmark.fixtures`, so snapshots downloaded from the site can be parsed by the parsers. Every
+request can be delayed by a configurable latency.
+
+Usage:
+
+    with MockYoutubeSite(latency=0.05) as site:
+        crawler.browser_agent.home_url = site.url
+        await crawler.crawl(video_url=site.video_url("abcdefghijk"), save_dir="out")
+
+Starting the site registers its host by `YoutubeUrlParser.allow_host`. Or serve it from the command line:
+`python -m benchmark.mock_site --port 8000 --latency 0.05`, and call `YoutubeUrlParser.allow_host("http://127.0.0.1:8000")`
+in the crawling process.
+"""
+import json
+import time
+import random
+import zlib
+import argparse
+import threading
+import urllib.parse
+from http.server import ThreadingHTTPServer, BaseHTTPRequestHandler
+from typing import Dict
+
+from benchmark import fixtures
+from youcreep.browser_agent.url_parser import YoutubeUrlParser
+
+_style = ("<style>ytd-comment-thread-renderer, ytd-video-renderer {display: block; min-height: 120px;} "
+          "#options {display: none;} #options.opened {display: block;} #sentinel {height: 1200px;}</style>")
+
+_home_body = """
+<div id="masthead"><form id="search-form" onsubmit="return false;">
+<input id="search" name="search_query" autocomplete="off">
+<div id="search-clear-button"><ytd-button-renderer><yt-button-shape><button type="button">x</button></yt-button-shape></ytd-button-renderer></div>
+<button id="search-icon-legacy" type="button">search</button>
+</form></div>
+<script>
+document.getElementById("search-clear-button").querySelector("button").addEventListener("click", () => {
+    document.getElementById("search").value = "";
+});
+document.getElementById("search-icon-legacy").addEventListener("click", () => {
+    const term = document.getElementById("search").value;
+    location.href = "/results?search_query=" + encodeURIComponent(term).replace(/%20/g, "+");
+});
+</script>
+"""
+
+# the number of options in each filter section, in the order of `FilterSection`
+_filter_sections = [("上传日期", 5), ("类型", 4), ("时长", 3), ("特征", 11), ("排序依据", 4)]
+
+_infinite_scroll_js = """
+<script>
+(() => {
+    let loading = false, exhausted = false;
+    const contents = document.querySelector(%(container)s);
+    async function loadMore() {
+        if (loading || exhausted) return;
+        if (window.innerHeight + window.scrollY < document.body.scrollHeight - 1500) return;
+        loading = true;
+        const offset = contents.querySelectorAll(%(card)s).length;
+        const resp = await fetch(%(api)s + "&offset=" + offset);
+        const data = await resp.json();
+        contents.insertAdjacentHTML("beforeend", data.html);
+        exhausted = data.exhausted;
+        loading = false;
+    }
+    window.addEventListener("scroll", loadMore);
+    loadMore();
+})();
+</script>
+"""
+
+_more_replies_js = """
+<script>
+document.addEventListener("click", async (event) => {
+    // like YouTube, the "more replies" button is hidden(not removed) once clicked, and the further replies are loaded
+    // by a "Show more replies" continuation which is replaced by them
+    const moreButton = event.target.closest("#more-replies");
+    const continuation = event.target.closest("ytd-comment-replies-renderer ytd-continuation-item-renderer");
+    const trigger = moreButton || continuation;
+    if (!trigger || trigger.dataset.loading) return;
+    trigger.dataset.loading = "1";
+    const offset = continuation ? continuation.dataset.offset : 0;
+    const thread = trigger.closest("ytd-comment-thread-renderer");
+    const resp = await fetch("/api/replies?v=" + thread.dataset.videoId + "&thread=" + thread.dataset.threadIndex + "&offset=" + offset);
+    const data = await resp.json();
+    if (moreButton) moreButton.style.display = "none";
+    if (continuation) continuation.remove();
+    thread.querySelector("ytd-comment-replies-renderer #contents").insertAdjacentHTML("beforeend", data.html);
+});
+</script>
+"""
+
+
+class MockYoutubeSite:
+    """
+    A local YouTube stand-in site served by a threading HTTP server in a background thread.
+    """
+    def __init__(self,
+                 host: str = "127.0.0.1",
+                 port: int = 0,
+                 latency: float = 0.,
+                 jitter: float = 0.,
+                 n_comments: int = 500,
+                 n_search_results: int = 300,
+                 page_size: int = 20,
+                 reply_ratio: float = 0.3,
+                 reply_page_size: int = 5,
+                 video_comments: Dict[str, int] = None):
+        """
+        :param host: (str) the host to bind
+        :param port: (int) the port to bind, 0 for a random free port
+        :param latency: (float) the delay of every request, in seconds
+        :param jitter: (float) a random extra delay in [0, jitter) of every request, in seconds
+        :param n_comments: (int) the number of comments of every video, including replies
+        :param n_search_results: (int) the number of results of every search
+        :param page_size: (int) the number of comment threads or video cards returned by each continuation
+        :param reply_ratio: (float) the ratio of replies among comments
+        :param reply_page_size: (int) the number of replies returned by each click, the others are behind a "Show more
+            replies" continuation
+        :param video_comments: (Dict[str, int]) per-video number of comments, overriding `n_comments`
+        """
+        self.latency = latency
+        self.jitter = jitter
+        self.n_comments = n_comments
+        self.n_search_results = n_search_results
+        self.page_size = page_size
+        self.reply_ratio = reply_ratio
+        self.reply_page_size = reply_page_size
+        self.video_comments = {} if video_comments is None else dict(video_comments)
+        self.n_requests = 0
+        self._threads_cache = {}
+        self._videos_cache = {}
+        self._lock = threading.Lock()
+        self._server = ThreadingHTTPServer((host, port), self._handler_cls())
+        self._server.daemon_threads = True
+        self._thread = None
+
+    # lifecycle
+    def start(self) -> 'MockYoutubeSite':
+        # the agent only navigates to the urls the parser accepts
+        YoutubeUrlParser.allow_host(self.url)
+        self._thread = threading.Thread(target=self._server.serve_forever, daemon=True)
+        self._thread.start()
+        return self
+
+    def stop(self) -> None:
+        self._server.shutdown()
+        self._server.server_close()
+        if self._thread is not None:
+            self._thread.join()
+            self._thread = None
+
+    def __enter__(self):
+        return self.start()
+
+    def __exit__(self, exc_type, exc_val, exc_tb):
+        self.stop()
+
+    def serve_forever(self) -> None:
+        """Serve in the current thread until interrupted."""
+        self._server.serve_forever()
+
+    # urls
+    @property
+    def url(self) -> str:
+        """the home url, assign it to `YoutubeAgent.home_url`"""
+        host, port = self._server.server_address[:2]
+        return f"http://{host}:{port}/"
+
+    def video_url(self, video_id: str) -> str:
+        return f"{self.url}watch?v={video_id}"
+
+    # data
+    def comment_threads(self, video_id: str) -> list:
+        with self._lock:
+            if video_id not in self._threads_cache:
+                n_comments = self.video_comments.get(video_id, self.n_comments)
+                self._threads_cache[video_id] = fixtures.generate_comment_threads(
+                    n_comments, video_id=video_id, reply_ratio=self.reply_ratio, seed=zlib.crc32(video_id.encode()))
+            return self._threads_cache[video_id]
+
+    def search_results(self, search_term: str) -> list:
+        with self._lock:
+            if search_term not in self._videos_cache:
+                self._videos_cache[search_term] = fixtures.generate_video_records(
+                    self.n_search_results, seed=zlib.crc32(search_term.encode()))
+            return self._videos_cache[search_term]
+
+    # pages
+    def home_page(self) -> str:
+        return f"<!DOCTYPE html><html><head><meta charset=\"utf-8\">{_style}</head><body>{_home_body}</body></html>"
+
+    def watch_page(self, video_id: str) -> str:
+        threads = self.comment_threads(video_id)
+        n_comments = sum(1 + len(thread["replies"]) for thread in threads)
+        scroll_js = _infinite_scroll_js % {"container": json.dumps("ytd-comments #contents"),
+                                           "card": json.dumps("ytd-comment-thread-renderer"),
+                                           "api": json.dumps(f"/api/comments?v={video_id}")}
+        head = fixtures.watch_page_head_html(video_id, n_comments=n_comments, view_count=n_comments * 37)
+        head = head.replace("<body>", f"<body>{_style}{_home_body}", 1)
+        tail = fixtures.watch_page_tail_html()
+        tail = tail.replace("</body>", f'<div id="sentinel"></div>{scroll_js}{_more_replies_js}</body>', 1)
+        return head + tail
+
+    def search_page(self, search_term: str) -> str:
+        filter_groups = "".join(
+            f'<ytd-search-filter-group-renderer><h4 id="filter-group-name">{name}</h4>' +
+            "".join(f'<ytd-search-filter-renderer><a href="/results?search_query={urllib.parse.quote_plus(search_term)}&amp;sp={i}-{j}">'
+                    f'option-{i}-{j}</a></ytd-search-filter-renderer>' for j in range(n_options)) +
+            '</ytd-search-filter-group-renderer>'
+            for i, (name, n_options) in enumerate(_filter_sections))
+        filter_modal = (
+            '<div id="filter-button"><ytd-button-renderer><yt-button-shape><button><yt-touch-feedback-shape>'
+            '<div onclick="document.getElementById(\'options\').classList.toggle(\'opened\')">filter</div>'
+            f'</yt-touch-feedback-shape></button></yt-button-shape></ytd-button-renderer></div><div id="options">{filter_groups}</div>'
+        )
+        scroll_js = _infinite_scroll_js % {"container": json.dumps("ytd-item-section-renderer #contents"),
+                                           "card": json.dumps("ytd-video-renderer"),
+                                           "api": json.dumps(f"/api/search?search_query={urllib.parse.quote_plus(search_term)}")}
+        head = fixtures.search_page_head_html(search_term)
+        head = head.replace("<body>", f"<body>{_style}{_home_body}", 1)
+        head = head.replace('<div id="filter-button"></div>', filter_modal, 1)
+        tail = fixtures.search_page_tail_html().replace("</body>", f'<div id="sentinel"></div>{scroll_js}</body>', 1)
+        return head + tail
+
+    # continuations
+    def comments_continuation(self, video_id: str, offset: int) -> dict:
+        threads = self.comment_threads(video_id)
+        page = threads[offset:offset + self.page_size]
+        html = "".join(
+            fixtures.comment_thread_html(video_id, fixtures.comment_card_html(**thread["head"]), [],
+                                         collapsed=len(thread["replies"]) > 0)
+            .replace("<ytd-comment-thread-renderer ", f'<ytd-comment-thread-renderer data-thread-index="{offset + i}" ', 1)
+            for i, thread in enumerate(page))
+        return {"html": html, "exhausted": offset + self.page_size >= len(threads)}
+
+    def replies_continuation(self, video_id: str, thread_index: int, offset: int = 0) -> dict:
+        replies = self.comment_threads(video_id)[thread_index]["replies"]
+        end = offset + self.reply_page_size
+        html = "".join(fixtures.comment_card_html(**reply) for reply in replies[offset:end])
+        if end < len(replies):
+            html += fixtures.reply_continuation_html(end)
+        return {"html": html, "exhausted": end >= len(replies)}
+
+    def search_continuation(self, search_term: str, offset: int) -> dict:
+        videos = self.search_results(search_term)
+        html = "".join(fixtures.video_card_html(**record) for record in videos[offset:offset + self.page_size])
+        return {"html": html, "exhausted": offset + self.page_size >= len(videos)}
+
+    def route(self, path: str, query: dict):
+        """
+        Route a request.
+
+        :param path: (str) the url path
+        :param query: (dict) the parsed query string
+        :return: (int, str, str) status code, content type and body
+        """
+        arg = lambda key, default=None: query.get(key, [default])[0]
+        if path == "/":
+            return 200, "text/html", self.home_page()
+        if path == "/watch" and arg("v"):
+            return 200, "text/html", self.watch_page(arg("v"))
+        if path == "/results" and arg("search_query") is not None:
+            return 200, "text/html", self.search_page(arg("search_query"))
+        if path == "/api/comments":
+            return 200, "application/json", json.dumps(self.comments_continuation(arg("v"), int(arg("offset", 0))))
+        if path == "/api/replies":
+            return 200, "application/json", json.dumps(self.replies_continuation(arg("v"), int(arg("thread", 0)), int(arg("offset", 0))))
+        if path == "/api/search":
+            return 200, "application/json", json.dumps(self.search_continuation(arg("search_query"), int(arg("offset", 0))))
+        return 404, "text/plain", "Not Found"
+
+    def _handler_cls(self):
+        site = self
+
+        class _Handler(BaseHTTPRequestHandler):
+            def do_GET(self):
+                site.n_requests += 1
+                delay = site.latency + (random.random() * site.jitter if site.jitter > 0 else 0.)
+                if delay > 0:
+                    time.sleep(delay)
+                parsed = urllib.parse.urlparse(self.path)
+                status, content_type, body = site.route(parsed.path, urllib.parse.parse_qs(parsed.query))
+                payload = body.encode("utf-8")
+                self.send_response(status)
+                self.send_header("Content-Type", f"{content_type}; charset=utf-8")
+                self.send_header("Content-Length", str(len(payload)))
+                self.end_headers()
+                self.wfile.write(payload)
+
+            def log_message(self, format, *args):
+                pass
+
+        return _Handler
+
+
+def main():
+    arg_parser = argparse.ArgumentParser(description="Serve a local YouTube stand-in site.")
+    arg_parser.add_argument("--host", default="127.0.0.1")
+    arg_parser.add_argument("--port", type=int, default=8000)
+    arg_parser.add_argument("--latency", type=float, default=0.)
+    arg_parser.add_argument("--n-comments", type=int, default=500)
+    arg_parser.add_argument("--n-search-results", type=int, default=300)
+    args = arg_parser.parse_args()
+    site = MockYoutubeSite(host=args.host, port=args.port, latency=args.latency, n_comments=args.n_comments,
+                           n_search_results=args.n_search_results)
+    print(f"Serving the mock YouTube site at {site.url}")
+    try:
+        site.serve_forever()
+    except KeyboardInterrupt:
+        pass
+
+
+if __name__ == "__main__":
+    main()
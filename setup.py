@@ -10,7 +10,7 @@ def read_requirements():
 setup(
     name='youcreep',
     version='0.1.42',
-    packages=find_packages(exclude=['test', 'test.*']),
+    packages=find_packages(exclude=['test', 'test.*', 'benchmark', 'benchmark.*']),
     install_requires=read_requirements(),
     url='https://github.com/stevieflyer/youtube_crawler',
     author='Steve Flyer',
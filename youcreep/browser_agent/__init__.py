@@ -1,4 +1,12 @@
-from .agent import YoutubeAgent
+def __getattr__(name):
+    # `YoutubeAgent` pulls in playwright and wrightyrion, import it only when it is used, so that `url_parser` stays cheap
+    if name == 'YoutubeAgent':
+        from .agent import YoutubeAgent
+        return YoutubeAgent
+    if name == 'AgentPool':
+        from .agent_pool import AgentPool
+        return AgentPool
+    raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
 
 
-__all__ = ['YoutubeAgent', 'url_parser']
+__all__ = ['YoutubeAgent', 'AgentPool', 'url_parser']
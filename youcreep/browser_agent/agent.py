@@ -1,22 +1,80 @@
+import json
 import pathlib
+from typing import Union
 
 from wrightyrion.agent import Agent
 
-from .modules import ShortPageHandler, CommonPageHandler, VideoPageHandler, SearchPageHandler
+from youcreep.common.metrics import MetricsRecorder
+from .rate_limiter import AdaptiveRateLimiter
+from .modules import ShortPageHandler, CommonPageHandler, VideoPageHandler, SearchPageHandler, ChannelPageHandler
 from .url_parser import YoutubeUrlParser, YouTubeUrlType
+from youcreep.common.selectors.common_sels import head_comment_card_sel, video_card_sel
+from youcreep.common.selectors.video_page_sels import comments_section_sel
+from youcreep.common.selectors.search_result_page import search_results_section_sel
+from youcreep.common.selectors.channel_page_sels import channel_page_sel, channel_header_sel, rich_item_sel
+from youcreep.common.selectors.short_page_sels import active_reel_sel, comment_panel_sel
+
+SECTION_SEL_DICT = {
+    YouTubeUrlType.VIDEO: (comments_section_sel, head_comment_card_sel),
+    YouTubeUrlType.SHORT: (f"{active_reel_sel} {comment_panel_sel}", head_comment_card_sel),
+    YouTubeUrlType.SEARCH: (search_results_section_sel, video_card_sel),
+    YouTubeUrlType.USER: (channel_page_sel, f"{channel_header_sel}, {rich_item_sel}"),
+}
+"""{page type: (section selector, item selector)}, the region of each page type needed by the parsers"""
 
 
 class YoutubeAgent(Agent):
     home_url = "https://www.youtube.com/"
+    """the page to open on start, override it on the instance before starting to crawl a stand-in site"""
+
+    storage_state_path: Union[str, pathlib.Path, None] = None
+    """the Playwright storage state file to load the cookies from on start(e.g. consent cookies), None for a fresh session"""
 
     def _init_hook(self) -> None:
-        self._common_hdl = CommonPageHandler(agent=self, debug_tool=self.debug_tool)
-        self._short_hdl = ShortPageHandler(agent=self, debug_tool=self.debug_tool)
-        self._video_hdl = VideoPageHandler(agent=self, debug_tool=self.debug_tool)
-        self._search_hdl = SearchPageHandler(agent=self, debug_tool=self.debug_tool)
+        self._n_pages = 0
+        self._metrics = MetricsRecorder()
+        self._rate_limiter = AdaptiveRateLimiter.shared()
+        hdl_kwargs = dict(agent=self, debug_tool=self.debug_tool, metrics=self._metrics, rate_limiter=self._rate_limiter)
+        self._common_hdl = CommonPageHandler(**hdl_kwargs)
+        self._short_hdl = ShortPageHandler(**hdl_kwargs)
+        self._video_hdl = VideoPageHandler(**hdl_kwargs)
+        self._search_hdl = SearchPageHandler(**hdl_kwargs)
+        self._channel_hdl = ChannelPageHandler(**hdl_kwargs)
 
     async def _start_hook(self) -> None:
-        await self.browser_mgr.go(self.home_url)
+        if self.storage_state_path is not None and pathlib.Path(self.storage_state_path).exists():
+            storage_state = json.loads(pathlib.Path(self.storage_state_path).read_text(encoding="utf-8"))
+            await self.browser_mgr.context.add_cookies(storage_state.get("cookies", []))
+            self.debug_tool.info(f"Loaded {len(storage_state.get('cookies', []))} cookies from {self.storage_state_path}")
+        # count every main frame navigation, including the in-app ones of YouTube, to know when the page gets stale
+        self._n_pages = 0
+        self.page.on("framenavigated", self._on_frame_navigated)
+        await self._common_hdl.navigate(self.home_url)
+        await self._common_hdl.dismiss_popups()
+
+    def _on_frame_navigated(self, frame) -> None:
+        if frame == self.page.main_frame:
+            self._n_pages += 1
+
+    async def save_storage_state(self, file_path: Union[str, pathlib.Path] = None) -> pathlib.Path:
+        """
+        Save the cookies and local storage of the browser context, so that other agents can start from this session.
+
+        :param file_path: (str, pathlib.Path) the file to save, default is `storage_state_path`
+        :return: (pathlib.Path) the saved file
+        """
+        file_path = pathlib.Path(file_path if file_path is not None else self.storage_state_path)
+        file_path.parent.mkdir(parents=True, exist_ok=True)
+        await self.browser_mgr.context.storage_state(path=file_path)
+        return file_path
+
+    async def js_heap_size(self) -> Union[int, None]:
+        """
+        Get the used JS heap size of the current page.
+
+        :return: (int | None) the size in bytes, None if the browser does not expose it
+        """
+        return await self._common_hdl.js_heap_size()
 
     async def search(self, search_term: str):
         """
@@ -30,14 +88,21 @@ class YoutubeAgent(Agent):
         """
         return await self._common_hdl.search(search_term=search_term)
 
-    async def download_page(self, file_path: (str, pathlib.Path), encoding="utf-8"):
+    async def download_page(self, file_path: (str, pathlib.Path), encoding="utf-8", section_only: bool = False):
         """
         Download current web page. Save to the file system.
 
         :param file_path: (str, pathlib.Path) the file path to save the web page
         :param encoding: (str) the file encoding, default is 'utf-8'
+        :param section_only: (bool) only download the region needed by the parsers(see `SECTION_SEL_DICT`) in chunks,
+            the whole page is downloaded if the page type has no such region or the region is not found
         :return:
         """
+        url_type = YoutubeUrlParser.parse_url(self.page.url)["type"]
+        if section_only and url_type in SECTION_SEL_DICT:
+            section_sel, item_sel = SECTION_SEL_DICT[url_type]
+            if await self._common_hdl.download_section(file_path=file_path, section_sel=section_sel, item_sel=item_sel, encoding=encoding):
+                return
         return await self._common_hdl.download_page(file_path=file_path, encoding=encoding)
 
     async def go_youtube_page(self, url: str):
@@ -54,7 +119,7 @@ class YoutubeAgent(Agent):
         elif url_type == YouTubeUrlType.SHORT:
             await self._short_hdl.go_short_page(url=url)
         else:
-            await self.browser_mgr.go(url=url)
+            await self._common_hdl.navigate(url)
 
     # getters
     @property
@@ -69,5 +134,24 @@ class YoutubeAgent(Agent):
     def search_hdl(self) -> SearchPageHandler:
         return self._search_hdl
 
+    @property
+    def channel_hdl(self) -> ChannelPageHandler:
+        return self._channel_hdl
+
+    @property
+    def n_pages(self) -> int:
+        """the number of pages opened since the agent started"""
+        return self._n_pages
+
+    @property
+    def metrics(self) -> MetricsRecorder:
+        """the metrics recorder shared by the agent and its page handlers"""
+        return self._metrics
+
+    @property
+    def rate_limiter(self) -> AdaptiveRateLimiter:
+        """the rate limiter all navigations and scroll steps go through, shared process-wide by default"""
+        return self._rate_limiter
+
 
 __all__ = ['YoutubeAgent']
@@ -0,0 +1,233 @@
+import time
+import pathlib
+import asyncio
+import contextlib
+from typing import List, Union, AsyncIterator
+
+from gembox.debug_utils import Debugger
+from playwright.async_api import async_playwright, Playwright
+
+from .agent import YoutubeAgent
+
+
+class AgentPool:
+    """
+    A pool of started and warmed up `YoutubeAgent`, so that a job gets a ready browser without paying the launch and
+    the navigation to `home_url`.
+
+    An agent is recycled(stopped and started again in the background) after opening `max_pages` pages, when its JS heap
+    exceeds `max_js_heap_mb`, or when the job using it raised, because long-running pages leak renderer memory and
+    become sluggish. Before recycling, the cookies of the agent are saved to `storage_state_path`, and every agent loads
+    them on start, so the consent given once is shared by the whole pool.
+
+    All the agents share one Playwright driver. Use the pool as an async context manager:
+
+    ```python
+    async with AgentPool(size=2, storage_state_path='state.json') as pool:
+        async with pool.acquire() as agent:
+            crawler = YoutubeCommentCrawler(browser_agent=agent)
+            await crawler.crawl(...)
+    ```
+    """
+    max_restart_attempts = 3
+    """the number of attempts to restart a recycled agent before dropping it from the pool"""
+
+    def __init__(self,
+                 size: int = 2,
+                 headless: bool = True,
+                 storage_state_path: Union[str, pathlib.Path] = None,
+                 max_pages: Union[int, None] = 50,
+                 max_js_heap_mb: Union[float, None] = 512.,
+                 debug_tool: Debugger = None):
+        """
+        :param size: (int) the number of agents
+        :param headless: (bool) whether to run the browsers in headless mode
+        :param storage_state_path: (str, pathlib.Path) the storage state file shared by the agents, None for not sharing
+        :param max_pages: (int) recycle an agent after it opened `max_pages` pages, None for no limit
+        :param max_js_heap_mb: (float) recycle an agent when its JS heap exceeds `max_js_heap_mb` MB, None for no limit
+        :param debug_tool: (Debugger) the debugger
+        """
+        assert size > 0, f"size should be positive, got {size}"
+        self.size = size
+        self.headless = headless
+        self.storage_state_path = storage_state_path
+        self.max_pages = max_pages
+        self.max_js_heap_mb = max_js_heap_mb
+        self.debug_tool = Debugger() if debug_tool is None else debug_tool
+
+        self._wright: Union[Playwright, None] = None
+        self._agents: List[YoutubeAgent] = []
+        self._idle: Union[asyncio.Queue, None] = None
+        self._recycling: set = set()
+        self._n_recycled = 0
+        self._exhausted: Union[asyncio.Event, None] = None
+
+    async def start(self) -> None:
+        """
+        Launch and warm up all the agents concurrently.
+
+        :return: (None)
+        """
+        if self._wright is not None:
+            self.debug_tool.warn(f"{self.__class__.__name__} is already started")
+            return
+        self.debug_tool.info(f"Starting {self.size} agents...")
+        self._wright = await async_playwright().start()
+        self._idle = asyncio.Queue()
+        self._exhausted = asyncio.Event()
+        self._agents = [YoutubeAgent(wright=self._wright, headless=self.headless, debug_tool=self.debug_tool) for _ in range(self.size)]
+        for agent in self._agents:
+            agent.storage_state_path = self.storage_state_path
+        await asyncio.gather(*[self._warm_up(agent) for agent in self._agents])
+        self.debug_tool.info(f"{self.size} agents are ready")
+
+    async def stop(self) -> None:
+        """
+        Wait for the agents being recycled, then stop all the agents.
+
+        :return: (None)
+        """
+        if self._wright is None:
+            return
+        if self._recycling:
+            await asyncio.gather(*self._recycling, return_exceptions=True)
+        for agent in self._agents:
+            if agent.is_running:
+                try:
+                    await agent.stop()
+                except Exception as e:
+                    self.debug_tool.warn(f"Error while stopping the agent: {e}")
+        await self._wright.stop()
+        self._wright, self._agents, self._idle = None, [], None
+        self.debug_tool.info(f"{self.__class__.__name__} stopped, {self._n_recycled} agents recycled in total")
+
+    @contextlib.asynccontextmanager
+    async def acquire(self, timeout: float = None) -> AsyncIterator[YoutubeAgent]:
+        """
+        Borrow an idle agent, wait if all the agents are busy or being recycled.
+
+        The agent is returned to the pool on exit, or recycled if it is stale or the block raised.
+
+        :param timeout: (float) how long to wait for an idle agent in seconds, None to wait as long as the pool has agents
+        :return: (AsyncIterator[YoutubeAgent]) the agent
+        :raise RuntimeError: when every agent failed to restart and was dropped from the pool
+        :raise asyncio.TimeoutError: when no agent is idle within `timeout`
+        """
+        assert self._wright is not None, f"{self.__class__.__name__} is not started"
+        start = time.perf_counter()
+        agent = await self._get_idle(timeout)
+        agent.metrics.observe("pool_acquire_wait", time.perf_counter() - start)
+        try:
+            yield agent
+        except BaseException:
+            # the page may be broken, do not hand it to the next job
+            self._recycle_later(agent, save_state=False)
+            raise
+        if await self._is_stale(agent):
+            self._recycle_later(agent, save_state=True)
+        else:
+            self._idle.put_nowait(agent)
+
+    async def _get_idle(self, timeout: Union[float, None]) -> YoutubeAgent:
+        if self._exhausted.is_set() and self._idle.empty():
+            raise RuntimeError(f"{self.__class__.__name__} has no agent left, all of them failed to restart")
+        get_task = asyncio.ensure_future(self._idle.get())
+        exhausted_task = asyncio.ensure_future(self._exhausted.wait())
+        done, pending = await asyncio.wait({get_task, exhausted_task}, timeout=timeout, return_when=asyncio.FIRST_COMPLETED)
+        for task in pending:
+            task.cancel()
+        if get_task in done:
+            return get_task.result()
+        if exhausted_task in done:
+            raise RuntimeError(f"{self.__class__.__name__} has no agent left, all of them failed to restart")
+        raise asyncio.TimeoutError(f"No idle agent within {timeout}s")
+
+    async def _warm_up(self, agent: YoutubeAgent) -> None:
+        with agent.metrics.timer("pool_warm_up"):
+            await agent.start()
+        self._idle.put_nowait(agent)
+
+    async def _is_stale(self, agent: YoutubeAgent) -> bool:
+        if self.max_pages is not None and agent.n_pages >= self.max_pages:
+            self.debug_tool.info(f"Agent opened {agent.n_pages} pages, recycling it")
+            return True
+        if self.max_js_heap_mb is not None:
+            try:
+                heap_size = await agent.js_heap_size()
+            except Exception as e:
+                self.debug_tool.warn(f"Failed to get the JS heap size, recycling the agent. Error: {e}")
+                return True
+            if heap_size is not None and heap_size / 2 ** 20 >= self.max_js_heap_mb:
+                self.debug_tool.info(f"Agent JS heap is {heap_size / 2 ** 20:.0f}MB, recycling it")
+                return True
+        return False
+
+    def _recycle_later(self, agent: YoutubeAgent, save_state: bool) -> None:
+        task = asyncio.create_task(self._recycle(agent, save_state=save_state))
+        self._recycling.add(task)
+        task.add_done_callback(self._recycling.discard)
+
+    async def _recycle(self, agent: YoutubeAgent, save_state: bool) -> None:
+        agent.metrics.incr("pool_recycle")
+        self._n_recycled += 1
+        if save_state and self.storage_state_path is not None:
+            try:
+                await agent.save_storage_state()
+            except Exception as e:
+                self.debug_tool.warn(f"Failed to save the storage state. Error: {e}")
+        for attempt in range(self.max_restart_attempts):
+            try:
+                if agent.is_running:
+                    await agent.stop()
+                await self._warm_up(agent)
+                return
+            except Exception as e:
+                self.debug_tool.warn(f"Failed to restart the agent, attempt {attempt + 1}/{self.max_restart_attempts}. Error: {e}")
+                # the agent is in an unknown state, close whatever it launched and replace it by a new one
+                await self._close_quietly(agent)
+                self._agents.remove(agent)
+                agent = YoutubeAgent(wright=self._wright, headless=self.headless, debug_tool=self.debug_tool)
+                agent.storage_state_path = self.storage_state_path
+                self._agents.append(agent)
+                await asyncio.sleep(2 ** attempt)
+        self.debug_tool.error(f"Failed to restart the agent, the pool shrinks to {len(self._agents) - 1} agents")
+        await self._close_quietly(agent)
+        self._agents.remove(agent)
+        if not self._agents:
+            # wake up the jobs waiting in `acquire`, no agent will ever be idle again
+            self._exhausted.set()
+
+    async def _close_quietly(self, agent: YoutubeAgent) -> None:
+        # a failed `start` leaves `is_running` False, `stop` would not close the browser it may have launched
+        try:
+            if agent.is_running:
+                await agent.stop()
+            else:
+                await agent.browser_mgr.close()
+        except Exception as e:
+            self.debug_tool.warn(f"Failed to close the agent. Error: {e}")
+
+    @property
+    def n_idle(self) -> int:
+        """the number of agents ready to be acquired"""
+        return 0 if self._idle is None else self._idle.qsize()
+
+    @property
+    def is_exhausted(self) -> bool:
+        """whether every agent failed to restart and was dropped, `acquire` raises then"""
+        return self._exhausted is not None and self._exhausted.is_set()
+
+    @property
+    def n_recycled(self) -> int:
+        """the number of recycles since the pool started"""
+        return self._n_recycled
+
+    async def __aenter__(self):
+        await self.start()
+        return self
+
+    async def __aexit__(self, exc_type, exc_val, exc_tb):
+        await self.stop()
+
+
+__all__ = ['AgentPool']
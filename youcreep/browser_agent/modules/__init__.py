@@ -2,3 +2,6 @@ from .short_page_handler import ShortPageHandler
 from .video_page_handler import VideoPageHandler
 from .common_page_handler import CommonPageHandler
 from .search_page_handler import SearchPageHandler
+from .channel_page_handler import ChannelPageHandler, ChannelTab
+from .page_handler import PageHandler, ScrollLoadReturnType, ScrollStopReason, YieldMonitor
+from .comment_streamer import CommentStreamer
@@ -0,0 +1,81 @@
+import enum
+import asyncio
+import playwright.async_api
+from typing import List, Callable, Union
+
+from youcreep.browser_agent.url_parser import YoutubeUrlParser, YouTubeUrlType
+from youcreep.browser_agent.modules.page_handler import PageHandler, ScrollLoadReturnType
+from youcreep.common.selectors.channel_page_sels import rich_item_sel, rich_item_continuation_sel
+
+
+class ChannelTab(enum.Enum):
+    VIDEOS = "videos"
+    SHORTS = "shorts"
+
+
+channel_video_id_js = """video_card => {
+    const link = video_card.querySelector("a#video-title-link, a#thumbnail, a[href*='/shorts/']");
+    if (!link) return null;
+    const url = new URL(link.href, location.href);
+    return url.searchParams.get('v') || url.pathname.split('/').pop();
+}"""
+"""javascript function mapping a channel video card to its video_id, consistent with `YoutubeUrlParser`"""
+
+
+class ChannelPageHandler(PageHandler):
+    page_type = YouTubeUrlType.USER
+
+    async def go_channel_page(self, url: str, tab: ChannelTab = ChannelTab.VIDEOS):
+        """
+        Go to a tab of a channel page.
+
+        :param url: (str) the url of the channel, e.g. `https://www.youtube.com/@handle`, the tab in the url is ignored
+        :param tab: (ChannelTab) the tab to open
+        :return: (None)
+        """
+        assert self.check_url(test_url=url) is True
+        tab_url = self.channel_tab_url(url, tab)
+
+        self.debug_tool.info(f"Going to channel page {tab_url}...")
+        await self.navigate(tab_url)
+        await asyncio.sleep(1)
+        self.debug_tool.info(f"Go to channel page {tab_url} successfully")
+
+    @staticmethod
+    def channel_tab_url(url: str, tab: ChannelTab) -> str:
+        """
+        Get the url of a tab of the channel.
+
+        :param url: (str) the url of the channel
+        :param tab: (ChannelTab) the tab
+        :return: (str) the url of the tab
+        """
+        user_id = YoutubeUrlParser.parse_url(url)["user_id"]
+        base_url = url[:url.index(f"/@{user_id}")]
+        return f"{base_url}/@{user_id}/{tab.value}"
+
+    async def scroll_load_video_cards(self,
+                                      n_target: int = None,
+                                      callbacks: List[Callable] = None,
+                                      return_type: ScrollLoadReturnType = ScrollLoadReturnType.HANDLES) -> Union[int, List[str], List[playwright.async_api.ElementHandle]]:
+        """
+        Scroll down to load more video cards of the current tab.
+
+        The grid ends with a continuation item while more videos can be loaded, so scrolling stops right after the
+        last batch, instead of waiting for the count to stay unchanged.
+
+        @in_page: channel page
+
+        @out_page: channel page
+
+        :param n_target: (int) The target number of video cards to load, None for all.
+        :param callbacks: (List[Callable]) The callback function to call after each scroll step.
+        :param return_type: (ScrollLoadReturnType) Return the handles, the count or the video ids of the loaded cards.
+        :return: (int | List[str] | List[ElementHandle]) The loaded video cards in the form of `return_type`.
+        """
+        await self.scroll_load_count(selector=rich_item_sel, threshold=n_target, scroll_step=1000, same_th=30, load_wait=400,
+                                     callbacks=callbacks, continuation_sel=rich_item_continuation_sel)
+        return await self.collect_loaded(selector=rich_item_sel, return_type=return_type, n_target=n_target, id_js=channel_video_id_js)
+
+
+__all__ = ['ChannelPageHandler', 'ChannelTab']
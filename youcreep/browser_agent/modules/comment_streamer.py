@@ -0,0 +1,91 @@
+import time
+import asyncio
+import concurrent.futures
+from typing import List, Set, Tuple
+
+from bs4 import BeautifulSoup
+
+from youcreep.common.pojo import VideoComment
+from youcreep.common.sink import RecordSink
+from youcreep.common.selectors.common_sels import comment_card_sel
+from youcreep.page_parser.video_page_parser import parse_comment_card
+from .page_handler import PageHandler
+
+
+def _parse_cards(htmls: List[str]) -> Tuple[List[VideoComment], int]:
+    comments, n_failed = [], 0
+    for comment_card in BeautifulSoup("".join(htmls), 'lxml').find_all(comment_card_sel):
+        # a card may be extracted half-rendered, it is skipped instead of failing the batch
+        try:
+            comments.append(parse_comment_card(comment_card))
+        except Exception:
+            n_failed += 1
+    return comments, n_failed
+
+
+class CommentStreamer:
+    """
+    Stream the comments to a `RecordSink` while scrolling, instead of waiting for the whole page to be downloaded.
+
+    Pass `streamer.stream_new` as a callback of `scroll_load_comment_cards`. On each scroll step, the comment cards
+    appeared since the last step are extracted, parsed in an executor(so the event loop driving the browser is not
+    blocked) and written to the sink. Comments are deduplicated by comment_id, so the same streamer can be reused
+    across retries of the same video. A card which cannot be parsed is skipped and counted as
+    `comment_cards_unparsed`.
+
+    Call `stream_new` once more after scrolling to catch the cards loaded by the last step.
+    """
+    def __init__(self,
+                 handler: PageHandler,
+                 sink: RecordSink,
+                 selector: str = comment_card_sel,
+                 executor: concurrent.futures.Executor = None):
+        """
+        :param handler: (PageHandler) the page handler of the current page
+        :param sink: (RecordSink) the sink receiving the comments as dicts
+        :param selector: (str) the selector of the comment cards
+        :param executor: (concurrent.futures.Executor) the executor parsing the cards, None for the default thread pool
+        """
+        self.handler = handler
+        self.sink = sink
+        self.selector = selector
+        self.executor = executor
+        self._seen_ids: Set[str] = set()
+        self._created_at = time.perf_counter()
+        self._first_record_at = None
+
+    async def stream_new(self) -> int:
+        """
+        Extract, parse and write the comment cards appeared since the last call.
+
+        :return: (int) the number of new comments written
+        """
+        htmls = await self.handler.extract_new_elements(self.selector)
+        if not htmls:
+            return 0
+        comments, n_failed = await asyncio.get_running_loop().run_in_executor(self.executor, _parse_cards, htmls)
+        if n_failed:
+            self.handler.metrics.incr("comment_cards_unparsed", n_failed)
+            self.handler.debug_tool.warn(f"Skipped {n_failed} comment cards which cannot be parsed")
+        records = []
+        for comment in comments:
+            if comment.comment_id in self._seen_ids:
+                continue
+            self._seen_ids.add(comment.comment_id)
+            records.append(comment.to_dict())
+        if records:
+            await self.sink.write(records)
+            if self._first_record_at is None:
+                self._first_record_at = time.perf_counter()
+                self.handler.metrics.observe("time_to_first_record", self._first_record_at - self._created_at)
+            self.handler.metrics.incr("records_streamed", len(records))
+        self.handler.debug_tool.debug(f"Streamed {len(records)} new comments, total: {self.n_streamed}")
+        return len(records)
+
+    @property
+    def n_streamed(self) -> int:
+        """the number of comments written to the sink"""
+        return len(self._seen_ids)
+
+
+__all__ = ['CommentStreamer']
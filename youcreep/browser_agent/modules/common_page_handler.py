@@ -1,8 +1,30 @@
+import os
 import pathlib
+from typing import Union
+
+import aiofiles
 
 from youcreep.common.selectors import common_sels
 from youcreep.browser_agent.modules.page_handler import PageHandler
 
+section_start_js = """([sectionSel, itemSel]) => {
+    const section = document.querySelector(sectionSel);
+    if (!section) return null;
+    window.__youcreepSectionItems = section.querySelectorAll(itemSel);
+    const tags = section.cloneNode(false).outerHTML;
+    const i = tags.lastIndexOf("</");
+    return {open: tags.slice(0, i), close: tags.slice(i), n: window.__youcreepSectionItems.length};
+}"""
+"""javascript function snapshotting the items of a section, returns the start/end tags of the section and the number of items"""
+
+section_chunk_js = """([start, size]) => {
+    const items = window.__youcreepSectionItems;
+    let html = "";
+    for (let i = start; i < Math.min(start + size, items.length); i++) html += items[i].outerHTML;
+    return html;
+}"""
+"""javascript function serializing the items [start, start + size) of the snapshot taken by `section_start_js`"""
+
 
 class CommonPageHandler(PageHandler):
     page_type = None
@@ -18,11 +40,38 @@ class CommonPageHandler(PageHandler):
         :return:
         """
         self.debug_tool.info(f"Searching {search_term}...")
-        await self.type_search(text=search_term)
-        self.debug_tool.info(f"Submit the search term...")
-        await self.agent.page.click(selector=common_sels.search_submit_sel)
+        await self.throttle()
+        with self.metrics.timer("search"):
+            await self.type_search(text=search_term)
+            self.debug_tool.info(f"Submit the search term...")
+            await self.agent.page.click(selector=common_sels.search_submit_sel)
         self.debug_tool.info(f"Searching {search_term} successfully")
 
+    async def dismiss_popups(self) -> int:
+        """
+        Dismiss the cookie consent dialog and the premium popup if they are shown.
+
+        :return: (int) the number of popups dismissed
+        """
+        n_dismissed = 0
+        for selector in (common_sels.consent_accept_btn_sel, common_sels.dismiss_btn_sel):
+            if await self.agent.page.is_visible(selector):
+                await self.agent.page.click(selector)
+                n_dismissed += 1
+                self.debug_tool.info(f"Popup dismissed: {selector}")
+        return n_dismissed
+
+    async def js_heap_size(self) -> Union[int, None]:
+        """
+        Get the used JS heap size of the renderer, it keeps growing as the page leaks.
+
+        :return: (int | None) the size in bytes, None if the browser does not expose `performance.memory`(non-Chromium)
+        """
+        heap_size = await self.agent.page.evaluate("() => performance.memory ? performance.memory.usedJSHeapSize : null")
+        if heap_size is not None:
+            self.metrics.set_gauge("js_heap_bytes", heap_size)
+        return heap_size
+
     async def type_search(self, text: str, clear_prev: bool = True):
         """
         Type text in the search bar.
@@ -46,7 +95,47 @@ class CommonPageHandler(PageHandler):
         :param encoding: (str) the file encoding, default is 'utf-8'
         :return:
         """
-        return await self.agent.page_interactor.download_html(file_path=file_path, encoding=encoding)
+        with self.metrics.timer("download_page"):
+            await self.agent.page_interactor.download_html(file_path=file_path, encoding=encoding)
+        self.metrics.incr("bytes_written", os.path.getsize(file_path))
+
+    async def download_section(self,
+                               file_path: (str, pathlib.Path),
+                               section_sel: str,
+                               item_sel: str,
+                               chunk_size: int = 100,
+                               encoding="utf-8") -> bool:
+        """
+        Download only a section of the current web page, e.g. the comment section, instead of the whole document.
+
+        The items(e.g. comment threads, video cards) in the section are serialized and written `chunk_size` at a time,
+        so neither the renderer nor Python holds a full copy of the page. The file keeps the section element and its
+        items, the nodes between them(headers, spinners, etc.) are dropped, which the parsers do not need.
+
+        :param file_path: (str, pathlib.Path) the file path to save the section
+        :param section_sel: (str) the selector of the section
+        :param item_sel: (str) the selector of the items in the section
+        :param chunk_size: (int) the number of items serialized per round trip
+        :param encoding: (str) the file encoding, default is 'utf-8'
+        :return: (bool) False if the section is not found, nothing is written then
+        """
+        with self.metrics.timer("download_section", section=section_sel):
+            section = await self.agent.page.evaluate(section_start_js, [section_sel, item_sel])
+            if section is None:
+                self.debug_tool.warn(f"Section {section_sel} is not found in {self.agent.page.url}")
+                return False
+            self.debug_tool.info(f"Downloading {section['n']} items of section {section_sel} to {file_path}...")
+            try:
+                async with aiofiles.open(file_path, mode='w', encoding=encoding) as f:
+                    await f.write(f'<!DOCTYPE html><html><head><meta charset="{encoding}"></head><body>{section["open"]}')
+                    for start in range(0, section["n"], chunk_size):
+                        await f.write(await self.agent.page.evaluate(section_chunk_js, [start, chunk_size]))
+                    await f.write(f'{section["close"]}</body></html>')
+            finally:
+                await self.agent.page.evaluate("() => { delete window.__youcreepSectionItems; }")
+        self.metrics.incr("bytes_written", os.path.getsize(file_path))
+        self.debug_tool.info(f"Downloaded section {section_sel} to {file_path}")
+        return True
 
 
 __all__ = ["CommonPageHandler"]
@@ -1,9 +1,125 @@
 import abc
-from typing import Union
+import enum
+import time
+import asyncio
+import collections
+from typing import Union, List, Callable
 
+import playwright.async_api
 from gembox.debug_utils import Debugger
 from wrightyrion.agent import Agent
+from youcreep.common.metrics import MetricsRecorder
 from ..url_parser import YoutubeUrlParser, YouTubeUrlType
+from ..rate_limiter import AdaptiveRateLimiter
+
+
+class ScrollLoadReturnType(enum.Enum):
+    """
+    What a `scroll_load_*` method of a page handler returns.
+
+    - `HANDLES`: the list of `ElementHandle`, each handle pins a remote object in the renderer until disposed
+    - `COUNT`: only the number of loaded cards, no handle is created
+    - `IDS`: the list of ids(e.g. comment_id, video_id) of loaded cards, no handle is created
+    """
+    HANDLES = "handles"
+    COUNT = "count"
+    IDS = "ids"
+
+
+class ScrollStopReason(enum.Enum):
+    """
+    Why a scroll loading loop stopped, see `PageHandler.last_stop_reason`.
+
+    - `THRESHOLD`: the target number of elements is loaded
+    - `NO_CONTINUATION`: the continuation item disappeared, i.e. everything is loaded
+    - `COUNT_UNCHANGED`: the number of elements stayed unchanged for `same_count_th` checks
+    - `TOP_UNCHANGED`: the scroll top stayed unchanged for `same_th` steps
+    - `LOW_YIELD`: fewer than `min_yield` new elements per second over the last `yield_window` seconds
+    - `TIME_BUDGET`: the deadline of the job is reached
+    """
+    THRESHOLD = "threshold"
+    NO_CONTINUATION = "no_continuation"
+    COUNT_UNCHANGED = "count_unchanged"
+    TOP_UNCHANGED = "top_unchanged"
+    LOW_YIELD = "low_yield"
+    TIME_BUDGET = "time_budget"
+
+
+class YieldMonitor:
+    """
+    The marginal yield(new elements per second) of a scroll loading loop over a sliding time window.
+
+    YouTube sometimes stops serving more elements without ending the list, a loop then keeps scrolling for nothing
+    until the count stays unchanged long enough. Stopping as soon as the yield falls below a floor cuts that tail.
+    """
+    def __init__(self, min_yield: float, window: float = 10.):
+        """
+        :param min_yield: (float) the floor of the yield, in elements per second
+        :param window: (float) the window in seconds, the yield is not judged before a full window is observed
+        """
+        self.min_yield = min_yield
+        self.window = window
+        self._history = collections.deque()
+
+    def observe(self, n_elements: int, now: float = None) -> Union[float, None]:
+        """
+        Record the current count.
+
+        :param n_elements: (int) the number of loaded elements
+        :param now: (float) the `time.perf_counter()` of the count, default is now
+        :return: (float | None) the yield over the window, None if a full window is not observed yet
+        """
+        now = time.perf_counter() if now is None else now
+        history = self._history
+        history.append((now, n_elements))
+        # keep the latest sample which is at least `window` seconds old as the start of the window
+        while len(history) > 1 and now - history[1][0] >= self.window:
+            history.popleft()
+        start_time, start_count = history[0]
+        if now - start_time < self.window:
+            return None
+        return (n_elements - start_count) / (now - start_time)
+
+    def is_low(self, n_elements: int, now: float = None) -> bool:
+        """
+        Record the current count and tell whether the yield is below `min_yield`.
+
+        :param n_elements: (int) the number of loaded elements
+        :param now: (float) the `time.perf_counter()` of the count, default is now
+        :return: (bool) True when a full window is observed and its yield is below `min_yield`
+        """
+        rate = self.observe(n_elements, now=now)
+        return rate is not None and rate < self.min_yield
+
+
+new_elements_js = """selector => {
+    const seenDict = window.__youcreepExtracted || (window.__youcreepExtracted = {});
+    const seen = seenDict[selector] || (seenDict[selector] = new WeakSet());
+    const htmls = [];
+    for (const elem of document.querySelectorAll(selector)) {
+        if (seen.has(elem)) continue;
+        seen.add(elem);
+        htmls.push(elem.outerHTML);
+    }
+    return htmls;
+}"""
+"""javascript function returning the outerHTML of the elements not extracted yet, see `PageHandler.extract_new_elements`"""
+
+new_ids_js = """selector => {
+    const seenDict = window.__youcreepIdsExtracted || (window.__youcreepIdsExtracted = {});
+    const seen = seenDict[selector] || (seenDict[selector] = new WeakSet());
+    const toId = ID_JS;
+    const ids = [];
+    for (const elem of document.querySelectorAll(selector)) {
+        if (seen.has(elem)) continue;
+        seen.add(elem);
+        const id = toId(elem);
+        if (id) ids.push(id);
+    }
+    return ids;
+}"""
+"""javascript function returning the ids of the elements not extracted yet, `ID_JS` is replaced by the id function, see
+`PageHandler.extract_new_ids`"""
 
 
 class PageHandler(abc.ABC):
@@ -14,10 +130,13 @@ class PageHandler(abc.ABC):
     """
     page_type: Union[None, YouTubeUrlType] = None
 
-    def __init__(self, agent: Agent, debug_tool: Debugger):
+    def __init__(self, agent: Agent, debug_tool: Debugger, metrics: MetricsRecorder = None, rate_limiter: AdaptiveRateLimiter = None):
         assert isinstance(agent, Agent), f"agent must be a `wrightyrion.agent.Agent`, but {type(agent)}"
         self.agent = agent
         self.debug_tool = debug_tool
+        self.metrics = metrics if metrics is not None else MetricsRecorder()
+        self.rate_limiter = rate_limiter if rate_limiter is not None else AdaptiveRateLimiter.shared()
+        self.last_stop_reason: Union[ScrollStopReason, None] = None
 
     def check_url(self, test_url: str = None) -> bool:
         """
@@ -34,5 +153,229 @@ class PageHandler(abc.ABC):
             return False
         return True
 
+    async def throttle(self, cost: float = 1.) -> None:
+        """
+        Wait for the rate limiter before talking to YouTube.
+
+        :param cost: (float) the number of tokens to take
+        :return: (None)
+        """
+        waited = await self.rate_limiter.acquire(cost=cost)
+        if waited > 0:
+            self.metrics.observe("rate_limit_wait", waited)
+
+    async def navigate(self, url: str) -> None:
+        """
+        Go to the url through the rate limiter, slow loads are reported to the rate limiter.
+
+        :param url: (str) the url
+        :return: (None)
+        """
+        await self.throttle()
+        page_type = YoutubeUrlParser.parse_url(url)["type"].value
+        start = time.perf_counter()
+        with self.metrics.timer("navigation", page_type=page_type):
+            await self.agent.browser_mgr.go(url)
+        self.rate_limiter.observe_load(time.perf_counter() - start)
+
+    async def count_selector(self, selector: str) -> int:
+        """
+        Count the elements matching the selector without creating any `ElementHandle`.
+
+        :param selector: (str) the selector
+        :return: (int) the number of matched elements
+        """
+        return await self.agent.page.locator(selector).count()
+
+    async def scroll_load_count(self,
+                                selector: str,
+                                threshold: int = None,
+                                scroll_step: int = 1000,
+                                load_wait: int = 400,
+                                same_th: int = 20,
+                                same_count_th: int = 10,
+                                count_check_interval: int = 5,
+                                callbacks: List[Callable] = None,
+                                continuation_sel: str = None,
+                                min_yield: float = None,
+                                yield_window: float = 10.,
+                                yield_counter: Callable = None,
+                                deadline: float = None) -> int:
+        """
+        Scroll down to load more elements matching `selector`, until no new content is loaded or `threshold` is reached.
+
+        The loop mirrors `PageInteractor.scroll_load_selector`, but only counts the elements, so no `ElementHandle` is
+        created in the renderer.
+
+        :param selector: (str) the selector of the elements to load
+        :param threshold: (int) stop scrolling after loading `threshold` elements, None for no limit
+        :param scroll_step: (int) the scroll step in pixels
+        :param load_wait: (int) the time to wait after each scroll step, in milliseconds
+        :param same_th: (int) stop scrolling when the scroll top is unchanged for `same_th` steps
+        :param same_count_th: (int) stop scrolling when the count is unchanged for `same_count_th` checks
+        :param count_check_interval: (int) count the elements every `count_check_interval` steps
+        :param callbacks: (List[Callable]) the callback functions to call after each scroll step
+        :param continuation_sel: (str) the selector of the continuation item(the spinner loading the next batch), stop
+            as soon as it disappears, instead of waiting for the count to stay unchanged. None to disable
+        :param min_yield: (float) stop when fewer than `min_yield` new elements per second are loaded over the last
+            `yield_window` seconds, None to disable
+        :param yield_window: (float) the window of `min_yield` in seconds
+        :param yield_counter: (Callable) a function(sync or async) returning the number of useful elements loaded so far,
+            e.g. the videos no other job has found, the yield of `min_yield` is measured on it. None for the number of
+            elements
+        :param deadline: (float) stop at this `time.perf_counter()`, e.g. the end of the wall-clock budget of the job,
+            None for no deadline
+        :return: (int) the number of loaded elements, the reason to stop is kept in `last_stop_reason`
+        """
+        self.last_stop_reason = None
+        self.debug_tool.info(f"Scrolling and loading {selector}... threshold: {threshold}, scroll_step: {scroll_step}, load_wait: {load_wait}, same_th: {same_th}")
+        with self.metrics.timer("scroll_load", selector=selector):
+            n_elements = await self._scroll_load_loop(selector=selector, threshold=threshold, scroll_step=scroll_step,
+                                                      load_wait=load_wait, same_th=same_th, same_count_th=same_count_th,
+                                                      count_check_interval=count_check_interval, callbacks=callbacks,
+                                                      continuation_sel=continuation_sel, min_yield=min_yield,
+                                                      yield_window=yield_window, yield_counter=yield_counter,
+                                                      deadline=deadline)
+        self.debug_tool.info(f"Loaded {n_elements} elements, stop reason: {self.last_stop_reason.value}")
+        return n_elements
+
+    async def _scroll_load_loop(self, selector: str, threshold: int, scroll_step: int, load_wait: int, same_th: int,
+                                same_count_th: int, count_check_interval: int, callbacks: List[Callable],
+                                continuation_sel: str = None, min_yield: float = None, yield_window: float = 10.,
+                                yield_counter: Callable = None, deadline: float = None) -> int:
+        same_top_count, last_top = 0, None
+        n_elements, same_count, check_counter = 0, 0, 0
+        yield_monitor = None if min_yield is None else YieldMonitor(min_yield=min_yield, window=yield_window)
+
+        while True:
+            if deadline is not None and time.perf_counter() >= deadline:
+                self.debug_tool.info(f"Time budget is used up, stopping. count: {n_elements}")
+                self._record_stop(ScrollStopReason.TIME_BUDGET, selector)
+                break
+            check_counter += 1
+            if check_counter >= count_check_interval:
+                check_counter = 0
+                n_current = await self.count_selector(selector)
+                if n_current > n_elements:
+                    same_count = 0
+                    self.rate_limiter.report_success()
+                else:
+                    if same_count == 0:
+                        # report once per stall, the end of the list looks the same as throttling
+                        self.rate_limiter.report_empty()
+                    same_count += 1
+                n_elements = n_current
+                self.debug_tool.debug(f"Loaded {n_elements} elements, threshold: {threshold}, same count: {same_count} / {same_count_th}")
+                if same_count >= same_count_th:
+                    self.debug_tool.info(f"Count unchanged for {same_count} checks, stopping. count: {n_elements}")
+                    self._record_stop(ScrollStopReason.COUNT_UNCHANGED, selector)
+                    break
+                if threshold is not None and n_elements >= threshold:
+                    self.debug_tool.info(f"Loaded {n_elements} elements, reached threshold {threshold}, stopping.")
+                    self._record_stop(ScrollStopReason.THRESHOLD, selector)
+                    break
+                if continuation_sel is not None and n_elements > 0 and await self.count_selector(continuation_sel) == 0:
+                    self.debug_tool.info(f"No continuation left, all {n_elements} elements are loaded, stopping.")
+                    self._record_stop(ScrollStopReason.NO_CONTINUATION, selector)
+                    break
+                if yield_monitor is not None and yield_monitor.is_low(await self._call(yield_counter) if yield_counter else n_elements):
+                    self.debug_tool.info(f"Less than {min_yield} elements per second over {yield_window}s, stopping. count: {n_elements}")
+                    self._record_stop(ScrollStopReason.LOW_YIELD, selector)
+                    break
+
+            await self.throttle()
+            await self.agent.page_interactor.scroll_by(0, scroll_step)
+            self.metrics.incr("scroll_steps", selector=selector)
+            for callback in (callbacks or []):
+                await self._call(callback)
+            await asyncio.sleep(load_wait / 1000.)
+
+            top = await self.agent.page_interactor.get_scroll_top()
+            if top == last_top:
+                same_top_count += 1
+                if same_top_count >= same_th:
+                    self.debug_tool.info(f"Top unchanged for {same_top_count} times, stopping.")
+                    self._record_stop(ScrollStopReason.TOP_UNCHANGED, selector)
+                    break
+            else:
+                same_top_count = 0
+            last_top = top
+
+        return await self.count_selector(selector)
+
+    @staticmethod
+    async def _call(function: Callable):
+        if asyncio.iscoroutinefunction(function):
+            return await function()
+        return function()
+
+    def _record_stop(self, reason: ScrollStopReason, selector: str) -> None:
+        self.last_stop_reason = reason
+        self.metrics.incr("scroll_stop", reason=reason.value, selector=selector)
+
+    async def extract_new_elements(self, selector: str) -> List[str]:
+        """
+        Get the outerHTML of the elements matching `selector` which have not been extracted from the current page yet.
+
+        The extracted elements are remembered in the page(a `WeakSet` per selector), so no `ElementHandle` is created
+        and each element is returned only once.
+
+        :param selector: (str) the selector
+        :return: (List[str]) the outerHTML of the new elements, in document order
+        """
+        return await self.agent.page.evaluate(new_elements_js, selector)
+
+    async def extract_new_ids(self, selector: str, id_js: str) -> List[str]:
+        """
+        Get the ids of the elements matching `selector` which have not been extracted from the current page yet, like
+        `extract_new_elements` but without serializing the elements.
+
+        :param selector: (str) the selector
+        :param id_js: (str) javascript function mapping an element to its id, elements without id are skipped
+        :return: (List[str]) the ids of the new elements, in document order
+        """
+        return await self.agent.page.evaluate(new_ids_js.replace("ID_JS", id_js), selector)
+
+    async def collect_loaded(self,
+                             selector: str,
+                             return_type: ScrollLoadReturnType,
+                             n_target: int = None,
+                             id_js: str = None) -> Union[int, List[str], List[playwright.async_api.ElementHandle]]:
+        """
+        Collect the loaded elements in the form of `return_type`.
+
+        :param selector: (str) the selector of the loaded elements
+        :param return_type: (ScrollLoadReturnType) what to return
+        :param n_target: (int) keep at most `n_target` elements, None for all
+        :param id_js: (str) javascript function mapping an element to its id, required by `ScrollLoadReturnType.IDS`
+        :return: (int | List[str] | List[ElementHandle]) the count, ids or handles of the loaded elements
+        """
+        if return_type == ScrollLoadReturnType.COUNT:
+            n_elements = await self.count_selector(selector)
+            return n_elements if n_target is None else min(n_elements, n_target)
+        if return_type == ScrollLoadReturnType.IDS:
+            assert id_js is not None, f"id_js is required when return_type is {return_type}"
+            ids = await self.agent.page.eval_on_selector_all(selector, f"elems => elems.map({id_js})")
+            return ids if n_target is None else ids[:n_target]
+        handles = await self.agent.page_interactor.get_elements(selector=selector)
+        self.metrics.add_gauge("handles_alive", len(handles))
+        if n_target is not None:
+            await self.dispose_handles(handles[n_target:])
+            handles = handles[:n_target]
+        return handles
+
+    async def dispose_handles(self, handles: List[playwright.async_api.ElementHandle]) -> None:
+        """
+        Dispose element handles explicitly, so that the renderer can release the pinned remote objects.
+
+        :param handles: (List[ElementHandle]) the handles to dispose
+        :return: (None)
+        """
+        if not handles:
+            return
+        await asyncio.gather(*[handle.dispose() for handle in handles], return_exceptions=True)
+        self.metrics.add_gauge("handles_alive", -len(handles))
+        self.debug_tool.debug(f"Disposed {len(handles)} element handles")
+
 
-__all__ = ['PageHandler']
+__all__ = ['PageHandler', 'ScrollLoadReturnType', 'ScrollStopReason', 'YieldMonitor']
@@ -1,76 +1,32 @@
 import asyncio
-import enum
 import playwright.async_api
-from typing import List, Callable
+from typing import List, Callable, Union
 
 from youcreep.browser_agent.url_parser import YouTubeUrlType
-from youcreep.browser_agent.modules.page_handler import PageHandler
+from youcreep.browser_agent.modules.page_handler import PageHandler, ScrollLoadReturnType
+from youcreep.common.seen_set import SeenSet
 from youcreep.common.selectors.common_sels import video_card_sel
+from youcreep.common.search_filter import FilterSection, FilterPublishDateOption, FilterTypeOption, FilterLengthOption, FilterFunctionOption, FilterOrderByOption, SECTION_OPTION_DICT
 from youcreep.common.selectors.search_result_page import filter_toggle_sel, filter_section_sel, filter_option_sel
 
 
-class FilterSection(enum.Enum):
-    PUBLISH_DATE = 0
-    TYPE = 1
-    LENGTH = 2
-    FUNCTION = 3
-    ORDER_BY = 4
-
-
-class FilterPublishDateOption(enum.Enum):
-    LAST_HOUR = 0
-    TODAY = 1
-    THIS_WEEK = 2
-    THIS_MONTH = 3
-    THIS_YEAR = 4
-
-
-class FilterTypeOption(enum.Enum):
-    VIDEO = 0
-    CHANNEL = 1
-    PLAYLIST = 2
-    MOVIE = 3
-
-
-class FilterLengthOption(enum.Enum):
-    SHORT = 0
-    MEDIUM = 1
-    LONG = 2
-
-
-class FilterFunctionOption(enum.Enum):
-    LIVE = 0
-    _4K = 1
-    HD = 2
-    SUBTITLES = 3
-    CREATIVE_COMMONS = 4
-    _360 = 5
-    VR180 = 6
-    _3D = 7
-    HDR = 8
-    LOCATION = 9
-    PURCHASES = 10
-
-
-class FilterOrderByOption(enum.Enum):
-    RELEVANCE = 0
-    UPLOAD_DATE = 1
-    VIEW_COUNT = 2
-    RATING = 3
-
-
-SECTION_OPTION_DICT = {
-    FilterSection.PUBLISH_DATE: FilterPublishDateOption,
-    FilterSection.TYPE: FilterTypeOption,
-    FilterSection.LENGTH: FilterLengthOption,
-    FilterSection.FUNCTION: FilterFunctionOption,
-    FilterSection.ORDER_BY: FilterOrderByOption
-}
+video_id_js = """video_card => {
+    const link = video_card.querySelector('a#video-title');
+    if (!link) return null;
+    const url = new URL(link.href, location.href);
+    return url.searchParams.get('v') || url.pathname.split('/').pop();
+}"""
+"""javascript function mapping a video card to its video_id, consistent with `YoutubeUrlParser`"""
 
 
 class SearchPageHandler(PageHandler):
     page_type = YouTubeUrlType.SEARCH
 
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        self.last_new_ids: List[str] = []
+        """the video ids not in `seen` found by the last `scroll_load_video_cards`"""
+
     async def filter_search_result(self, filter_section: FilterSection, filter_option) -> None:
         """
         Filter the search result.
@@ -102,7 +58,13 @@ class SearchPageHandler(PageHandler):
         # 4. 等待一小会
         await asyncio.sleep(0.5)
 
-    async def scroll_load_video_cards(self, n_target: int, callbacks: List[Callable] = None) -> List[playwright.async_api.ElementHandle]:
+    async def scroll_load_video_cards(self,
+                                      n_target: int,
+                                      callbacks: List[Callable] = None,
+                                      return_type: ScrollLoadReturnType = ScrollLoadReturnType.HANDLES,
+                                      seen: SeenSet = None,
+                                      min_new_yield: float = None,
+                                      yield_window: float = 10.) -> Union[int, List[str], List[playwright.async_api.ElementHandle]]:
         """
         Scroll down to load more video cards.
 
@@ -112,11 +74,30 @@ class SearchPageHandler(PageHandler):
 
         :param n_target: (int) The target number of video cards to load.
         :param callbacks: (List[Callable]) The callback function to call after each scroll step.
-        :return: (List[ElementHandle]) The list of video card elements.
+        :param return_type: (ScrollLoadReturnType) Return the handles, the count or the video ids of the loaded cards.
+        :param seen: (SeenSet) the video ids found so far, shared by concurrent searches. The loaded video ids not in it
+            are kept in `last_new_ids`, `seen` itself is left unchanged: add them once the page is saved, so that the
+            videos of a failed search are not taken as found
+        :param min_new_yield: (float) stop when fewer than `min_new_yield` videos per second are new to `seen`, over the
+            last `yield_window` seconds. None to disable
+        :param yield_window: (float) the window of `min_new_yield` in seconds
+        :return: (int | List[str] | List[ElementHandle]) The loaded video cards in the form of `return_type`.
         """
-        video_list = await self.agent.page_interactor.scroll_load_selector(selector=video_card_sel, threshold=n_target, scroll_step=1000, same_th=30, load_wait=400, scroll_step_callbacks=callbacks)
-
-        if n_target is not None:
-            video_list = video_list[:n_target]
-
-        return video_list
+        assert min_new_yield is None or seen is not None, "min_new_yield requires a seen set"
+        self.last_new_ids = []
+        own_ids = set()
+
+        async def count_new() -> int:
+            for video_id in await self.extract_new_ids(video_card_sel, video_id_js):
+                if video_id not in own_ids and video_id not in seen:
+                    own_ids.add(video_id)
+                    self.last_new_ids.append(video_id)
+            return len(self.last_new_ids)
+
+        await self.scroll_load_count(selector=video_card_sel, threshold=n_target, scroll_step=1000, same_th=30, load_wait=400, callbacks=callbacks,
+                                     min_yield=min_new_yield, yield_window=yield_window, yield_counter=None if seen is None else count_new)
+        if seen is not None:
+            # the cards loaded after the last count
+            await count_new()
+            self.metrics.incr("videos_new", len(self.last_new_ids), page_type=self.page_type.value)
+        return await self.collect_loaded(selector=video_card_sel, return_type=return_type, n_target=n_target, id_js=video_id_js)
@@ -1,15 +1,27 @@
+import time
 import asyncio
+import playwright.async_api
+from typing import List, Union, Callable
 
 from gembox.re_utils import search_float_num
 
 from youcreep.browser_agent.url_parser import YouTubeUrlType
-from youcreep.browser_agent.modules.page_handler import PageHandler
-from youcreep.common.selectors.short_page_sels import comment_btn_sel, more_reply_btn_sel, comment_count_sel, like_count_sel, comment_sel
+from youcreep.browser_agent.modules.page_handler import PageHandler, ScrollLoadReturnType, ScrollStopReason, YieldMonitor
+from youcreep.browser_agent.modules.video_page_handler import comment_id_js
+from youcreep.common.selectors.common_sels import thread_head_comment_card_sel
+from youcreep.common.selectors.short_page_sels import comment_btn_sel, more_reply_btn_sel, comment_count_sel, like_count_sel, comment_sel, \
+    active_reel_sel, next_short_btn_sel, comment_panel_close_btn_sel
 
 
 class ShortPageHandler(PageHandler):
     page_type = YouTubeUrlType.SHORT
 
+    _scope: Union[str, None] = None
+    """the selector of the short the other selectors are scoped to, set once the player has swiped to another short"""
+
+    def _sel(self, selector: str) -> str:
+        return selector if self._scope is None else f"{self._scope} {selector}"
+
     async def go_short_page(self, url: str):
         """
         Go to a short page, and initialize the page.
@@ -20,13 +32,59 @@ class ShortPageHandler(PageHandler):
         assert self.check_url(test_url=url) is True
 
         self.debug_tool.info(f"Going to short page {url}...")
-        await self.agent.browser_mgr.go(url)
+        await self.navigate(url)
 
         # Initialization at a short page
         self.debug_tool.info(f"Waiting for comment button to appear...")
         await self.agent.page.wait_for_selector(comment_btn_sel)
+        self._scope = None
         self.debug_tool.info(f"Go to short page {url} successfully")
 
+    async def swipe_next_short(self, timeout: float = 10000) -> Union[str, None]:
+        """
+        Advance the shorts player to the next short in-app, without reloading the page.
+
+        The player keeps the shorts visited before in the DOM, so the selectors of the handler are scoped to the active
+        short afterwards, until `go_short_page` is called again.
+
+        :param timeout: (float) how long to wait for the next short in milliseconds
+        :return: (str | None) the url of the next short, None if the player did not advance(e.g. the end of the feed)
+        """
+        assert self.check_url() is True
+
+        previous_url = self.agent.page.url
+        await self.throttle()
+        with self.metrics.timer("short_swipe"):
+            # Step 1: 点击下一个按钮, 按钮不可见时用方向键
+            if await self.agent.page.is_visible(next_short_btn_sel):
+                await self.agent.page.click(selector=next_short_btn_sel)
+            else:
+                await self.agent.page.keyboard.press("ArrowDown")
+
+            # Step 2: 等待 url 变为下一个 short
+            try:
+                await self.agent.page.wait_for_function("previous => location.href !== previous && location.pathname.startsWith('/shorts/')",
+                                                        arg=previous_url, timeout=timeout)
+            except playwright.async_api.TimeoutError:
+                self.debug_tool.warn(f"The shorts player did not advance from {previous_url}")
+                return None
+            await self.agent.page.wait_for_selector(f"{active_reel_sel} {comment_btn_sel}", timeout=timeout)
+        self._scope = active_reel_sel
+        self.metrics.incr("short_swipes")
+        self.debug_tool.info(f"Swiped to short {self.agent.page.url}")
+        return self.agent.page.url
+
+    async def close_comment_panel(self) -> None:
+        """
+        Close the comment panel of the current short, if it is open.
+
+        :return: (None)
+        """
+        close_btn_sel = self._sel(comment_panel_close_btn_sel)
+        if await self.agent.page.is_visible(close_btn_sel):
+            await self.agent.page.click(selector=close_btn_sel)
+            self.debug_tool.info(f"Comment panel is closed")
+
     async def open_comment_panel(self):
         """
         Open the comment panel on the sideline of short video.
@@ -36,8 +94,8 @@ class ShortPageHandler(PageHandler):
         assert self.check_url() is True
 
         self.debug_tool.info(f"Opening comment panel...")
-        if await self.agent.page.is_enabled(comment_btn_sel):
-            await self.agent.page.click(selector=comment_btn_sel)
+        if await self.agent.page.is_enabled(self._sel(comment_btn_sel)):
+            await self.agent.page.click(selector=self._sel(comment_btn_sel))
             self.debug_tool.info(f"Opening comment panel successfully")
             return True
         else:
@@ -50,11 +108,12 @@ class ShortPageHandler(PageHandler):
 
         :return: (None)
         """
-        btns = await self.agent.page.query_selector_all(more_reply_btn_sel)
+        btns = await self.agent.page.query_selector_all(self._sel(more_reply_btn_sel))
         self.debug_tool.info(f"Found {len(btns)} show_more_reply_btn...")
         for i, btn in enumerate(btns[-20:]):
             if await btn.is_visible():
                 await btn.click()
+        await self.dispose_handles(btns)
 
     async def parse_meta_info(self):
         """
@@ -62,10 +121,14 @@ class ShortPageHandler(PageHandler):
 
         :return: (dict) {'comment_count': str, 'like_count': str }
         """
+        with self.metrics.timer("parse_meta_info", page_type=self.page_type.value):
+            return await self._parse_meta_info()
+
+    async def _parse_meta_info(self) -> dict:
         # If exists comment_count_sel, parse the comment_count and like_count
 
-        if await self.agent.page.is_visible(comment_count_sel) is True:
-            comment_count_str = await (await self.agent.page.query_selector(comment_count_sel)).text_content()
+        if await self.agent.page.is_visible(self._sel(comment_count_sel)) is True:
+            comment_count_str = await (await self.agent.page.query_selector(self._sel(comment_count_sel))).text_content()
             try:
                 comment_count = search_float_num(comment_count_str)
                 if '万' in comment_count_str or '萬' in comment_count_str:
@@ -77,9 +140,9 @@ class ShortPageHandler(PageHandler):
         else:
             self.debug_tool.warn(f"Cannot find comment_count_sel, set to 0")
             comment_count = 0
-        if await self.agent.page.is_visible(comment_count_sel) is True:
+        if await self.agent.page.is_visible(self._sel(comment_count_sel)) is True:
             try:
-                like_count_str = await (await self.agent.page.query_selector(like_count_sel)).text_content()
+                like_count_str = await (await self.agent.page.query_selector(self._sel(like_count_sel))).text_content()
                 like_count = search_float_num(like_count_str)
                 if '万' in like_count_str or '萬' in like_count_str:
                     like_count *= 10000
@@ -98,36 +161,85 @@ class ShortPageHandler(PageHandler):
             'like_count': like_count,
         }
 
-    async def scroll_load_comment_cards(self, n_target: int = None):
+    async def scroll_load_comment_cards(self,
+                                        n_target: int = None,
+                                        callbacks: List[Callable] = None,
+                                        return_type: ScrollLoadReturnType = ScrollLoadReturnType.HANDLES,
+                                        replies: bool = True,
+                                        min_yield: float = None,
+                                        deadline: float = None) -> Union[int, List[str], List[playwright.async_api.ElementHandle]]:
+        """
+        Open the comment panel and load more comment cards.
+
+        :param n_target: (int) The target number of comment cards to load.
+        :param callbacks: (List[Callable]) The callback function to call after each loading step.
+        :param return_type: (ScrollLoadReturnType) Return the handles, the count or the comment ids of the loaded cards.
+        :param replies: (bool) whether to expand and load the replies, if False, only the head comments are loaded
+        :param min_yield: (float) stop when fewer than `min_yield` comments per second are loaded, None to disable
+        :param deadline: (float) stop at this `time.perf_counter()`, None for no deadline
+        :return: (int | List[str] | List[ElementHandle]) The loaded comment cards in the form of `return_type`.
+        """
         # Step 1: 打开评论面板
+        self.last_stop_reason = None
         if not await self.open_comment_panel():
             self.debug_tool.info(f"Comment panel is disabled, skip loading comments.")
-            return []
-        await self.agent.page.wait_for_selector(comment_sel)
+            return 0 if return_type == ScrollLoadReturnType.COUNT else []
+        await self.agent.page.wait_for_selector(self._sel(comment_sel))
 
         # Step 2: 点击加载更多按钮
-        n_comments, comments = 0, []
+        with self.metrics.timer("scroll_load", selector=comment_sel):
+            n_loaded = await self._scroll_load_comments(n_target=n_target, replies=replies, callbacks=callbacks,
+                                                        min_yield=min_yield, deadline=deadline)
+
+        self.debug_tool.info(f"Found {n_loaded} comments in the video page, n_target: {n_target}, stop reason: {self.last_stop_reason.value}.")
+        self.metrics.incr("comments_loaded", n_loaded, page_type=self.page_type.value)
+        card_sel = self._sel(comment_sel if replies else thread_head_comment_card_sel)
+        return await self.collect_loaded(selector=card_sel, return_type=return_type, id_js=comment_id_js)
+
+    async def _scroll_load_comments(self, n_target: int = None, replies: bool = True, callbacks: List[Callable] = None,
+                                    min_yield: float = None, deadline: float = None) -> int:
+        card_sel = self._sel(comment_sel if replies else thread_head_comment_card_sel)
+        n_comments, n_loaded = 0, 0
         same_count, same_th = 0, 5
+        yield_monitor = None if min_yield is None else YieldMonitor(min_yield=min_yield)
 
         while True:
-            self.debug_tool.info(f"Clicking all show_more_reply_btn...")
+            if deadline is not None and time.perf_counter() >= deadline:
+                self.debug_tool.info(f"Time budget is used up, total {n_loaded} comments, n_target: {n_target}")
+                self._record_stop(ScrollStopReason.TIME_BUDGET, card_sel)
+                break
             await asyncio.sleep(0.6)
-            await self.show_more_replies()
-            comments = await self.agent.page.query_selector_all(comment_sel)
-            self.debug_tool.info(f"Loaded {len(comments)} comments, previous value: {n_comments}, n_target: {n_target}, same_count: {same_count}, same_th: {same_th}")
-            if len(comments) == n_comments:
+            await self.throttle()
+            if replies:
+                self.debug_tool.info(f"Clicking all show_more_reply_btn...")
+                await self.show_more_replies()
+            n_loaded = await self.count_selector(card_sel)
+            self.debug_tool.info(f"Loaded {n_loaded} comments, previous value: {n_comments}, n_target: {n_target}, same_count: {same_count}, same_th: {same_th}")
+            if n_loaded == n_comments:
+                if same_count == 0:
+                    self.rate_limiter.report_empty()
                 same_count += 1
-            if len(comments) > n_target or same_count >= same_th:
-                self.debug_tool.info(f"Loaded enough comments, total {len(comments)} comments, n_target: {n_target}, same_count: {same_count}, same_th: {same_th}")
+            else:
+                self.rate_limiter.report_success()
+            if (n_target is not None and n_loaded > n_target) or same_count >= same_th:
+                self.debug_tool.info(f"Loaded enough comments, total {n_loaded} comments, n_target: {n_target}, same_count: {same_count}, same_th: {same_th}")
+                self._record_stop(ScrollStopReason.COUNT_UNCHANGED if same_count >= same_th else ScrollStopReason.THRESHOLD, card_sel)
                 break
-            n_comments = len(comments)
+            if yield_monitor is not None and yield_monitor.is_low(n_loaded):
+                self.debug_tool.info(f"Less than {min_yield} comments per second, stopping. total {n_loaded} comments, n_target: {n_target}")
+                self._record_stop(ScrollStopReason.LOW_YIELD, card_sel)
+                break
+            n_comments = n_loaded
             if n_comments > 0:
-                last_comment = comments[-1]
                 self.debug_tool.info(f"Scrolling to last comment...")
-                await last_comment.scroll_into_view_if_needed()
-
-        self.debug_tool.info(f"Found {len(comments)} comments in the video page, n_target: {n_target}.")
-        return comments
+                await self.agent.page.eval_on_selector_all(card_sel, "elems => elems[elems.length - 1].scrollIntoView()")
+            for callback in (callbacks or []):
+                if asyncio.iscoroutinefunction(callback):
+                    await callback()
+                else:
+                    callback()
+
+        return n_loaded
 
 
 __all__ = ['ShortPageHandler']
@@ -1,13 +1,54 @@
+import time
 import asyncio
 import playwright.async_api
-from typing import List, Callable
+from typing import List, Callable, Union
 
 from gembox.re_utils import search_comma_sep_num
 
-from youcreep.browser_agent.modules.page_handler import PageHandler
+from youcreep.browser_agent.modules.page_handler import PageHandler, ScrollLoadReturnType
 from youcreep.browser_agent.url_parser import YouTubeUrlType
-from youcreep.common.selectors.common_sels import dismiss_btn_sel, comment_card_sel
-from youcreep.common.selectors.video_page_sels import view_count_sel, comment_count_sel
+from youcreep.common.selectors.common_sels import dismiss_btn_sel, comment_card_sel, head_comment_card_sel, thread_head_comment_card_sel
+from youcreep.common.selectors.video_page_sels import view_count_sel, comment_count_sel, more_replies_btn_sel, reply_continuation_btn_sel, \
+    playability_error_reason_sel, comments_disabled_msg_sel
+
+comment_id_js = """comment_card => {
+    const link = comment_card.querySelector('#header-author yt-formatted-string.published-time-text a');
+    const lc = link ? new URL(link.href, location.href).searchParams.get('lc') : null;
+    return lc ? lc.split('.').pop() : null;
+}"""
+"""javascript function mapping a comment card to its comment_id, consistent with `YoutubeUrlParser`"""
+
+expand_replies_js = f"""([maxClicks, retryAfter]) => {{
+    const states = window.__youcreepReplyStates || (window.__youcreepReplyStates = new WeakMap());
+    const now = Date.now();
+    let clicked = 0, pending = 0;
+    for (const thread of document.querySelectorAll("{head_comment_card_sel}")) {{
+        let state = states.get(thread);
+        if (state && state.done) continue;
+        // the "more replies" button stays in the DOM hidden once clicked, take the first visible button of either kind
+        const button = [...thread.querySelectorAll("{more_replies_btn_sel}, {reply_continuation_btn_sel}")].find(b => b.offsetParent !== null);
+        const nReplies = thread.querySelectorAll("ytd-comment-replies-renderer {comment_card_sel}").length;
+        if (!button) {{
+            // done once no button is visible and the reply count stopped changing. A thread whose click loaded
+            // nothing yet may still be waiting for its continuation
+            if (!state || (state.nReplies === nReplies && (state.loaded || now - state.clickedAt > retryAfter))) {{
+                states.set(thread, {{done: true}});
+                continue;
+            }}
+            if (state.nReplies !== nReplies) states.set(thread, {{...state, nReplies: nReplies, loaded: true}});
+            pending++;
+            continue;
+        }}
+        pending++;
+        if (state && !state.loaded && state.nReplies === nReplies && now - state.clickedAt < retryAfter) continue;
+        if (clicked >= maxClicks) continue;
+        button.click();
+        states.set(thread, {{done: false, nReplies: nReplies, clickedAt: now, loaded: false}});
+        clicked++;
+    }}
+    return {{clicked: clicked, pending: pending - clicked}};
+}}"""
+"""javascript function clicking the reply buttons of the threads not fully expanded, see `VideoPageHandler.expand_all_replies`"""
 
 
 class VideoPageHandler(PageHandler):
@@ -25,15 +66,16 @@ class VideoPageHandler(PageHandler):
             return
 
         self.debug_tool.info(f"Going to video page {url}...")
-        await self.agent.browser_mgr.go(url)
+        await self.navigate(url)
 
         # Initialization at a video page
         self.debug_tool.info(f"Initial Scrolling to load meta info")
         initial_scroll, scroll_step = 6, 500
-        for _ in range(initial_scroll):
-            # scroll by `scroll_step`
-            await asyncio.sleep(0.6)
-            await self.agent.page.evaluate(f"window.scrollBy(0, {scroll_step})")
+        with self.metrics.timer("initial_scroll"):
+            for _ in range(initial_scroll):
+                # scroll by `scroll_step`
+                await asyncio.sleep(0.6)
+                await self.agent.page.evaluate(f"window.scrollBy(0, {scroll_step})")
         self.debug_tool.info(f"Initial Scrolling finished after {initial_scroll} times scrolling, step: {scroll_step}")
 
         await asyncio.sleep(1)
@@ -49,21 +91,36 @@ class VideoPageHandler(PageHandler):
             await self.agent.page.click(dismiss_btn_sel)
             self.debug_tool.info(f"Dismiss button clicked")
 
-    async def scroll_load_comment_cards(self, n_target: int, callbacks: List[Callable] = None) -> List[playwright.async_api.ElementHandle]:
+    async def scroll_load_comment_cards(self,
+                                        n_target: int,
+                                        callbacks: List[Callable] = None,
+                                        return_type: ScrollLoadReturnType = ScrollLoadReturnType.HANDLES,
+                                        replies: bool = True,
+                                        min_yield: float = None,
+                                        deadline: float = None) -> Union[int, List[str], List[playwright.async_api.ElementHandle]]:
         """
         Scroll down to load more comment cards.
 
+        With `replies=False`, no reply is expanded and only the head comments are counted and returned, which is much
+        faster when the replies are not needed.
+
         @in_page: video page
 
         @out_page: video page
 
         :param n_target: (int) The target number of comment cards to load.
         :param callbacks: (List[Callable]) The callback function to call after each scroll step.
-        :return: (List[ElementHandle]) The list of comment card elements.
+        :param return_type: (ScrollLoadReturnType) Return the handles, the count or the comment ids of the loaded cards.
+        :param replies: (bool) whether to expand and load the replies
+        :param min_yield: (float) stop when fewer than `min_yield` comments per second are loaded, None to disable
+        :param deadline: (float) stop at this `time.perf_counter()`, None for no deadline
+        :return: (int | List[str] | List[ElementHandle]) The loaded comment cards in the form of `return_type`.
         """
         # 0. Step 0: 参数初始化
         callbacks = [] if callbacks is None else list(callbacks)
-        callbacks.extend([self.expand_all_replies])
+        if replies:
+            callbacks.append(self.expand_all_replies)
+        card_sel = comment_card_sel if replies else thread_head_comment_card_sel
 
         # 1. Step 1: 滚动到顶部
         self.debug_tool.debug(f"Scrolling to top...")
@@ -71,13 +128,34 @@ class VideoPageHandler(PageHandler):
         await asyncio.sleep(0.5)
 
         # 2. Step 2: 持续滚动加载 comments
-        comments = await self.agent.page_interactor.scroll_load_selector(selector=comment_card_sel, threshold=n_target, scroll_step=1000, same_th=20, load_wait=400, scroll_step_callbacks=callbacks)
+        start_time = time.perf_counter()
+        await self.scroll_load_count(selector=card_sel, threshold=n_target, scroll_step=1000, same_th=20, load_wait=400, callbacks=callbacks,
+                                     min_yield=min_yield, deadline=deadline)
+        if replies:
+            # 2.(1) 展开滚动结束时仍未展开的 replies
+            await self._expand_pending_replies()
+        comments = await self.collect_loaded(selector=card_sel, return_type=return_type, n_target=n_target, id_js=comment_id_js)
+
+        n_comments = comments if return_type == ScrollLoadReturnType.COUNT else len(comments)
+        self.metrics.incr("comments_loaded", n_comments, page_type=self.page_type.value)
+        self.metrics.set_gauge("comments_per_second", n_comments / max(time.perf_counter() - start_time, 1e-6), page_type=self.page_type.value)
+        self.debug_tool.info(f"Found {n_comments} comments in the video page, n_target: {n_target}.")
+        return comments
 
-        if n_target is not None:
-            comments = comments[:n_target]
+    async def _expand_pending_replies(self, max_rounds: int = 10, load_wait: int = 600) -> None:
+        """
+        Keep expanding after scrolling stops, until no thread is pending or `max_rounds` is reached.
 
-        self.debug_tool.info(f"Found {len(comments)} comments in the video page, n_target: {n_target}.")
-        return comments
+        :param max_rounds: (int) the maximum number of rounds
+        :param load_wait: (int) the time to wait after each round, in milliseconds
+        :return: (None)
+        """
+        for _ in range(max_rounds):
+            await self.throttle()
+            result = await self.expand_all_replies()
+            if result["clicked"] == 0 and result["pending"] == 0:
+                break
+            await asyncio.sleep(load_wait / 1000.)
 
     async def parse_meta_info(self) -> dict:
         """
@@ -85,6 +163,10 @@ class VideoPageHandler(PageHandler):
 
         :return: (dict) {'view_count': int, 'comment_count': int }
         """
+        with self.metrics.timer("parse_meta_info", page_type=self.page_type.value):
+            return await self._parse_meta_info()
+
+    async def _parse_meta_info(self) -> dict:
         try:
             view_count_elem = await self.agent.page_interactor.get_element(selector=view_count_sel)
             view_count_str = (await view_count_elem.text_content()).strip()
@@ -105,32 +187,47 @@ class VideoPageHandler(PageHandler):
             "comment_count": comment_count,
         }
 
-    async def expand_all_replies(self):
+    async def unavailable_reason(self) -> Union[str, None]:
         """
-        Expand all replies.
+        Get the reason shown instead of the player, e.g. "Video unavailable" or "This video is private".
 
-        The native javascript code generally:
+        :return: (str | None) the reason, None if the video is available
+        """
+        if not await self.agent.page.is_visible(playability_error_reason_sel):
+            return None
+        return (await self.agent.page.text_content(playability_error_reason_sel) or "").strip()
+
+    async def comments_disabled(self) -> Union[str, None]:
+        """
+        Get the message shown in the comment section when the comments are turned off.
 
-        - get the last 10 `more_reply_btns` and `more_btns`
-        - click on each of them
+        :return: (str | None) the message, None if the comments are not turned off
         """
-        self.debug_tool.debug(f"Expanding all replies...")
-        js_code = '''() => {
-            let more_reply_btns = Array.from(document.querySelectorAll("#more-replies > yt-button-shape > button > yt-touch-feedback-shape > div[aria-hidden='true']")).slice(-20);
-            let more_btns = Array.from(document.querySelectorAll("#button > ytd-button-renderer > yt-button-shape > button > yt-touch-feedback-shape > div")).slice(-20);
+        if not await self.agent.page.is_visible(comments_disabled_msg_sel):
+            return None
+        return (await self.agent.page.text_content(comments_disabled_msg_sel) or "").strip()
 
-            console.log(`more_reply_btns.length: ${more_reply_btns.length}`);
-            console.log(`more_btns.length: ${more_btns.length}`);
+    async def expand_all_replies(self, max_clicks: int = 20, retry_after: int = 5000) -> dict:
+        """
+        Expand the replies of the comment threads which are not fully expanded yet.
 
-            for(const more_reply_btn of more_reply_btns) {
-                more_reply_btn.click();
-            }
-            for(const more_btn of more_btns) {
-                more_btn.click();
-            }
-        }'''
-        await self.agent.page_interactor.page.evaluate(js_code)
-        self.debug_tool.debug(f"Expanding all replies finished")
+        The expansion state of every thread is kept in the page(a `WeakMap` from thread to state), so that:
 
+        - a thread is clicked again only after its previous click loaded new replies, or `retry_after` ms passed
+        - the "Show more replies" continuation of an expanded thread is followed until it disappears
+        - fully expanded threads are skipped cheaply on later calls
+
+        At most `max_clicks` threads are clicked per call, their replies load concurrently.
+
+        :param max_clicks: (int) the maximum number of threads to click in one call
+        :param retry_after: (int) click a thread again if its last click loaded nothing after `retry_after` milliseconds
+        :return: (dict) {'clicked': int, 'pending': int}, `pending` is the number of threads still waiting for expansion
+        """
+        self.debug_tool.debug(f"Expanding replies...")
+        with self.metrics.timer("expand_all_replies"):
+            result = await self.agent.page.evaluate(expand_replies_js, [max_clicks, retry_after])
+        self.metrics.incr("reply_clicks", result["clicked"])
+        self.debug_tool.debug(f"Expanding replies finished, clicked: {result['clicked']}, pending: {result['pending']}")
+        return result
 
 __all__ = ['VideoPageHandler']
@@ -0,0 +1,143 @@
+import time
+import asyncio
+import threading
+
+
+class AdaptiveRateLimiter:
+    """
+    A token-bucket rate limiter whose rate adapts to the signals observed while crawling.
+
+    Every navigation and scroll step takes a token before talking to YouTube. The rate follows AIMD(additive increase,
+    multiplicative decrease), which converges to the highest sustainable rate instead of oscillating between bursts
+    and bans:
+
+    - success(new content loaded): the rate increases by `increase_step`, and more slowly when it approaches the rate
+      at which YouTube throttled us last time
+    - slow load / empty increment: the rate decreases by a mild factor
+    - shortfall(a crawl failed to reach the expected number of items): the rate is halved and all the acquirers back
+      off exponentially
+
+    The limiter is thread-safe, so one instance can be shared by all the agents in the process, see `shared()`.
+    """
+    _shared_instance = None
+    _shared_lock = threading.Lock()
+
+    def __init__(self,
+                 rate: float = 4.,
+                 burst: float = 8.,
+                 min_rate: float = 0.2,
+                 max_rate: float = 20.,
+                 increase_step: float = 0.05,
+                 decrease_factor: float = 0.5,
+                 mild_decrease_factor: float = 0.9,
+                 slow_load_th: float = 8.,
+                 max_backoff: float = 120.):
+        """
+        :param rate: (float) the initial rate, in tokens per second
+        :param burst: (float) the bucket capacity
+        :param min_rate: (float) the minimum rate
+        :param max_rate: (float) the maximum rate
+        :param increase_step: (float) the additive increase of the rate on each success
+        :param decrease_factor: (float) the multiplicative decrease of the rate on a shortfall
+        :param mild_decrease_factor: (float) the multiplicative decrease of the rate on a slow load or an empty increment
+        :param slow_load_th: (float) a load slower than `slow_load_th` seconds is a throttling signal
+        :param max_backoff: (float) the maximum backoff after consecutive shortfalls, in seconds
+        """
+        assert 0 < min_rate <= rate <= max_rate, f"min_rate <= rate <= max_rate is required, got {min_rate}, {rate}, {max_rate}"
+        self._rate = rate
+        self._burst = burst
+        self._min_rate = min_rate
+        self._max_rate = max_rate
+        self._increase_step = increase_step
+        self._decrease_factor = decrease_factor
+        self._mild_decrease_factor = mild_decrease_factor
+        self._slow_load_th = slow_load_th
+        self._max_backoff = max_backoff
+
+        self._tokens = burst
+        self._updated_at = time.monotonic()
+        self._backoff_until = 0.
+        self._n_shortfalls = 0
+        self._throttled_rate = None
+        self._lock = threading.Lock()
+
+    @classmethod
+    def shared(cls) -> 'AdaptiveRateLimiter':
+        """
+        The process-wide limiter shared by all the agents.
+
+        :return: (AdaptiveRateLimiter) the shared instance
+        """
+        with cls._shared_lock:
+            if cls._shared_instance is None:
+                cls._shared_instance = cls()
+            return cls._shared_instance
+
+    async def acquire(self, cost: float = 1.) -> float:
+        """
+        Wait until `cost` tokens are available and take them.
+
+        :param cost: (float) the number of tokens to take
+        :return: (float) the waited time, in seconds
+        """
+        start = time.monotonic()
+        while True:
+            with self._lock:
+                now = time.monotonic()
+                self._refill(now)
+                if now >= self._backoff_until and self._tokens >= cost:
+                    self._tokens -= cost
+                    return now - start
+                wait = max(self._backoff_until - now, (cost - self._tokens) / self._rate)
+            await asyncio.sleep(wait)
+
+    def report_success(self) -> None:
+        """Report that new content was loaded."""
+        with self._lock:
+            self._n_shortfalls = 0
+            step = self._increase_step
+            if self._throttled_rate is not None and self._rate >= 0.9 * self._throttled_rate:
+                # probe carefully around the rate at which we were throttled last time
+                step /= 4
+            self._set_rate(self._rate + step)
+
+    def report_empty(self) -> None:
+        """Report that a scroll step loaded nothing new."""
+        with self._lock:
+            self._set_rate(self._rate * self._mild_decrease_factor)
+
+    def observe_load(self, seconds: float) -> None:
+        """
+        Report the duration of a page load, slow loads decrease the rate.
+
+        :param seconds: (float) the duration of the page load
+        """
+        if seconds > self._slow_load_th:
+            with self._lock:
+                self._set_rate(self._rate * self._mild_decrease_factor)
+
+    def report_shortfall(self) -> None:
+        """Report that a crawl failed to load enough items, which halves the rate and backs off exponentially."""
+        with self._lock:
+            self._throttled_rate = self._rate
+            self._set_rate(self._rate * self._decrease_factor)
+            self._n_shortfalls += 1
+            backoff = min(2. ** self._n_shortfalls, self._max_backoff)
+            self._backoff_until = max(self._backoff_until, time.monotonic() + backoff)
+            self._tokens = 0.
+
+    @property
+    def rate(self) -> float:
+        """the current rate, in tokens per second"""
+        return self._rate
+
+    def _refill(self, now: float) -> None:
+        self._tokens = min(self._burst, self._tokens + (now - self._updated_at) * self._rate)
+        self._updated_at = now
+
+    def _set_rate(self, rate: float) -> None:
+        self._refill(time.monotonic())
+        self._rate = min(self._max_rate, max(self._min_rate, rate))
+
+
+__all__ = ['AdaptiveRateLimiter']
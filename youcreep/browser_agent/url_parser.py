@@ -1,5 +1,6 @@
 import re
 import enum
+from typing import Tuple
 
 
 class YouTubeUrlType(enum.Enum):
@@ -15,23 +16,55 @@ class YouTubeUrlType(enum.Enum):
 class YoutubeUrlParser:
     """
     YouTube url parser.
+
+    The urls are matched by path, under one of the `allowed_hosts`, or as relative urls. Only YouTube is allowed by
+    default, register a stand-in site(e.g. the local site used for benchmarks) by `allow_host`.
+
+    The allowed hosts are a process-wide setting, a process started by `spawn` does not inherit them. Pass them to
+    the processes parsing urls: `CrawlJobWorker(allowed_hosts=...)` for the job workers, and
+    `ProcessPoolExecutor(initializer=YoutubeUrlParser.allow_host, initargs=hosts)` for the parse executors(the
+    executors of `PageParser.aparse_*` are given them by the parser).
     """
-    video_url_regexp = r"(https://www\.youtube\.com)?/watch\?v=(?P<video_id>[^&]+)$"
-    short_url_regexp = r"(https://www\.youtube\.com)?/shorts/(?P<video_id>[^/]+)"
-    search_url_regexp = r"(https://www\.youtube\.com)?/results\?search_query=(?P<search_term>[^&]+)"
-    user_url_regexp = r"(https://www\.youtube\.com)?/@(?P<user_id>[^/]+)"
-    comment_url_regexp = r"(https://www\.youtube\.com)?/watch\?v=(?P<video_id>[^&]+)&lc=(?P<comment_id>[^&\.]+)"
-
-    @staticmethod
-    def parse_url(url: str) -> dict:
+    allowed_hosts: Tuple[str, ...] = ("https://www.youtube.com",)
+    """the scheme and host of the sites whose urls are parsed"""
+
+    _path_regexps = {
+        "video_url_regexp": r"/watch\?v=(?P<video_id>[^&]+)$",
+        "short_url_regexp": r"/shorts/(?P<video_id>[^/]+)",
+        "search_url_regexp": r"/results\?search_query=(?P<search_term>[^&]+)",
+        "user_url_regexp": r"/@(?P<user_id>[^/?#]+)(/(?P<tab>[^/?#]+))?",
+        "comment_url_regexp": r"/watch\?v=(?P<video_id>[^&]+)&lc=(?P<comment_id>[^&\.]+)",
+    }
+
+    @classmethod
+    def allow_host(cls, *host_urls: str) -> None:
+        """
+        Parse the urls of other sites as well, e.g. `http://127.0.0.1:8000` of a local stand-in site.
+
+        :param host_urls: (str) the scheme and host of each site(with the port if any), a trailing slash is ignored
+        :return: (None)
+        """
+        # a new tuple on the class itself, the tuple of a base class is never changed
+        new_hosts = [host_url.rstrip("/") for host_url in host_urls]
+        cls.allowed_hosts = tuple(dict.fromkeys((*cls.allowed_hosts, *new_hosts)))
+        cls._compile()
+
+    @classmethod
+    def _compile(cls) -> None:
+        cls.host_regexp = "(" + "|".join(re.escape(host_url) for host_url in cls.allowed_hosts) + ")?"
+        for name, path_regexp in cls._path_regexps.items():
+            setattr(cls, name, cls.host_regexp + path_regexp)
+
+    @classmethod
+    def parse_url(cls, url: str) -> dict:
         """
         Parse the url and return the result.
 
         :param url: (str) the url to be parsed
         :return: (dict) {'type': YouTubeUrlType, **other_args }
         """
-        if re.match(YoutubeUrlParser.comment_url_regexp, url):
-            match = re.match(YoutubeUrlParser.comment_url_regexp, url)
+        if re.match(cls.comment_url_regexp, url):
+            match = re.match(cls.comment_url_regexp, url)
             video_id = match.group("video_id")
             comment_id = url.split("&lc=")[-1]
             if "." in comment_id:
@@ -45,52 +78,54 @@ class YoutubeUrlParser:
             return {"type": comment_type, "video_id": video_id, "comment_id": comment_id,
                     "parent_comment_id": parent_comment_id}
 
-        if re.match(YoutubeUrlParser.video_url_regexp, url):
-            match = re.match(YoutubeUrlParser.video_url_regexp, url)
+        if re.match(cls.video_url_regexp, url):
+            match = re.match(cls.video_url_regexp, url)
             video_id = match.group("video_id")
             return {"type": YouTubeUrlType.VIDEO, "video_id": video_id}
 
-        if re.match(YoutubeUrlParser.short_url_regexp, url):
-            match = re.match(YoutubeUrlParser.short_url_regexp, url)
+        if re.match(cls.short_url_regexp, url):
+            match = re.match(cls.short_url_regexp, url)
             video_id = match.group("video_id")
             return {"type": YouTubeUrlType.SHORT, "video_id": video_id}
 
-        if re.match(YoutubeUrlParser.search_url_regexp, url):
-            match = re.match(YoutubeUrlParser.search_url_regexp, url)
+        if re.match(cls.search_url_regexp, url):
+            match = re.match(cls.search_url_regexp, url)
             search_term = match.group("search_term")
             return {"type": YouTubeUrlType.SEARCH, "search_term": search_term}
 
-        if re.match(YoutubeUrlParser.user_url_regexp, url):
-            match = re.match(YoutubeUrlParser.user_url_regexp, url)
+        if re.match(cls.user_url_regexp, url):
+            match = re.match(cls.user_url_regexp, url)
             user_id = match.group("user_id")
-            return {"type": YouTubeUrlType.USER, "user_id": user_id}
+            return {"type": YouTubeUrlType.USER, "user_id": user_id, "tab": match.group("tab")}
 
         return {"type": YouTubeUrlType.UNKNOWN}
 
-    @staticmethod
-    def is_video_url(url) -> bool:
-        return YoutubeUrlParser.parse_url(url)["type"] == YouTubeUrlType.VIDEO
+    @classmethod
+    def is_video_url(cls, url) -> bool:
+        return cls.parse_url(url)["type"] == YouTubeUrlType.VIDEO
 
-    @staticmethod
-    def is_short_url(url) -> bool:
-        return YoutubeUrlParser.parse_url(url)["type"] == YouTubeUrlType.SHORT
+    @classmethod
+    def is_short_url(cls, url) -> bool:
+        return cls.parse_url(url)["type"] == YouTubeUrlType.SHORT
 
-    @staticmethod
-    def is_search_url(url) -> bool:
-        return YoutubeUrlParser.parse_url(url)["type"] == YouTubeUrlType.SEARCH
+    @classmethod
+    def is_search_url(cls, url) -> bool:
+        return cls.parse_url(url)["type"] == YouTubeUrlType.SEARCH
 
-    @staticmethod
-    def is_user_url(url) -> bool:
-        return YoutubeUrlParser.parse_url(url)["type"] == YouTubeUrlType.USER
+    @classmethod
+    def is_user_url(cls, url) -> bool:
+        return cls.parse_url(url)["type"] == YouTubeUrlType.USER
 
-    @staticmethod
-    def is_comment_url(url) -> bool:
-        url_type = YoutubeUrlParser.parse_url(url)["type"]
+    @classmethod
+    def is_comment_url(cls, url) -> bool:
+        url_type = cls.parse_url(url)["type"]
         return url_type == YouTubeUrlType.COMMENT or url_type == YouTubeUrlType.REPLY_COMMENT
 
-    @staticmethod
-    def is_reply_comment_url(url) -> bool:
-        return YoutubeUrlParser.parse_url(url)["type"] == YouTubeUrlType.REPLY_COMMENT
+    @classmethod
+    def is_reply_comment_url(cls, url) -> bool:
+        return cls.parse_url(url)["type"] == YouTubeUrlType.REPLY_COMMENT
+
 
+YoutubeUrlParser._compile()
 
 __all__ = ['YoutubeUrlParser', "YouTubeUrlType"]
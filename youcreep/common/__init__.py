@@ -1,2 +1,2 @@
 from ..browser_agent.url_parser import YouTubeUrlType, YoutubeUrlParser
-from ..browser_agent.modules.search_page_handler import FilterSection, FilterPublishDateOption, FilterTypeOption, FilterLengthOption, FilterFunctionOption, FilterOrderByOption
+from .search_filter import FilterSection, FilterPublishDateOption, FilterTypeOption, FilterLengthOption, FilterFunctionOption, FilterOrderByOption
@@ -0,0 +1,214 @@
+import heapq
+from array import array
+from typing import Iterator, List, Sequence, Union
+
+from youcreep.common.pojo import VideoComment
+from youcreep.common.text_utils import parse_like_count
+
+
+class CommentThreadIndex:
+    """
+    The thread tree of a list of comments, built in linear time with flat integer arrays instead of nested objects.
+
+    The comments are numbered by their position in the list, the children of a comment are stored as a compressed
+    sparse row: the children of comment `i` are `child_idx[offsets[i]:offsets[i + 1]]`. A thread is a head comment(no
+    parent) with all its replies, a reply whose parent is not in the list(e.g. the head was not loaded) is an orphan and
+    heads its own thread.
+
+    It accepts both the output of `VideoPageParser.parse_comments` and the rows of `VideoCommentTableStorage`:
+
+    ```python
+    index = CommentThreadIndex(storage.video_comments(video_id))
+    for head, thread_likes, thread_size in index.top_threads(10):
+        print(index.comment(head)['content_text'], thread_likes, thread_size)
+    ```
+    """
+    def __init__(self, comments: Sequence[Union[VideoComment, dict]]):
+        """
+        :param comments: (Sequence[VideoComment | dict]) the comments, in any order
+        """
+        self._comments = [comment.to_dict() if isinstance(comment, VideoComment) else comment for comment in comments]
+        n = len(self._comments)
+
+        # 1. comment_id -> position, and the likes of each comment
+        position = {}
+        likes = array('q', bytes(8 * n))
+        for i, comment in enumerate(self._comments):
+            position[comment["comment_id"]] = i
+            like_num = comment.get("like_num")
+            if like_num is None:
+                like_num = parse_like_count(comment.get("like_count"))
+            likes[i] = like_num or 0
+
+        # 2. parent position of each comment, -1 for heads and orphans
+        parent_idx = array('i', [-1]) * n
+        n_children = array('i', bytes(4 * (n + 1)))
+        n_orphans = 0
+        for i, comment in enumerate(self._comments):
+            parent_id = comment.get("parent_comment_id")
+            if parent_id is None:
+                continue
+            parent = position.get(parent_id, -1)
+            if parent == -1 or parent == i:
+                n_orphans += 1
+                continue
+            parent_idx[i] = parent
+            n_children[parent + 1] += 1
+
+        # 3. children offsets by counting sort
+        for i in range(n):
+            n_children[i + 1] += n_children[i]
+        offsets = n_children
+        child_idx = array('i', bytes(4 * offsets[n]))
+        cursor = array('i', offsets[:n])
+        for i in range(n):
+            parent = parent_idx[i]
+            if parent != -1:
+                child_idx[cursor[parent]] = i
+                cursor[parent] += 1
+        roots = array('i', [i for i in range(n) if parent_idx[i] == -1])
+
+        # 4. depth in BFS order, then subtree size and likes in reverse BFS order
+        depth = array('i', bytes(4 * n))
+        order = array('i', roots)
+        head = 0
+        while head < len(order):
+            i = order[head]
+            head += 1
+            for k in range(offsets[i], offsets[i + 1]):
+                child = child_idx[k]
+                depth[child] = depth[i] + 1
+                order.append(child)
+        subtree_size = array('i', [1]) * n
+        subtree_likes = array('q', likes)
+        for i in reversed(order):
+            parent = parent_idx[i]
+            if parent != -1:
+                subtree_size[parent] += subtree_size[i]
+                subtree_likes[parent] += subtree_likes[i]
+
+        self._position = position
+        self._likes = likes
+        self._parent_idx = parent_idx
+        self._offsets = offsets
+        self._child_idx = child_idx
+        self._roots = roots
+        self._depth = depth
+        self._subtree_size = subtree_size
+        self._subtree_likes = subtree_likes
+        self._n_orphans = n_orphans
+        # comments in a cycle(corrupted data) are not reachable from any head
+        self._n_unreachable = n - len(order)
+
+    def __len__(self) -> int:
+        return len(self._comments)
+
+    def comment(self, i: int) -> dict:
+        """
+        :param i: (int) the position of the comment
+        :return: (dict) the comment
+        """
+        return self._comments[i]
+
+    def position(self, comment_id: str) -> Union[int, None]:
+        """
+        :param comment_id: (str) the comment id
+        :return: (int | None) the position of the comment, None if it is not in the index
+        """
+        return self._position.get(comment_id)
+
+    def parent(self, i: int) -> int:
+        """
+        :param i: (int) the position of the comment
+        :return: (int) the position of its parent, -1 for a thread head
+        """
+        return self._parent_idx[i]
+
+    def children(self, i: int) -> Sequence[int]:
+        """
+        :param i: (int) the position of the comment
+        :return: (Sequence[int]) the positions of its direct replies
+        """
+        return self._child_idx[self._offsets[i]:self._offsets[i + 1]]
+
+    def depth(self, i: int) -> int:
+        """
+        :param i: (int) the position of the comment
+        :return: (int) 0 for a thread head, 1 for a reply to it, etc.
+        """
+        return self._depth[i]
+
+    def thread_size(self, i: int) -> int:
+        """
+        :param i: (int) the position of the comment
+        :return: (int) the number of comments in its subtree, itself included
+        """
+        return self._subtree_size[i]
+
+    def thread_likes(self, i: int) -> int:
+        """
+        :param i: (int) the position of the comment
+        :return: (int) the total likes of its subtree, itself included
+        """
+        return self._subtree_likes[i]
+
+    def thread(self, i: int) -> List[int]:
+        """
+        Get the subtree of a comment in depth-first order, replies after the comment they reply to.
+
+        :param i: (int) the position of the comment
+        :return: (List[int]) the positions of the comments
+        """
+        result, stack = [], [i]
+        while stack:
+            j = stack.pop()
+            result.append(j)
+            stack.extend(reversed(self.children(j)))
+        return result
+
+    def iter_threads(self) -> Iterator[List[int]]:
+        """
+        Iterate over the threads in the order of their heads.
+
+        :return: (Iterator[List[int]]) the positions of the comments of each thread, see `thread`
+        """
+        for root in self._roots:
+            yield self.thread(root)
+
+    def top_threads(self, n: int = 10, by: str = "likes") -> List[tuple]:
+        """
+        Get the top `n` threads, in O(number of threads * log(n)).
+
+        :param n: (int) the number of threads
+        :param by: (str) "likes" for the total likes of the thread, "size" for the number of comments
+        :return: (List[tuple]) (head position, total likes, number of comments) of each thread, the top first
+        """
+        assert by in ("likes", "size"), f"by should be 'likes' or 'size', got {by}"
+        key = self._subtree_likes if by == "likes" else self._subtree_size
+        heads = heapq.nlargest(n, self._roots, key=key.__getitem__)
+        return [(head, self._subtree_likes[head], self._subtree_size[head]) for head in heads]
+
+    def stats(self) -> dict:
+        """
+        :return: (dict) {'n_comments', 'n_threads', 'n_orphans', 'n_unreachable', 'max_depth', 'max_thread_size',
+            'mean_thread_size'}
+        """
+        n_threads = len(self._roots)
+        thread_sizes = [self._subtree_size[root] for root in self._roots]
+        return {
+            "n_comments": len(self._comments),
+            "n_threads": n_threads,
+            "n_orphans": self._n_orphans,
+            "n_unreachable": self._n_unreachable,
+            "max_depth": max(self._depth, default=0),
+            "max_thread_size": max(thread_sizes, default=0),
+            "mean_thread_size": sum(thread_sizes) / n_threads if n_threads else 0.,
+        }
+
+    @property
+    def roots(self) -> Sequence[int]:
+        """the positions of the thread heads, in the order of the comments"""
+        return self._roots
+
+
+__all__ = ['CommentThreadIndex']
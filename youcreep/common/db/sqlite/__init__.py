@@ -1 +1,4 @@
 from ._video_comment import VideoCommentTableStorage
+from ._crawl_job import CrawlJobQueue, CrawlJobStatus
+from ._negative_cache import NegativeResultCache, NegativeReason
+from ._comment_snapshot import CommentSnapshotStore
@@ -0,0 +1,219 @@
+import json
+import time
+import hashlib
+import logging
+from typing import Dict, List, Sequence, Union
+
+from cetino.db.sqlite._decorator import connect
+from cetino.db.sqlite.type import SQLiteDataType
+from cetino.db.sqlite.table_storage import SQLiteTableStorage
+
+from youcreep.common.pojo import VideoComment
+from ._execute import ParamsExecuteMixin
+
+
+class CommentSnapshotStore(ParamsExecuteMixin, SQLiteTableStorage):
+    """
+    Repeated snapshots of the comments of the same videos, stored as record-level deltas instead of full copies.
+
+    The first snapshot of a video is its base(version 0, every comment stored once), each later snapshot only stores
+    the comments which are new or changed since the previous version, keyed by comment_id:
+
+    - `put`: a new comment, or a comment whose content changed, the whole record is stored
+    - `like`: a comment whose `like_count` alone changed, only the new like count is stored
+    - `del`: a comment missing from a `complete` snapshot
+
+    Any version is reconstructed on demand by `get_snapshot`, reading the delta rows of the video up to that version.
+    The fields in `volatile_fields`(e.g. the relative `publish_time`, "3 days ago") change between captures without the
+    comment changing, a change of them alone is not stored and the reconstructed value is the one first stored.
+
+    The snapshots are listed in this table(`comment_snapshot`), the deltas are in `{table_name}_record` and the digest
+    and like count of the latest version of each comment are in `{table_name}_head`, so storing a snapshot only reads
+    the head of the video instead of reconstructing it.
+    """
+    primary_key_tuple = ("video_id", "version")
+
+    volatile_fields = ("publish_time", "author_thumbnail")
+    """the fields whose change alone is not stored"""
+
+    @property
+    def fields(self) -> Dict[str, SQLiteDataType]:
+        return {
+            "video_id": SQLiteDataType.TEXT,
+            "version": SQLiteDataType.INTEGER,
+            "captured_at": SQLiteDataType.REAL,
+            "n_comments": SQLiteDataType.INTEGER,
+            "n_put": SQLiteDataType.INTEGER,
+            "n_like": SQLiteDataType.INTEGER,
+            "n_del": SQLiteDataType.INTEGER,
+            "complete": SQLiteDataType.INTEGER,
+        }
+
+    @property
+    def table_name(self) -> str:
+        return "comment_snapshot"
+
+    @property
+    def record_table_name(self) -> str:
+        return f"{self.table_name}_record"
+
+    @property
+    def head_table_name(self) -> str:
+        return f"{self.table_name}_head"
+
+    @connect(commit=True)
+    def create(self, allow_exist: bool = True):
+        super().create(allow_exist=allow_exist)
+        self._execute(f"""
+CREATE TABLE IF NOT EXISTS {self.record_table_name} (
+    video_id TEXT, version INTEGER, position INTEGER, comment_id TEXT, kind TEXT, data TEXT,
+    PRIMARY KEY (video_id, version, position)
+) WITHOUT ROWID;""")
+        self._execute(f"CREATE INDEX IF NOT EXISTS {self.record_table_name}_comment_idx ON {self.record_table_name} (video_id, comment_id)")
+        self._execute(f"""
+CREATE TABLE IF NOT EXISTS {self.head_table_name} (
+    video_id TEXT, comment_id TEXT, digest TEXT, like_count TEXT, PRIMARY KEY (video_id, comment_id)
+) WITHOUT ROWID;""")
+
+    @connect(commit=True)
+    def put_snapshot(self,
+                     video_id: str,
+                     comments: Sequence[Union[VideoComment, dict]],
+                     captured_at: float = None,
+                     complete: bool = False) -> dict:
+        """
+        Store a new snapshot of the comments of a video as the delta to its latest version.
+
+        :param video_id: (str) the video id
+        :param comments: (Sequence[VideoComment | dict]) the comments of the capture, e.g. `VideoPageParser.parse_comments()`
+        :param captured_at: (float) the timestamp of the capture, default is now
+        :param complete: (bool) whether the capture holds all the comments of the video, the comments of the latest
+            version missing from it are then stored as deleted. By default a capture is partial(e.g. crawled with
+            `n_target`), and a missing comment is kept
+        :return: (dict) {'video_id', 'version', 'captured_at', 'n_comments', 'n_put', 'n_like', 'n_del', 'complete'}
+            of the snapshot, `n_comments` is the number of comments of the reconstructed version
+        """
+        start = time.perf_counter()
+        captured_at = time.time() if captured_at is None else captured_at
+        rows = self._execute(f"SELECT MAX(version) AS version FROM {self.table_name} WHERE video_id = ?;", (video_id,))
+        version = 0 if rows[0]["version"] is None else rows[0]["version"] + 1
+        head = {row["comment_id"]: (row["digest"], row["like_count"]) for row in
+                self._execute(f"SELECT comment_id, digest, like_count FROM {self.head_table_name} WHERE video_id = ?;", (video_id,))}
+
+        # 1. diff the capture against the head of the video
+        deltas, head_updates, seen, n_new = [], [], set(), 0
+        for position, comment in enumerate(comments):
+            # only the fields of `VideoComment`, e.g. the `publish_ts` of the rows of `VideoCommentTableStorage` is dropped
+            record = (comment if isinstance(comment, VideoComment) else VideoComment.from_dict(comment)).to_dict()
+            comment_id = record["comment_id"]
+            if comment_id in seen:
+                continue
+            seen.add(comment_id)
+            digest, like_count = self._digest(record), record.get("like_count")
+            previous = head.get(comment_id)
+            n_new += previous is None
+            if previous is None or previous[0] != digest:
+                deltas.append((video_id, version, position, comment_id, "put", json.dumps(record, ensure_ascii=False)))
+            elif previous[1] != like_count:
+                deltas.append((video_id, version, position, comment_id, "like", like_count))
+            else:
+                continue
+            head_updates.append((video_id, comment_id, digest, like_count))
+        removed = [comment_id for comment_id in head if comment_id not in seen] if complete else []
+        deltas += [(video_id, version, len(comments) + i, comment_id, "del", None) for i, comment_id in enumerate(removed)]
+
+        # 2. store the deltas and move the head
+        self._conn.executemany(f"INSERT INTO {self.record_table_name} (video_id, version, position, comment_id, kind, data) VALUES (?, ?, ?, ?, ?, ?);", deltas)
+        self._conn.executemany(f"""
+INSERT INTO {self.head_table_name} (video_id, comment_id, digest, like_count) VALUES (?, ?, ?, ?)
+ON CONFLICT (video_id, comment_id) DO UPDATE SET digest = excluded.digest, like_count = excluded.like_count;""", head_updates)
+        self._conn.executemany(f"DELETE FROM {self.head_table_name} WHERE video_id = ? AND comment_id = ?;",
+                               [(video_id, comment_id) for comment_id in removed])
+        kinds = [delta[4] for delta in deltas]
+        snapshot = {
+            "video_id": video_id,
+            "version": version,
+            "captured_at": captured_at,
+            "n_comments": len(head) + n_new - len(removed),
+            "n_put": kinds.count("put"),
+            "n_like": kinds.count("like"),
+            "n_del": len(removed),
+            "complete": int(complete),
+        }
+        self._execute(f"INSERT INTO {self.table_name} ({', '.join(snapshot)}) VALUES ({', '.join('?' * len(snapshot))});",
+                      tuple(snapshot.values()))
+        self._log(f"Snapshot {version} of {video_id}: {len(deltas)} deltas for {len(seen)} comments in {(time.perf_counter() - start) * 1000:.1f}ms",
+                  level=logging.INFO)
+        return snapshot
+
+    @connect()
+    def get_snapshot(self, video_id: str, version: int = None) -> List[VideoComment]:
+        """
+        Reconstruct a version of the comments of a video.
+
+        :param video_id: (str) the video id
+        :param version: (int) the version, negative to count from the latest(-1 is the latest), None for the latest
+        :return: (List[VideoComment]) the comments, in the order of the capture which first stored them
+        """
+        if version is None or version < 0:
+            n_versions = self._execute(f"SELECT COUNT(*) AS n FROM {self.table_name} WHERE video_id = ?;", (video_id,))[0]["n"]
+            version = n_versions + (-1 if version is None else version)
+            if version < 0:
+                return []
+        records: Dict[str, dict] = {}
+        for row in self._execute(f"""
+SELECT comment_id, kind, data FROM {self.record_table_name}
+WHERE video_id = ? AND version <= ?
+ORDER BY version, position;""", (video_id, version)):
+            comment_id, kind = row["comment_id"], row["kind"]
+            if kind == "put":
+                record = json.loads(row["data"])
+                previous = records.get(comment_id)
+                if previous is not None:
+                    # keep the first stored value of the volatile fields
+                    record.update({field: previous.get(field) for field in self.volatile_fields})
+                records[comment_id] = record
+            elif kind == "like":
+                records[comment_id]["like_count"] = row["data"]
+            else:
+                records.pop(comment_id, None)
+        return [VideoComment.from_dict(record) for record in records.values()]
+
+    @connect()
+    def versions(self, video_id: str) -> List[dict]:
+        """
+        List the snapshots of a video, e.g. to plot the comment growth.
+
+        :param video_id: (str) the video id
+        :return: (List[dict]) {'video_id', 'version', 'captured_at', 'n_comments', 'n_put', 'n_like', 'n_del',
+            'complete'} of each snapshot, the oldest first
+        """
+        return self._execute(f"SELECT * FROM {self.table_name} WHERE video_id = ? ORDER BY version;", (video_id,))
+
+    @connect()
+    def comment_history(self, video_id: str, comment_id: str) -> List[dict]:
+        """
+        Get the changes of one comment across the snapshots, e.g. the growth of its like count.
+
+        :param video_id: (str) the video id
+        :param comment_id: (str) the comment id
+        :return: (List[dict]) {'version', 'captured_at', 'kind', 'like_count'} of each change, the oldest first
+        """
+        rows = self._execute(f"""
+SELECT r.version, s.captured_at, r.kind, r.data FROM {self.record_table_name} AS r
+JOIN {self.table_name} AS s ON s.video_id = r.video_id AND s.version = r.version
+WHERE r.video_id = ? AND r.comment_id = ?
+ORDER BY r.version;""", (video_id, comment_id))
+        return [{
+            "version": row["version"],
+            "captured_at": row["captured_at"],
+            "kind": row["kind"],
+            "like_count": json.loads(row["data"]).get("like_count") if row["kind"] == "put" else row["data"],
+        } for row in rows]
+
+    def _digest(self, record: dict) -> str:
+        content = [(key, value) for key, value in sorted(record.items()) if key != "like_count" and key not in self.volatile_fields]
+        return hashlib.blake2b(json.dumps(content, ensure_ascii=False, default=str).encode("utf-8"), digest_size=8).hexdigest()
+
+
+__all__ = ['CommentSnapshotStore']
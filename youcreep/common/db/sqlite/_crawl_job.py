@@ -0,0 +1,238 @@
+import enum
+import time
+import logging
+from typing import Dict, List, Union
+
+from cetino.db.sqlite._decorator import connect
+from cetino.db.sqlite.type import SQLiteDataType
+from cetino.db.sqlite.table_storage import SQLiteTableStorage
+
+from ._execute import ParamsExecuteMixin, AutocommitWalMixin
+
+
+class CrawlJobStatus(enum.Enum):
+    PENDING = "pending"
+    RUNNING = "running"
+    DONE = "done"
+    FAILED = "failed"
+
+
+class CrawlJobQueue(AutocommitWalMixin, ParamsExecuteMixin, SQLiteTableStorage):
+    """
+    A durable crawl job queue shared by multiple worker processes.
+
+    - the database runs in WAL mode, so the workers can read while one of them is writing
+    - a job is claimed atomically by a single `UPDATE ... RETURNING` statement, together with a lease
+    - a worker extends the lease by `heartbeat`, a job whose lease expired(e.g. the worker crashed) is claimed again
+    - a failed job is retried until `max_attempts` is reached
+    - among the jobs of the same priority, the most expensive one is claimed first(longest-processing-time first), so
+      that no giant job is left at the tail of a batch while the other workers sit idle
+    - a job belongs to a lane(e.g. `large` for giant videos), a worker can be dedicated to some lanes
+
+    The queue is agnostic of the crawlers, `crawl_args` is stored as a serialized string, see `youcreep.crawler.job_worker`.
+    """
+    primary_key_tuple = ("job_id",)
+    unique_tuple = ("dedup_key",)
+
+    def __init__(self, data_path, log_path=None, busy_timeout: float = 30.):
+        """
+        :param data_path: (str | pathlib.Path) database file path
+        :param log_path: (str | pathlib.Path | None) log file path, if None, only print to console
+        :param busy_timeout: (float) how long to wait for the lock held by another worker, in seconds
+        """
+        super().__init__(data_path, log_path)
+        self._busy_timeout = busy_timeout
+
+    @property
+    def fields(self) -> Dict[str, SQLiteDataType]:
+        return {
+            "job_id": SQLiteDataType.INTEGER,
+            "job_type": SQLiteDataType.TEXT,
+            "crawl_args": SQLiteDataType.TEXT,
+            "dedup_key": SQLiteDataType.TEXT,
+            "status": SQLiteDataType.TEXT,
+            "priority": SQLiteDataType.INTEGER,
+            "cost": SQLiteDataType.REAL,
+            "lane": SQLiteDataType.TEXT,
+            "n_attempts": SQLiteDataType.INTEGER,
+            "max_attempts": SQLiteDataType.INTEGER,
+            "worker_id": SQLiteDataType.TEXT,
+            "lease_until": SQLiteDataType.REAL,
+            "created_at": SQLiteDataType.REAL,
+            "updated_at": SQLiteDataType.REAL,
+            "error": SQLiteDataType.TEXT,
+        }
+
+    @property
+    def table_name(self) -> str:
+        return "crawl_job"
+
+    default_lane = "default"
+    """the lane of a job enqueued without a lane"""
+
+    @connect()
+    def create(self, allow_exist: bool = True):
+        super().create(allow_exist=allow_exist)
+        # queues created before `cost` and `lane` were introduced
+        existing = {row["name"] for row in self._execute(f"PRAGMA table_info({self.table_name});")}
+        for field_name, field_type in self.fields.items():
+            if field_name not in existing:
+                self._execute(f"ALTER TABLE {self.table_name} ADD COLUMN {field_name} {field_type.value}")
+        self._execute(f"UPDATE {self.table_name} SET cost = COALESCE(cost, 0), lane = COALESCE(lane, '{self.default_lane}') WHERE cost IS NULL OR lane IS NULL")
+        self._execute(f"DROP INDEX IF EXISTS {self.table_name}_claim_idx")
+        self._execute(f"CREATE INDEX IF NOT EXISTS {self.table_name}_lpt_idx ON {self.table_name} (status, priority DESC, cost DESC, job_id)")
+
+    @connect()
+    def enqueue(self, job_type: str, crawl_args: str, dedup_key: str, priority: int = 0, max_attempts: int = 3,
+                cost: float = 0., lane: str = None, requeue: bool = False) -> Union[int, None]:
+        """
+        Add a job to the queue, a job with the same `dedup_key` is never added twice.
+
+        With `requeue`, a job with the same `dedup_key` which is done or failed is reset to pending(with the new
+        arguments and no attempts) to be crawled again, e.g. to refresh the comments of a video. A pending or running
+        job is left as is.
+
+        :param job_type: (str) the job type
+        :param crawl_args: (str) the serialized crawl arguments
+        :param dedup_key: (str) the unique key of the job
+        :param priority: (int) jobs with higher priority are claimed first
+        :param max_attempts: (int) the maximum number of attempts
+        :param cost: (float) the expected cost of the job(e.g. the number of comments), costlier jobs are claimed first
+        :param lane: (str) the lane of the job, default is `default_lane`
+        :param requeue: (bool) whether to reset an existing job which is done or failed to pending
+        :return: (int | None) the job id, None if the job already exists(and is not requeued)
+        """
+        now = time.time()
+        lane = self.default_lane if lane is None else lane
+        params = (job_type, crawl_args, dedup_key, CrawlJobStatus.PENDING.value, priority, cost, lane, max_attempts, now, now)
+        conflict_clause = "DO NOTHING"
+        if requeue:
+            conflict_clause = """DO UPDATE SET
+    crawl_args = excluded.crawl_args, status = excluded.status, priority = excluded.priority, cost = excluded.cost,
+    lane = excluded.lane, n_attempts = 0, max_attempts = excluded.max_attempts, worker_id = NULL, lease_until = NULL,
+    updated_at = excluded.updated_at, error = NULL
+WHERE status IN (?, ?)"""
+            params += (CrawlJobStatus.DONE.value, CrawlJobStatus.FAILED.value)
+        rows = self._execute(f"""
+INSERT INTO {self.table_name} (job_type, crawl_args, dedup_key, status, priority, cost, lane, n_attempts, max_attempts, created_at, updated_at)
+VALUES (?, ?, ?, ?, ?, ?, ?, 0, ?, ?, ?)
+ON CONFLICT (dedup_key) {conflict_clause}
+RETURNING job_id;""", params)
+        return rows[0]["job_id"] if rows else None
+
+    @connect()
+    def claim(self, worker_id: str, lease_seconds: float = 300., job_types: List[str] = None, lanes: List[str] = None) -> Union[dict, None]:
+        """
+        Claim the pending job with the highest priority and then the highest cost atomically, expired leases are
+        reassigned first.
+
+        :param worker_id: (str) the id of the claiming worker
+        :param lease_seconds: (float) the lease duration, the worker should call `heartbeat` before it expires
+        :param job_types: (List[str]) only claim jobs of these types, None for all types
+        :param lanes: (List[str]) only claim jobs of these lanes, None for all lanes
+        :return: (dict | None) the claimed job, None if there is no pending job
+        """
+        self.requeue_expired()
+        now = time.time()
+        type_clause, type_params = "", ()
+        if job_types:
+            type_clause = f"AND job_type IN ({', '.join('?' * len(job_types))})"
+            type_params = tuple(job_types)
+        if lanes:
+            type_clause += f" AND lane IN ({', '.join('?' * len(lanes))})"
+            type_params += tuple(lanes)
+        rows = self._execute(f"""
+UPDATE {self.table_name}
+SET status = ?, worker_id = ?, lease_until = ?, n_attempts = n_attempts + 1, updated_at = ?
+WHERE job_id = (
+    SELECT job_id FROM {self.table_name}
+    WHERE status = ? {type_clause}
+    ORDER BY priority DESC, cost DESC, job_id
+    LIMIT 1
+)
+RETURNING *;""", (CrawlJobStatus.RUNNING.value, worker_id, now + lease_seconds, now, CrawlJobStatus.PENDING.value, *type_params))
+        return rows[0] if rows else None
+
+    @connect()
+    def heartbeat(self, job_id: int, worker_id: str, lease_seconds: float = 300.) -> bool:
+        """
+        Extend the lease of a running job.
+
+        :param job_id: (int) the job id
+        :param worker_id: (str) the id of the worker holding the lease
+        :param lease_seconds: (float) the new lease duration from now
+        :return: (bool) False if the lease is lost(expired and claimed by another worker)
+        """
+        now = time.time()
+        rows = self._execute(f"""
+UPDATE {self.table_name} SET lease_until = ?, updated_at = ?
+WHERE job_id = ? AND worker_id = ? AND status = ?
+RETURNING job_id;""", (now + lease_seconds, now, job_id, worker_id, CrawlJobStatus.RUNNING.value))
+        return len(rows) > 0
+
+    @connect()
+    def complete(self, job_id: int, worker_id: str) -> bool:
+        """
+        Mark a running job as done.
+
+        :param job_id: (int) the job id
+        :param worker_id: (str) the id of the worker holding the lease
+        :return: (bool) False if the lease is lost
+        """
+        return self._finish(job_id, worker_id, CrawlJobStatus.DONE, error=None)
+
+    @connect()
+    def fail(self, job_id: int, worker_id: str, error: str) -> bool:
+        """
+        Report the failure of a running job, the job is retried until `max_attempts` is reached.
+
+        :param job_id: (int) the job id
+        :param worker_id: (str) the id of the worker holding the lease
+        :param error: (str) the error message
+        :return: (bool) False if the lease is lost
+        """
+        return self._finish(job_id, worker_id, None, error=error)
+
+    @connect()
+    def requeue_expired(self) -> int:
+        """
+        Reassign the running jobs whose lease expired, or fail them when `max_attempts` is reached.
+
+        :return: (int) the number of expired jobs
+        """
+        rows = self._execute(f"""
+UPDATE {self.table_name}
+SET status = CASE WHEN n_attempts < max_attempts THEN ? ELSE ? END,
+    error = COALESCE(error, 'lease expired'), worker_id = NULL, updated_at = ?
+WHERE status = ? AND lease_until < ?
+RETURNING job_id;""", (CrawlJobStatus.PENDING.value, CrawlJobStatus.FAILED.value, time.time(), CrawlJobStatus.RUNNING.value, time.time()))
+        if rows:
+            self._log(f"Requeued {len(rows)} jobs with expired lease", level=logging.WARNING)
+        return len(rows)
+
+    @connect()
+    def count_by_status(self) -> Dict[str, int]:
+        """
+        Count the jobs of each status.
+
+        :return: (Dict[str, int]) {status: count}
+        """
+        rows = self._execute(f"SELECT status, COUNT(*) AS n FROM {self.table_name} GROUP BY status;")
+        return {row["status"]: row["n"] for row in rows}
+
+    def _finish(self, job_id: int, worker_id: str, status: Union[CrawlJobStatus, None], error: Union[str, None]) -> bool:
+        if status is None:
+            status_clause, status_params = "CASE WHEN n_attempts < max_attempts THEN ? ELSE ? END", (CrawlJobStatus.PENDING.value, CrawlJobStatus.FAILED.value)
+        else:
+            status_clause, status_params = "?", (status.value,)
+        rows = self._execute(f"""
+UPDATE {self.table_name}
+SET status = {status_clause}, error = ?, worker_id = NULL, lease_until = NULL, updated_at = ?
+WHERE job_id = ? AND worker_id = ? AND status = ?
+RETURNING job_id;""", (*status_params, error, time.time(), job_id, worker_id, CrawlJobStatus.RUNNING.value))
+        if not rows:
+            self._log(f"Job {job_id} is not held by {worker_id} anymore", level=logging.WARNING)
+        return len(rows) > 0
+
+
+__all__ = ['CrawlJobQueue', 'CrawlJobStatus']
@@ -0,0 +1,45 @@
+import logging
+import sqlite3
+from typing import List
+
+
+class ParamsExecuteMixin:
+    """
+    Execute parameterized SQL on the connection of a `SQLiteStorage`, `SQLiteStorage.execute` only takes a SQL string.
+    """
+    def _execute(self, sql: str, params: tuple = ()) -> List[dict]:
+        # RETURNING rows must be fetched before the statement ends
+        try:
+            cursor = self._conn.execute(sql, params)
+            rows = cursor.fetchall()
+        except sqlite3.Error as e:
+            self._log(f'Execute SQL: {sql} failed, params: {params}', level=logging.ERROR)
+            self._log(str(e), level=logging.ERROR)
+            raise e
+        self._log(f'Execute SQL: {sql}, params: {params}', level=logging.DEBUG)
+        if cursor.description is None:
+            return []
+        names = [column[0] for column in cursor.description]
+        return [dict(zip(names, row)) for row in rows]
+
+
+class AutocommitWalMixin:
+    """
+    Connect a `SQLiteStorage` shared by multiple processes: WAL mode, autocommit and a busy timeout.
+
+    Every statement is a transaction on its own, so no lock is held between statements. The storage should set
+    `self._busy_timeout`(in seconds) in its `__init__`.
+    """
+    def _connect(self):
+        if self.is_connect is False:
+            self._log(f'Establishing connection with {self._db_file}...')
+            self._conn = sqlite3.connect(self._db_file, timeout=self._busy_timeout, isolation_level=None)
+            self._conn.execute("PRAGMA journal_mode=WAL")
+            self._conn.execute(f"PRAGMA busy_timeout={int(self._busy_timeout * 1000)}")
+            self.is_connect = True
+            self._log(f'Connection with {self._db_file} established', level=logging.INFO)
+        else:
+            self._log(f'Connection with {self._db_file} already established', level=logging.INFO)
+
+
+__all__ = ['ParamsExecuteMixin', 'AutocommitWalMixin']
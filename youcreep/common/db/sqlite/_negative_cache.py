@@ -0,0 +1,162 @@
+import enum
+import time
+import logging
+from typing import Dict, List, Union
+
+from cetino.db.sqlite._decorator import connect
+from cetino.db.sqlite.type import SQLiteDataType
+from cetino.db.sqlite.table_storage import SQLiteTableStorage
+
+from ._execute import ParamsExecuteMixin, AutocommitWalMixin
+
+
+class NegativeReason(enum.Enum):
+    """
+    Why a video gave no comments.
+
+    - `EMPTY`: the video has no comment yet
+    - `COMMENTS_DISABLED`: the comments are turned off
+    - `UNAVAILABLE`: the video is deleted, private or blocked
+    - `FAILED`: not enough comments could be loaded after all the retries
+    """
+    EMPTY = "empty"
+    COMMENTS_DISABLED = "comments_disabled"
+    UNAVAILABLE = "unavailable"
+    FAILED = "failed"
+
+
+class NegativeResultCache(AutocommitWalMixin, ParamsExecuteMixin, SQLiteTableStorage):
+    """
+    A persistent cache of the videos which gave no comments recently, so that scheduled batches skip them before any
+    browser work instead of visiting the same disabled, deleted or private videos every day.
+
+    An entry is keyed by video_id and expires after a TTL depending on its reason(see `default_ttls`). It can share
+    the database file of a `CrawlJobQueue`, and is safe to use from multiple worker processes.
+    """
+    primary_key_tuple = ("video_id",)
+
+    default_ttls: Dict[NegativeReason, float] = {
+        NegativeReason.EMPTY: 3 * 86400.,
+        NegativeReason.COMMENTS_DISABLED: 7 * 86400.,
+        NegativeReason.UNAVAILABLE: 30 * 86400.,
+        NegativeReason.FAILED: 6 * 3600.,
+    }
+    """the TTL of an entry of each reason, in seconds"""
+
+    def __init__(self, data_path, log_path=None, busy_timeout: float = 30.):
+        """
+        :param data_path: (str | pathlib.Path) database file path
+        :param log_path: (str | pathlib.Path | None) log file path, if None, only print to console
+        :param busy_timeout: (float) how long to wait for the lock held by another worker, in seconds
+        """
+        super().__init__(data_path, log_path)
+        self._busy_timeout = busy_timeout
+
+    @property
+    def fields(self) -> Dict[str, SQLiteDataType]:
+        return {
+            "video_id": SQLiteDataType.TEXT,
+            "reason": SQLiteDataType.TEXT,
+            "detail": SQLiteDataType.TEXT,
+            "n_observations": SQLiteDataType.INTEGER,
+            "n_hits": SQLiteDataType.INTEGER,
+            "observed_at": SQLiteDataType.REAL,
+            "expires_at": SQLiteDataType.REAL,
+        }
+
+    @property
+    def table_name(self) -> str:
+        return "negative_result"
+
+    @connect()
+    def create(self, allow_exist: bool = True):
+        super().create(allow_exist=allow_exist)
+        self.execute(f"CREATE INDEX IF NOT EXISTS {self.table_name}_expires_idx ON {self.table_name} (expires_at)")
+
+    @connect()
+    def put(self, video_id: str, reason: NegativeReason, ttl: float = None, detail: str = None, observed_at: float = None) -> float:
+        """
+        Remember that a video gave no comments, replacing its previous entry.
+
+        :param video_id: (str) the video id
+        :param reason: (NegativeReason) the reason
+        :param ttl: (float) the time to live in seconds, default is `default_ttls[reason]`
+        :param detail: (str) e.g. the message shown by YouTube
+        :param observed_at: (float) the timestamp of the observation, default is now
+        :return: (float) the timestamp when the entry expires
+        """
+        observed_at = time.time() if observed_at is None else observed_at
+        expires_at = observed_at + (self.default_ttls[reason] if ttl is None else ttl)
+        self._execute(f"""
+INSERT INTO {self.table_name} (video_id, reason, detail, n_observations, n_hits, observed_at, expires_at)
+VALUES (?, ?, ?, 1, 0, ?, ?)
+ON CONFLICT (video_id) DO UPDATE SET
+    reason = excluded.reason, detail = excluded.detail, n_observations = n_observations + 1,
+    observed_at = excluded.observed_at, expires_at = excluded.expires_at;""",
+                      (video_id, reason.value, detail, observed_at, expires_at))
+        self._log(f"Video {video_id} is cached as {reason.value} until {time.ctime(expires_at)}", level=logging.DEBUG)
+        return expires_at
+
+    @connect()
+    def check(self, video_id: str) -> Union[dict, None]:
+        """
+        Get the unexpired entry of a video and count the hit, call it before crawling the video.
+
+        :param video_id: (str) the video id
+        :return: (dict | None) the entry, None if the video should be crawled
+        """
+        rows = self._execute(f"""
+UPDATE {self.table_name} SET n_hits = n_hits + 1
+WHERE video_id = ? AND expires_at > ?
+RETURNING *;""", (video_id, time.time()))
+        return rows[0] if rows else None
+
+    @connect()
+    def get_many(self, video_ids: List[str]) -> Dict[str, dict]:
+        """
+        Get the unexpired entries of many videos without counting hits, e.g. to filter a batch before enqueuing it.
+
+        :param video_ids: (List[str]) the video ids
+        :return: (Dict[str, dict]) {video_id: entry} of the cached videos
+        """
+        entries, now = {}, time.time()
+        # stay below SQLITE_MAX_VARIABLE_NUMBER
+        for i in range(0, len(video_ids), 500):
+            chunk = video_ids[i:i + 500]
+            rows = self._execute(f"SELECT * FROM {self.table_name} WHERE video_id IN ({', '.join('?' * len(chunk))}) AND expires_at > ?;",
+                                 (*chunk, now))
+            entries.update({row["video_id"]: row for row in rows})
+        return entries
+
+    @connect()
+    def remove(self, video_id: str) -> bool:
+        """
+        Forget a video, e.g. when its comments are turned on again.
+
+        :param video_id: (str) the video id
+        :return: (bool) whether the video was cached
+        """
+        return len(self._execute(f"DELETE FROM {self.table_name} WHERE video_id = ? RETURNING video_id;", (video_id,))) > 0
+
+    @connect()
+    def purge_expired(self) -> int:
+        """
+        Delete the expired entries.
+
+        :return: (int) the number of deleted entries
+        """
+        rows = self._execute(f"DELETE FROM {self.table_name} WHERE expires_at <= ? RETURNING video_id;", (time.time(),))
+        return len(rows)
+
+    @connect()
+    def count_by_reason(self) -> Dict[str, int]:
+        """
+        Count the unexpired entries of each reason.
+
+        :return: (Dict[str, int]) {reason: count}
+        """
+        rows = self._execute(f"SELECT reason, COUNT(*) AS n FROM {self.table_name} WHERE expires_at > ? GROUP BY reason;", (time.time(),))
+        return {row["reason"]: row["n"] for row in rows}
+
+
+__all__ = ['NegativeResultCache', 'NegativeReason']
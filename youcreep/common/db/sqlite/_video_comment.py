@@ -1,13 +1,59 @@
-from typing import Dict
+import time
+import logging
+from typing import Dict, List, Union
 
+from cetino.db.sqlite._decorator import connect
 from cetino.db.sqlite.type import SQLiteDataType
 from cetino.db.sqlite.table_storage import SQLiteTableStorage
 
+from youcreep.common.pojo import VideoComment
+from youcreep.common.text_utils import parse_relative_time, parse_like_count
+from ._execute import ParamsExecuteMixin
 
-class VideoCommentTableStorage(SQLiteTableStorage):
 
+class VideoCommentTableStorage(ParamsExecuteMixin, SQLiteTableStorage):
+    """
+    The comments table, optionally with an FTS5 full-text index over `content_text` and `author_name`, and with
+    per-video aggregates.
+
+    The index is an external-content FTS5 table(`{table_name}_fts`) sharing the rowid of the comments, kept in sync by
+    triggers, so any insert, update or delete of the comments updates it in the same transaction. Search it with
+    `search`, which returns the comments ranked by bm25.
+
+    The aggregates(`{table_name}_stats`, one row per video: comment count, reply count, distinct authors, like sum,
+    max like count and latest publish time) are maintained by triggers as well, so `video_stats` reads O(videos) rows
+    instead of loading the comments. The distinct authors are tracked in `{table_name}_author`. Deleting a comment
+    recomputes the max and latest of its video through the `(video_id, ...)` indexes. Updating a comment in place is
+    not tracked, call `rebuild_stats` after such updates.
+
+    `publish_ts` is the unix timestamp estimated from the relative `publish_time`(e.g. "3天前") as of the capture of the
+    page, pass `captured_at`(e.g. the mtime of the saved page) when ingesting an older page, so the comments can be
+    filtered by time. The rows of a table created before `publish_ts` are estimated as of the migration. `like_num` is the number parsed from `like_count`(e.g. "1.2万", 0 when it is empty).
+
+    **Note: `VACUUM` may renumber the rowids of the comments, call `rebuild_fts` after it.**
+    """
     primary_key_tuple = ("comment_id",)
 
+    fts_tokenizer = "unicode61 remove_diacritics 2"
+    """the FTS5 tokenizer, use "trigram" for substring matching in languages without spaces(e.g. Chinese), at ~3x the index size"""
+
+    fts_weights = (1.0, 0.5)
+    """the bm25 weights of `content_text` and `author_name`"""
+
+    stats_order_fields = ("n_comments", "n_replies", "reply_ratio", "n_authors", "like_sum", "max_like_num", "latest_publish_ts")
+    """the fields `video_stats` can be ordered by"""
+
+    def __init__(self, data_path, log_path=None, fts: bool = False, stats: bool = False):
+        """
+        :param data_path: (str | pathlib.Path) database file path
+        :param log_path: (str | pathlib.Path | None) log file path, if None, only print to console
+        :param fts: (bool) whether `create` creates the full-text index, an existing index is kept in sync regardless
+        :param stats: (bool) whether `create` creates the per-video aggregates, existing ones are kept in sync regardless
+        """
+        super().__init__(data_path, log_path)
+        self.fts = fts
+        self.stats = stats
+
     @property
     def fields(self) -> Dict[str, SQLiteDataType]:
         return {
@@ -20,9 +66,309 @@ class VideoCommentTableStorage(SQLiteTableStorage):
             "video_id": SQLiteDataType.TEXT,
             "author_thumbnail": SQLiteDataType.TEXT,
             "content_text": SQLiteDataType.TEXT,
-            "like_count": SQLiteDataType.TEXT
+            "like_count": SQLiteDataType.TEXT,
+            "publish_ts": SQLiteDataType.REAL,
+            "like_num": SQLiteDataType.INTEGER,
         }
 
     @property
     def table_name(self) -> str:
         return "video_comment"
+
+    @property
+    def fts_table_name(self) -> str:
+        return f"{self.table_name}_fts"
+
+    @property
+    def stats_table_name(self) -> str:
+        return f"{self.table_name}_stats"
+
+    @property
+    def author_table_name(self) -> str:
+        return f"{self.table_name}_author"
+
+    @connect(commit=True)
+    def create(self, allow_exist: bool = False):
+        super().create(allow_exist=allow_exist)
+        # tables created before `publish_ts` and `like_num` were introduced
+        existing = {row["name"] for row in self._execute(f"PRAGMA table_info({self.table_name});")}
+        for field_name, field_type in self.fields.items():
+            if field_name not in existing:
+                self._execute(f"ALTER TABLE {self.table_name} ADD COLUMN {field_name} {field_type.value}")
+        if "like_num" not in existing:
+            self._conn.create_function("parse_like_count", 1, parse_like_count, deterministic=True)
+            self._execute(f"UPDATE {self.table_name} SET like_num = parse_like_count(like_count);")
+        if "publish_ts" not in existing:
+            # the capture time of the rows is unknown, read their relative publish time as of now
+            now = time.time()
+            self._conn.create_function("parse_relative_time", 1, lambda text: parse_relative_time(text, now=now))
+            self._execute(f"UPDATE {self.table_name} SET publish_ts = parse_relative_time(publish_time);")
+        self._execute(f"CREATE INDEX IF NOT EXISTS {self.table_name}_video_idx ON {self.table_name} (video_id, publish_ts)")
+        self._execute(f"CREATE INDEX IF NOT EXISTS {self.table_name}_like_idx ON {self.table_name} (video_id, like_num DESC)")
+        if self.fts:
+            self._create_fts()
+        if self.stats:
+            self._create_stats()
+
+    @connect(commit=True)
+    def insert(self, record: dict, captured_at: float = None):
+        """
+        :param record: (dict) the comment
+        :param captured_at: (float) the unix timestamp the page of the comment was captured, default is now
+        """
+        return self._insert_records([record], captured_at=captured_at)
+
+    @connect(commit=True)
+    def insert_many(self, record_list: list, captured_at: float = None):
+        """
+        :param record_list: (list) the comments
+        :param captured_at: (float) the unix timestamp the page of the comments was captured(e.g. the mtime of the
+            saved page), `publish_ts` is estimated as of it. Default is now
+        """
+        return self._insert_records(record_list, captured_at=captured_at)
+
+    @connect(commit=True)
+    def rebuild_fts(self) -> None:
+        """
+        Rebuild the full-text index from the comments, e.g. after `VACUUM`.
+
+        :return: (None)
+        """
+        self._execute(f"INSERT INTO {self.fts_table_name}({self.fts_table_name}) VALUES ('rebuild');")
+        self._log(f"Full-text index {self.fts_table_name} rebuilt", level=logging.INFO)
+
+    @connect()
+    def search(self,
+               query: str,
+               video_id: Union[str, List[str]] = None,
+               published_after: float = None,
+               published_before: float = None,
+               limit: int = 50,
+               offset: int = 0,
+               raw_query: bool = False,
+               use_pandas: bool = False) -> List[VideoComment]:
+        """
+        Full-text search the comments, ranked by bm25(best first).
+
+        :param query: (str) the search terms, all of them must match(in `content_text` or `author_name`), a blank query
+            matches nothing
+        :param video_id: (str | List[str]) only search the comments of these videos, None for all videos
+        :param published_after: (float) only the comments published after this unix timestamp
+        :param published_before: (float) only the comments published before this unix timestamp
+        :param limit: (int) the maximum number of results
+        :param offset: (int) the number of results to skip
+        :param raw_query: (bool) pass `query` to FTS5 as is(e.g. `"exact phrase" OR pref*`), by default each term is
+            quoted so that no character is taken as FTS5 syntax
+        :param use_pandas: (bool) whether to return a pandas.DataFrame with a `rank` column
+        :return: (List[VideoComment]) the comments
+        """
+        match_query = query.strip() if raw_query else " ".join('"' + term.replace('"', '""') + '"' for term in query.split())
+        if not match_query:
+            # FTS5 rejects an empty query, and nothing matches it
+            if use_pandas:
+                import pandas as pd
+                return pd.DataFrame()
+            return []
+        clauses, params = [f"{self.fts_table_name} MATCH ?"], [match_query]
+        if video_id is not None:
+            video_ids = [video_id] if isinstance(video_id, str) else list(video_id)
+            clauses.append(f"c.video_id IN ({', '.join('?' * len(video_ids))})")
+            params += video_ids
+        if published_after is not None:
+            clauses.append("c.publish_ts >= ?")
+            params.append(published_after)
+        if published_before is not None:
+            clauses.append("c.publish_ts < ?")
+            params.append(published_before)
+        weights = ", ".join(str(weight) for weight in self.fts_weights)
+        start = time.perf_counter()
+        rows = self._execute(f"""
+SELECT c.*, bm25({self.fts_table_name}, {weights}) AS rank
+FROM {self.fts_table_name} JOIN {self.table_name} AS c ON c.rowid = {self.fts_table_name}.rowid
+WHERE {' AND '.join(clauses)}
+ORDER BY rank
+LIMIT ? OFFSET ?;""", (*params, limit, offset))
+        self._log(f"Full-text search {match_query!r} returned {len(rows)} comments in {(time.perf_counter() - start) * 1000:.1f}ms", level=logging.INFO)
+        if use_pandas:
+            import pandas as pd
+            return pd.DataFrame(rows)
+        return [VideoComment.from_dict(row) for row in rows]
+
+    @connect(commit=True)
+    def rebuild_stats(self) -> None:
+        """
+        Recompute the per-video aggregates from the comments.
+
+        :return: (None)
+        """
+        stats, authors, table = self.stats_table_name, self.author_table_name, self.table_name
+        self._execute(f"DELETE FROM {stats};")
+        self._execute(f"DELETE FROM {authors};")
+        self._execute(f"""
+INSERT INTO {authors} (video_id, author_url, n_comments)
+SELECT video_id, COALESCE(author_url, author_name, ''), COUNT(*) FROM {table} GROUP BY 1, 2;""")
+        self._execute(f"""
+INSERT INTO {stats} (video_id, n_comments, n_replies, n_authors, like_sum, max_like_num, latest_publish_ts)
+SELECT video_id, COUNT(*), SUM(COALESCE(is_reply, 0)),
+       (SELECT COUNT(*) FROM {authors} AS a WHERE a.video_id = c.video_id),
+       SUM(COALESCE(like_num, 0)), MAX(like_num), MAX(publish_ts)
+FROM {table} AS c GROUP BY video_id;""")
+        self._log(f"Aggregates {stats} rebuilt", level=logging.INFO)
+
+    @connect()
+    def video_stats(self,
+                    video_id: Union[str, List[str]] = None,
+                    order_by: str = "n_comments",
+                    descending: bool = True,
+                    limit: int = None,
+                    use_pandas: bool = False) -> List[dict]:
+        """
+        Get the aggregates of each video, read from the aggregate table without touching the comments.
+
+        :param video_id: (str | List[str]) only these videos, None for all videos
+        :param order_by: (str) one of `stats_order_fields`
+        :param descending: (bool) whether to order descending
+        :param limit: (int) the maximum number of videos, None for no limit
+        :param use_pandas: (bool) whether to return a pandas.DataFrame indexed by video_id
+        :return: (List[dict]) {'video_id', 'n_comments', 'n_replies', 'reply_ratio', 'n_authors', 'like_sum',
+            'max_like_num', 'latest_publish_ts'} of each video
+        """
+        assert order_by in self.stats_order_fields, f"order_by should be one of {self.stats_order_fields}, got {order_by}"
+        clause, params = "", []
+        if video_id is not None:
+            video_ids = [video_id] if isinstance(video_id, str) else list(video_id)
+            clause = f"WHERE video_id IN ({', '.join('?' * len(video_ids))})"
+            params += video_ids
+        limit_clause = ""
+        if limit is not None:
+            limit_clause = "LIMIT ?"
+            params.append(limit)
+        rows = self._execute(f"""
+SELECT video_id, n_comments, n_replies, CAST(n_replies AS REAL) / n_comments AS reply_ratio, n_authors, like_sum,
+       max_like_num, latest_publish_ts
+FROM {self.stats_table_name} {clause}
+ORDER BY {order_by} {'DESC' if descending else 'ASC'}
+{limit_clause};""", tuple(params))
+        if use_pandas:
+            import pandas as pd
+            return pd.DataFrame(rows).set_index("video_id") if rows else pd.DataFrame(columns=["video_id"]).set_index("video_id")
+        return rows
+
+    @connect()
+    def top_comments(self, video_id: str, k: int = 10) -> List[VideoComment]:
+        """
+        Get the most liked comments of a video, through the `(video_id, like_num)` index.
+
+        :param video_id: (str) the video id
+        :param k: (int) the number of comments
+        :return: (List[VideoComment]) the comments, most liked first
+        """
+        rows = self._execute(f"SELECT * FROM {self.table_name} WHERE video_id = ? ORDER BY like_num DESC LIMIT ?;", (video_id, k))
+        return [VideoComment.from_dict(row) for row in rows]
+
+    @connect()
+    def video_comments(self, video_id: str) -> List[VideoComment]:
+        """
+        Get all the comments of a video, through the `video_id` index, e.g. to build a `CommentThreadIndex`.
+
+        :param video_id: (str) the video id
+        :return: (List[VideoComment]) the comments
+        """
+        rows = self._execute(f"SELECT * FROM {self.table_name} WHERE video_id = ?;", (video_id,))
+        return [VideoComment.from_dict(row) for row in rows]
+
+    def _create_stats(self) -> None:
+        stats, authors, table = self.stats_table_name, self.author_table_name, self.table_name
+        author_key = "COALESCE({row}.author_url, {row}.author_name, '')"
+        is_new = not self._execute("SELECT 1 FROM sqlite_master WHERE type = 'table' AND name = ?;", (stats,))
+        self._execute(f"""
+CREATE TABLE IF NOT EXISTS {stats} (
+    video_id TEXT PRIMARY KEY, n_comments INTEGER, n_replies INTEGER, n_authors INTEGER, like_sum INTEGER,
+    max_like_num INTEGER, latest_publish_ts REAL
+);""")
+        self._execute(f"""
+CREATE TABLE IF NOT EXISTS {authors} (
+    video_id TEXT, author_url TEXT, n_comments INTEGER, PRIMARY KEY (video_id, author_url)
+) WITHOUT ROWID;""")
+        self._execute(f"""
+CREATE TRIGGER IF NOT EXISTS {stats}_ai AFTER INSERT ON {table} BEGIN
+    INSERT INTO {stats} (video_id, n_comments, n_replies, n_authors, like_sum, max_like_num, latest_publish_ts)
+    VALUES (new.video_id, 1, COALESCE(new.is_reply, 0), 0, COALESCE(new.like_num, 0), new.like_num, new.publish_ts)
+    ON CONFLICT (video_id) DO UPDATE SET
+        n_comments = n_comments + 1,
+        n_replies = n_replies + excluded.n_replies,
+        like_sum = like_sum + excluded.like_sum,
+        max_like_num = MAX(COALESCE(max_like_num, excluded.max_like_num), COALESCE(excluded.max_like_num, max_like_num)),
+        latest_publish_ts = MAX(COALESCE(latest_publish_ts, excluded.latest_publish_ts), COALESCE(excluded.latest_publish_ts, latest_publish_ts));
+    INSERT INTO {authors} (video_id, author_url, n_comments) VALUES (new.video_id, {author_key.format(row="new")}, 1)
+    ON CONFLICT (video_id, author_url) DO UPDATE SET n_comments = n_comments + 1;
+END;""")
+        self._execute(f"""
+CREATE TRIGGER IF NOT EXISTS {stats}_ad AFTER DELETE ON {table} BEGIN
+    UPDATE {stats} SET
+        n_comments = n_comments - 1,
+        n_replies = n_replies - COALESCE(old.is_reply, 0),
+        like_sum = like_sum - COALESCE(old.like_num, 0),
+        max_like_num = (SELECT MAX(like_num) FROM {table} WHERE video_id = old.video_id),
+        latest_publish_ts = (SELECT MAX(publish_ts) FROM {table} WHERE video_id = old.video_id)
+    WHERE video_id = old.video_id;
+    UPDATE {authors} SET n_comments = n_comments - 1 WHERE video_id = old.video_id AND author_url = {author_key.format(row="old")};
+    DELETE FROM {authors} WHERE video_id = old.video_id AND author_url = {author_key.format(row="old")} AND n_comments <= 0;
+    DELETE FROM {stats} WHERE video_id = old.video_id AND n_comments <= 0;
+END;""")
+        # a new author of a video counts as one more distinct author
+        self._execute(f"""
+CREATE TRIGGER IF NOT EXISTS {authors}_ai AFTER INSERT ON {authors} BEGIN
+    UPDATE {stats} SET n_authors = n_authors + 1 WHERE video_id = new.video_id;
+END;""")
+        self._execute(f"""
+CREATE TRIGGER IF NOT EXISTS {authors}_ad AFTER DELETE ON {authors} BEGIN
+    UPDATE {stats} SET n_authors = n_authors - 1 WHERE video_id = old.video_id;
+END;""")
+        if is_new:
+            # aggregate the comments inserted before the aggregates existed
+            self.rebuild_stats()
+            self._log(f"Aggregates {stats} created", level=logging.INFO)
+
+    def _create_fts(self) -> None:
+        fts, table = self.fts_table_name, self.table_name
+        is_new = not self._execute("SELECT 1 FROM sqlite_master WHERE type = 'table' AND name = ?;", (fts,))
+        self._execute(f"""
+CREATE VIRTUAL TABLE IF NOT EXISTS {fts} USING fts5(
+    content_text, author_name, content='{table}', content_rowid='rowid', tokenize='{self.fts_tokenizer}'
+);""")
+        self._execute(f"""
+CREATE TRIGGER IF NOT EXISTS {fts}_ai AFTER INSERT ON {table} BEGIN
+    INSERT INTO {fts}(rowid, content_text, author_name) VALUES (new.rowid, new.content_text, new.author_name);
+END;""")
+        self._execute(f"""
+CREATE TRIGGER IF NOT EXISTS {fts}_ad AFTER DELETE ON {table} BEGIN
+    INSERT INTO {fts}({fts}, rowid, content_text, author_name) VALUES ('delete', old.rowid, old.content_text, old.author_name);
+END;""")
+        self._execute(f"""
+CREATE TRIGGER IF NOT EXISTS {fts}_au AFTER UPDATE OF content_text, author_name ON {table} BEGIN
+    INSERT INTO {fts}({fts}, rowid, content_text, author_name) VALUES ('delete', old.rowid, old.content_text, old.author_name);
+    INSERT INTO {fts}(rowid, content_text, author_name) VALUES (new.rowid, new.content_text, new.author_name);
+END;""")
+        if is_new:
+            # index the comments inserted before the index existed
+            self._execute(f"INSERT INTO {fts}({fts}) VALUES ('rebuild');")
+            self._log(f"Full-text index {fts} created", level=logging.INFO)
+
+    def _insert_records(self, records: List[dict], captured_at: float = None) -> int:
+        # parameterized executemany instead of one huge literal statement, the triggers index and aggregate each row on the way
+        now = time.time() if captured_at is None else captured_at
+        field_names = self.field_names_list
+        rows = []
+        for record in records:
+            record = {**record,
+                      "publish_ts": record.get("publish_ts", parse_relative_time(record.get("publish_time"), now=now)),
+                      "like_num": record.get("like_num", parse_like_count(record.get("like_count")))}
+            rows.append(tuple(record.get(field) for field in field_names))
+        cursor = self._conn.executemany(
+            f"INSERT INTO {self.table_name} ({', '.join(field_names)}) VALUES ({', '.join('?' * len(field_names))});", rows)
+        self._log(f"Inserted {cursor.rowcount} records into {self.table_name}", level=logging.DEBUG)
+        return cursor.rowcount
+
+
+__all__ = ['VideoCommentTableStorage']
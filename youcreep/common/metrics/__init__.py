@@ -0,0 +1,3 @@
+from ._recorder import MetricsRecorder
+from ._exporter import JsonLinesExporter, PrometheusTextExporter
+from ._profiler import StackSampler, CrawlProfiler
@@ -0,0 +1,128 @@
+import os
+import json
+import pathlib
+from typing import Union
+
+from ._recorder import MetricsRecorder
+
+
+class JsonLinesExporter:
+    """
+    Export the events of a `MetricsRecorder` as JSON lines, appending to a local file.
+
+    Each line is an event: {"ts": float, "kind": "timer" | "counter" | "gauge", "name": str, "value": float, "labels": dict}
+    """
+    def __init__(self, file_path: Union[str, pathlib.Path]):
+        """
+        :param file_path: (str, pathlib.Path) the JSON lines file path
+        """
+        self._file_path = pathlib.Path(file_path)
+
+    def export(self, metrics: MetricsRecorder, **extra_labels) -> int:
+        """
+        Pop the events from `metrics` and append them to the file.
+
+        :param metrics: (MetricsRecorder) the metrics recorder
+        :param extra_labels: (dict) labels added to every event, e.g. job id
+        :return: (int) the number of exported events
+        """
+        events = metrics.pop_events()
+        self._file_path.parent.mkdir(parents=True, exist_ok=True)
+        with open(self._file_path, "a", encoding="utf-8") as f:
+            for event in events:
+                event["labels"] = {**event["labels"], **extra_labels}
+                f.write(json.dumps(event, ensure_ascii=False) + "\n")
+        return len(events)
+
+    @property
+    def file_path(self) -> pathlib.Path:
+        return self._file_path
+
+
+class PrometheusTextExporter:
+    """
+    Export the aggregated metrics of a `MetricsRecorder` in Prometheus text format.
+
+    The metrics can be written to a local file(e.g. for node_exporter textfile collector) or pushed to an endpoint
+    (e.g. a Prometheus Pushgateway url).
+
+    - timers are exported as summaries: `youcreep_<name>_seconds_count`, `youcreep_<name>_seconds_sum`
+    - counters are exported as `youcreep_<name>_total`
+    - gauges are exported as `youcreep_<name>`
+    """
+    prefix = "youcreep_"
+
+    def __init__(self, file_path: Union[str, pathlib.Path] = None, url: str = None, timeout: float = 5.):
+        """
+        :param file_path: (str, pathlib.Path) the file to write, None for not writing
+        :param url: (str) the endpoint to push to with HTTP PUT, None for not pushing
+        :param timeout: (float) the timeout of pushing, in seconds
+        """
+        assert file_path is not None or url is not None, "Either file_path or url should be provided"
+        self._file_path = None if file_path is None else pathlib.Path(file_path)
+        self._url = url
+        self._timeout = timeout
+
+    def export(self, metrics: MetricsRecorder) -> str:
+        """
+        Export the metrics to the file and/or the endpoint.
+
+        :param metrics: (MetricsRecorder) the metrics recorder
+        :return: (str) the exported text
+        """
+        text = self.render(metrics)
+        if self._file_path is not None:
+            # write to a temp file then rename, so that the collector never reads a partial file
+            self._file_path.parent.mkdir(parents=True, exist_ok=True)
+            tmp_path = self._file_path.with_name(f".{self._file_path.name}.tmp")
+            tmp_path.write_text(text, encoding="utf-8")
+            os.replace(tmp_path, self._file_path)
+        if self._url is not None:
+            import urllib.request  # only needed by pushing, it is slow to import
+            request = urllib.request.Request(self._url, data=text.encode("utf-8"), method="PUT",
+                                             headers={"Content-Type": "text/plain; version=0.0.4"})
+            with urllib.request.urlopen(request, timeout=self._timeout):
+                pass
+        return text
+
+    @classmethod
+    def render(cls, metrics: MetricsRecorder) -> str:
+        """
+        Render the metrics in Prometheus text format.
+
+        :param metrics: (MetricsRecorder) the metrics recorder
+        :return: (str) the text
+        """
+        lines = []
+        for name, series in cls._group(metrics.timers).items():
+            metric_name = f"{cls.prefix}{name}_seconds"
+            lines.append(f"# TYPE {metric_name} summary")
+            for labels, stat in series:
+                lines.append(f"{metric_name}_count{cls._labels_str(labels)} {stat['count']}")
+                lines.append(f"{metric_name}_sum{cls._labels_str(labels)} {stat['sum']}")
+        for name, series in cls._group(metrics.counters).items():
+            metric_name = f"{cls.prefix}{name}_total"
+            lines.append(f"# TYPE {metric_name} counter")
+            lines.extend(f"{metric_name}{cls._labels_str(labels)} {value}" for labels, value in series)
+        for name, series in cls._group(metrics.gauges).items():
+            metric_name = f"{cls.prefix}{name}"
+            lines.append(f"# TYPE {metric_name} gauge")
+            lines.extend(f"{metric_name}{cls._labels_str(labels)} {value}" for labels, value in series)
+        return "\n".join(lines) + "\n"
+
+    @staticmethod
+    def _group(metric_dict: dict) -> dict:
+        grouped = {}
+        for (name, labels), value in metric_dict.items():
+            grouped.setdefault(name, []).append((labels, value))
+        return grouped
+
+    @staticmethod
+    def _labels_str(labels: tuple) -> str:
+        if not labels:
+            return ""
+        escaped = [(k, v.replace("\\", "\\\\").replace("\n", "\\n").replace('"', '\\"')) for k, v in labels]
+        return "{" + ",".join(f'{k}="{v}"' for k, v in escaped) + "}"
+
+
+__all__ = ['JsonLinesExporter', 'PrometheusTextExporter']
@@ -0,0 +1,212 @@
+import os
+import re
+import sys
+import json
+import time
+import random
+import pathlib
+import threading
+import contextlib
+from typing import Dict, Union
+
+_idle_functions = {"select", "poll", "epoll", "_run_once", "run_forever"}
+"""the innermost functions of the event loop thread when it waits for the browser or the network"""
+
+_unsafe_name_regexp = re.compile(r"[^\w.-]+")
+
+
+class StackSampler:
+    """
+    A sampling profiler of one thread, in the standard library only.
+
+    A daemon thread reads the stack of the target thread every `interval` seconds through `sys._current_frames()`, and
+    counts the collapsed stacks(`outer;...;inner`), the input format of flamegraph.pl, speedscope and py-spy. Unlike
+    `cProfile`, the overhead does not depend on the number of calls, so it is cheap enough to leave on in production.
+    """
+    def __init__(self, interval: float = 0.005, max_stacks: int = 20000, thread_id: int = None):
+        """
+        :param interval: (float) the sampling interval in seconds
+        :param max_stacks: (int) the maximum number of distinct stacks, the others are counted as `[truncated]`
+        :param thread_id: (int) the thread to sample, default is the thread calling `start`
+        """
+        self.interval = interval
+        self.max_stacks = max_stacks
+        self._thread_id = thread_id
+        self._stacks: Dict[str, int] = {}
+        self._n_samples = 0
+        self._n_idle_samples = 0
+        self._n_truncated_samples = 0
+        self._stop_event = threading.Event()
+        self._thread: Union[threading.Thread, None] = None
+
+    def start(self) -> None:
+        if self._thread_id is None:
+            self._thread_id = threading.get_ident()
+        self._stop_event.clear()
+        self._thread = threading.Thread(target=self._run, name="youcreep-stack-sampler", daemon=True)
+        self._thread.start()
+
+    def stop(self) -> None:
+        self._stop_event.set()
+        if self._thread is not None:
+            self._thread.join()
+            self._thread = None
+
+    def write_collapsed(self, file_path: Union[str, pathlib.Path], max_bytes: int = None) -> int:
+        """
+        Write the collapsed stacks, one `stack count` per line, the most frequent first.
+
+        :param file_path: (str, pathlib.Path) the output file
+        :param max_bytes: (int) the maximum size of the file, the least frequent stacks which do not fit are counted
+            as `[truncated]` on the last line. None for no limit
+        :return: (int) the size of the file in bytes
+        """
+        lines, size, n_dropped = [], 0, 0
+        # keep room for the `[truncated]` line, the count of which is at most the number of samples
+        reserve = len(f"[truncated] {self._n_samples}\n")
+        for stack, count in sorted(self._stacks.items(), key=lambda item: -item[1]):
+            line = f"{stack} {count}\n".encode("utf-8")
+            if n_dropped or (max_bytes is not None and size + len(line) + reserve > max_bytes):
+                n_dropped += count
+                continue
+            lines.append(line)
+            size += len(line)
+        if n_dropped and size + reserve <= max_bytes:
+            lines.append(f"[truncated] {n_dropped}\n".encode("utf-8"))
+        self._n_truncated_samples = n_dropped
+        with open(file_path, "wb") as f:
+            f.writelines(lines)
+        return os.path.getsize(file_path)
+
+    def _run(self) -> None:
+        while not self._stop_event.wait(self.interval):
+            frame = sys._current_frames().get(self._thread_id)
+            if frame is None:
+                continue
+            self._n_samples += 1
+            if frame.f_code.co_name in _idle_functions:
+                self._n_idle_samples += 1
+            names = []
+            while frame is not None:
+                code = frame.f_code
+                names.append(f"{code.co_name} ({os.path.basename(code.co_filename)}:{code.co_firstlineno})")
+                frame = frame.f_back
+            stack = ";".join(reversed(names))
+            if stack not in self._stacks and len(self._stacks) >= self.max_stacks:
+                stack = "[truncated]"
+            self._stacks[stack] = self._stacks.get(stack, 0) + 1
+
+    @property
+    def n_samples(self) -> int:
+        return self._n_samples
+
+    @property
+    def n_truncated_samples(self) -> int:
+        """the samples of the stacks cut from the last `write_collapsed` for lack of room"""
+        return self._n_truncated_samples
+
+    @property
+    def n_idle_samples(self) -> int:
+        """the samples where the event loop waited, i.e. the time spent in the browser or the network"""
+        return self._n_idle_samples
+
+
+class CrawlProfiler:
+    """
+    Profile a sample of crawls, to tell whether a slow crawl spends its time in Python(callbacks, parsing) or in the
+    browser(layout, network).
+
+    A profiled crawl runs under a `StackSampler` and a Playwright trace(network and action timings, no screenshots and
+    no DOM snapshots), and writes a bundle directory `{profile_dir}/{job_name}_{timestamp}/`:
+
+    - `profile.collapsed`: the collapsed Python stacks, e.g. `flamegraph.pl profile.collapsed > flame.svg`
+    - `trace.zip`: the Playwright trace, open it with `playwright show-trace trace.zip`
+    - `meta.json`: the job, the wall time, the samples and the ratio of time the event loop waited for the browser
+
+    A bundle never exceeds `max_bundle_mb` besides the small `meta.json`: the least frequent stacks are cut from
+    `profile.collapsed` and the trace is dropped if they do not fit, which is recorded in `meta.json`.
+    """
+    def __init__(self,
+                 profile_dir: Union[str, pathlib.Path],
+                 sample_ratio: float = 1.,
+                 interval: float = 0.005,
+                 trace: bool = True,
+                 max_bundle_mb: float = 50.):
+        """
+        :param profile_dir: (str, pathlib.Path) the directory of the bundles
+        :param sample_ratio: (float) the ratio of crawls to profile, e.g. 0.01 for 1% of the production jobs
+        :param interval: (float) the sampling interval of the Python stacks in seconds
+        :param trace: (bool) whether to record a Playwright trace
+        :param max_bundle_mb: (float) the maximum size of a bundle in MB
+        """
+        assert 0. <= sample_ratio <= 1., f"sample_ratio should be in [0, 1], got {sample_ratio}"
+        self.profile_dir = pathlib.Path(profile_dir)
+        self.sample_ratio = sample_ratio
+        self.interval = interval
+        self.trace = trace
+        self.max_bundle_mb = max_bundle_mb
+
+    def should_profile(self) -> bool:
+        """
+        :return: (bool) whether to profile the next crawl, drawn with probability `sample_ratio`
+        """
+        return random.random() < self.sample_ratio
+
+    @contextlib.asynccontextmanager
+    async def profile(self, browser_context, job_name: str, meta: dict = None):
+        """
+        Profile the wrapped block and write its bundle, the bundle is written even if the block raises.
+
+        :param browser_context: (playwright.async_api.BrowserContext) the context to trace, None for no trace
+        :param job_name: (str) the name of the job, e.g. the `_crawler_args_str` of the crawl
+        :param meta: (dict) extra information written into `meta.json`, e.g. the crawl arguments
+        """
+        safe_name = _unsafe_name_regexp.sub("_", job_name)[:150]
+        bundle_dir = self.profile_dir / f"{safe_name}_{time.strftime('%Y%m%d-%H%M%S')}_{int(time.time() * 1000) % 1000:03d}"
+        bundle_dir.mkdir(parents=True, exist_ok=True)
+        tracing = browser_context is not None and self.trace
+        if tracing:
+            await browser_context.tracing.start(title=job_name, screenshots=False, snapshots=False, sources=False)
+        sampler = StackSampler(interval=self.interval)
+        error = None
+        start = time.perf_counter()
+        sampler.start()
+        try:
+            yield bundle_dir
+        except BaseException as e:
+            error = repr(e)
+            raise
+        finally:
+            sampler.stop()
+            wall_seconds = time.perf_counter() - start
+            budget = int(self.max_bundle_mb * 2 ** 20)
+            budget -= sampler.write_collapsed(bundle_dir / "profile.collapsed", max_bytes=budget)
+            trace_status = "off"
+            if tracing:
+                trace_status = await self._stop_tracing(browser_context, bundle_dir / "trace.zip", budget)
+            with open(bundle_dir / "meta.json", "w", encoding="utf-8") as f:
+                json.dump({
+                    "job_name": job_name,
+                    "meta": meta,
+                    "error": error,
+                    "wall_seconds": wall_seconds,
+                    "interval": self.interval,
+                    "n_samples": sampler.n_samples,
+                    "n_truncated_samples": sampler.n_truncated_samples,
+                    "browser_wait_ratio": sampler.n_idle_samples / sampler.n_samples if sampler.n_samples else None,
+                    "trace": trace_status,
+                }, f, ensure_ascii=False, indent=2, default=str)
+
+    @staticmethod
+    async def _stop_tracing(browser_context, trace_path: pathlib.Path, budget: int) -> str:
+        try:
+            await browser_context.tracing.stop(path=trace_path)
+        except Exception as e:
+            return f"failed: {e}"
+        if trace_path.stat().st_size > budget:
+            trace_path.unlink()
+            return "dropped: exceeds max_bundle_mb"
+        return "saved"
+
+
+__all__ = ['StackSampler', 'CrawlProfiler']
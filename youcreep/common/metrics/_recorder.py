@@ -0,0 +1,143 @@
+import time
+import threading
+import contextlib
+import collections
+from typing import Dict, Tuple, Deque
+
+
+class MetricsRecorder:
+    """
+    `MetricsRecorder` records structured timers, counters and gauges of a crawl.
+
+    - timer: the durations of a stage(e.g. navigation, scroll loading, parsing), aggregated into count/sum/min/max
+    - counter: a monotonically increasing value(e.g. retries, bytes written)
+    - gauge: a value that can go up and down(e.g. handles alive, comments per second)
+
+    Every metric is identified by its name and labels. Each observation is also kept as an event, so that it can be
+    exported as JSON lines. Use `JsonLinesExporter` or `PrometheusTextExporter` to export the recorded metrics.
+
+    The recorder is thread-safe, e.g. parsers running in an executor thread can record into the crawler's recorder.
+    """
+    def __init__(self, max_events: int = 10000):
+        """
+        :param max_events: (int) the maximum number of events kept in memory, older events are dropped
+        """
+        self._timers: Dict[Tuple, Dict[str, float]] = {}
+        self._counters: Dict[Tuple, float] = {}
+        self._gauges: Dict[Tuple, float] = {}
+        self._events: Deque[dict] = collections.deque(maxlen=max_events)
+        self._lock = threading.RLock()
+
+    @contextlib.contextmanager
+    def timer(self, name: str, **labels):
+        """
+        Time the wrapped block, works in both sync and async code.
+
+        e.g. `with metrics.timer("navigation", page_type="video"): ...`
+
+        :param name: (str) the timer name
+        :param labels: (dict) the labels of the timer
+        """
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.observe(name, time.perf_counter() - start, **labels)
+
+    def observe(self, name: str, seconds: float, **labels) -> None:
+        """
+        Record a duration for the timer `name`.
+
+        :param name: (str) the timer name
+        :param seconds: (float) the duration in seconds
+        :param labels: (dict) the labels of the timer
+        """
+        key = self._key(name, labels)
+        with self._lock:
+            stat = self._timers.setdefault(key, {"count": 0, "sum": 0., "min": seconds, "max": seconds})
+            stat["count"] += 1
+            stat["sum"] += seconds
+            stat["min"] = min(stat["min"], seconds)
+            stat["max"] = max(stat["max"], seconds)
+            self._add_event("timer", name, seconds, labels)
+
+    def incr(self, name: str, value: float = 1, **labels) -> None:
+        """
+        Increase the counter `name` by `value`.
+
+        :param name: (str) the counter name
+        :param value: (float) the increment, should be non-negative
+        :param labels: (dict) the labels of the counter
+        """
+        assert value >= 0, f"counter increment should be non-negative, got {value}"
+        key = self._key(name, labels)
+        with self._lock:
+            self._counters[key] = self._counters.get(key, 0) + value
+            self._add_event("counter", name, value, labels)
+
+    def set_gauge(self, name: str, value: float, **labels) -> None:
+        """
+        Set the gauge `name` to `value`.
+
+        :param name: (str) the gauge name
+        :param value: (float) the value
+        :param labels: (dict) the labels of the gauge
+        """
+        with self._lock:
+            self._gauges[self._key(name, labels)] = value
+            self._add_event("gauge", name, value, labels)
+
+    def add_gauge(self, name: str, delta: float, **labels) -> None:
+        """
+        Add `delta` to the gauge `name`.
+
+        :param name: (str) the gauge name
+        :param delta: (float) the delta, can be negative
+        :param labels: (dict) the labels of the gauge
+        """
+        with self._lock:
+            self.set_gauge(name, self._gauges.get(self._key(name, labels), 0) + delta, **labels)
+
+    def pop_events(self) -> list:
+        """
+        Pop all the recorded events.
+
+        :return: (list) the events, each event is a dict
+        """
+        with self._lock:
+            events = list(self._events)
+            self._events.clear()
+        return events
+
+    def reset(self) -> None:
+        """Clear all the recorded metrics and events."""
+        with self._lock:
+            self._timers.clear()
+            self._counters.clear()
+            self._gauges.clear()
+            self._events.clear()
+
+    @property
+    def timers(self) -> Dict[Tuple, Dict[str, float]]:
+        """{(name, labels): {"count", "sum", "min", "max"}}"""
+        return self._timers
+
+    @property
+    def counters(self) -> Dict[Tuple, float]:
+        """{(name, labels): value}"""
+        return self._counters
+
+    @property
+    def gauges(self) -> Dict[Tuple, float]:
+        """{(name, labels): value}"""
+        return self._gauges
+
+    def _add_event(self, kind: str, name: str, value: float, labels: dict) -> None:
+        self._events.append({"ts": time.time(), "kind": kind, "name": name, "value": value, "labels": labels})
+
+    @staticmethod
+    def _key(name: str, labels: dict) -> Tuple:
+        return name, tuple(sorted((k, str(v)) for k, v in labels.items()))
+
+
+__all__ = ['MetricsRecorder']
@@ -0,0 +1,183 @@
+import abc
+import math
+import struct
+import hashlib
+import pathlib
+from array import array
+from typing import Iterable, List, Union
+
+
+def _key_hash(key: str) -> int:
+    return int.from_bytes(hashlib.blake2b(key.encode("utf-8"), digest_size=8).digest(), "little")
+
+
+class SeenSet(abc.ABC):
+    """
+    A set of the keys(e.g. video ids) seen so far, shared by concurrent jobs to skip what another job already found.
+
+    The jobs of one process share it through the event loop, so no lock is needed. Save it with `save` and load it
+    with `load` to keep it across runs.
+    """
+    _magic = b""
+
+    @abc.abstractmethod
+    def add(self, key: str) -> bool:
+        """
+        :param key: (str) the key
+        :return: (bool) whether the key was not seen before
+        """
+        pass
+
+    @abc.abstractmethod
+    def __contains__(self, key: str) -> bool:
+        pass
+
+    @abc.abstractmethod
+    def __len__(self) -> int:
+        """the number of distinct keys added"""
+        pass
+
+    def update(self, keys: Iterable[str]) -> List[str]:
+        """
+        Add many keys.
+
+        :param keys: (Iterable[str]) the keys
+        :return: (List[str]) the keys not seen before, in order
+        """
+        return [key for key in keys if self.add(key)]
+
+    def save(self, file_path: Union[str, pathlib.Path]) -> None:
+        """
+        :param file_path: (str, pathlib.Path) the file to save the set to
+        """
+        file_path = pathlib.Path(file_path)
+        tmp_path = file_path.with_name(file_path.name + ".tmp")
+        with open(tmp_path, "wb") as f:
+            f.write(self._magic)
+            self._dump(f)
+        # replace at once, so a crash while saving keeps the previous file
+        tmp_path.replace(file_path)
+
+    @classmethod
+    def load(cls, file_path: Union[str, pathlib.Path]):
+        """
+        :param file_path: (str, pathlib.Path) the file saved by `save`, `SeenSet.load` loads any kind of seen-set
+        :return: (SeenSet) the set
+        """
+        with open(file_path, "rb") as f:
+            magic = f.read(4)
+            for seen_cls in ([cls] if cls._magic else cls.__subclasses__()):
+                if seen_cls._magic == magic:
+                    return seen_cls._from_file(f)
+        raise ValueError(f"{file_path} is not saved by {cls.__name__}")
+
+    @abc.abstractmethod
+    def _dump(self, f) -> None:
+        pass
+
+    @classmethod
+    @abc.abstractmethod
+    def _from_file(cls, f):
+        pass
+
+
+class HashSeenSet(SeenSet):
+    """
+    An exact seen-set storing a 64-bit hash of each key instead of the key, saved as a flat array of 8 bytes per key.
+
+    Two keys collide with a probability of about n² / 2^65, i.e. ~3e-8 for a million keys.
+    """
+    _magic = b"YCHS"
+
+    def __init__(self, keys: Iterable[str] = ()):
+        """
+        :param keys: (Iterable[str]) the initial keys
+        """
+        self._hashes = set()
+        self.update(keys)
+
+    def add(self, key: str) -> bool:
+        key_hash = _key_hash(key)
+        if key_hash in self._hashes:
+            return False
+        self._hashes.add(key_hash)
+        return True
+
+    def __contains__(self, key: str) -> bool:
+        return _key_hash(key) in self._hashes
+
+    def __len__(self) -> int:
+        return len(self._hashes)
+
+    def _dump(self, f) -> None:
+        array('Q', self._hashes).tofile(f)
+
+    @classmethod
+    def _from_file(cls, f):
+        hashes = array('Q', f.read())
+        seen_set = cls()
+        seen_set._hashes = set(hashes)
+        return seen_set
+
+
+class BloomSeenSet(SeenSet):
+    """
+    A Bloom filter, about 1.2 bytes per key at a 1% error rate, but it may take an unseen key for a seen one(never the
+    opposite). A job using it may then skip a few new videos, at most `error_rate` of them.
+
+    It is sized for `capacity` keys, the error rate grows beyond them.
+    """
+    _magic = b"YCBF"
+    _header = struct.Struct("<QQQ")
+
+    def __init__(self, capacity: int = 1000000, error_rate: float = 0.01):
+        """
+        :param capacity: (int) the expected number of keys
+        :param error_rate: (float) the probability to take an unseen key for a seen one at `capacity` keys
+        """
+        assert capacity > 0 and 0. < error_rate < 1., f"Invalid capacity {capacity} or error_rate {error_rate}"
+        self.n_bits = max(8, int(math.ceil(-capacity * math.log(error_rate) / math.log(2) ** 2)))
+        self.n_hashes = max(1, int(round(self.n_bits / capacity * math.log(2))))
+        self._bits = bytearray((self.n_bits + 7) // 8)
+        self._n_keys = 0
+
+    def _positions(self, key: str) -> List[int]:
+        # double hashing, k positions from two 64-bit hashes
+        digest = hashlib.blake2b(key.encode("utf-8"), digest_size=16).digest()
+        h1, h2 = int.from_bytes(digest[:8], "little"), int.from_bytes(digest[8:], "little") | 1
+        return [(h1 + i * h2) % self.n_bits for i in range(self.n_hashes)]
+
+    def add(self, key: str) -> bool:
+        is_new = False
+        bits = self._bits
+        for position in self._positions(key):
+            byte, mask = position >> 3, 1 << (position & 7)
+            if not bits[byte] & mask:
+                bits[byte] |= mask
+                is_new = True
+        self._n_keys += is_new
+        return is_new
+
+    def __contains__(self, key: str) -> bool:
+        bits = self._bits
+        return all(bits[position >> 3] & (1 << (position & 7)) for position in self._positions(key))
+
+    def __len__(self) -> int:
+        """the number of keys taken as new, slightly below the number of distinct keys added"""
+        return self._n_keys
+
+    def _dump(self, f) -> None:
+        f.write(self._header.pack(self.n_bits, self.n_hashes, self._n_keys))
+        f.write(self._bits)
+
+    @classmethod
+    def _from_file(cls, f):
+        n_bits, n_hashes, n_keys = cls._header.unpack(f.read(cls._header.size))
+        seen_set = cls.__new__(cls)
+        seen_set.n_bits, seen_set.n_hashes, seen_set._n_keys = n_bits, n_hashes, n_keys
+        seen_set._bits = bytearray(f.read())
+        assert len(seen_set._bits) == (n_bits + 7) // 8, f"The bits of the Bloom filter are truncated"
+        return seen_set
+
+
+__all__ = ['SeenSet', 'HashSeenSet', 'BloomSeenSet']
@@ -0,0 +1,26 @@
+channel_page_sel = 'ytd-browse[page-subtype="channels"]'
+"""channel page, the region needed by `ChannelPageParser`"""
+
+channel_header_sel = "#page-header, ytd-c4-tabbed-header-renderer"
+"""channel header, including the channel name and handle"""
+
+channel_name_sel = "#page-header h1, ytd-c4-tabbed-header-renderer #channel-name #text"
+"""channel name in the channel header"""
+
+rich_item_sel = "ytd-rich-item-renderer"
+"""video card in the videos / shorts tab of a channel"""
+
+rich_item_continuation_sel = "ytd-rich-grid-renderer ytd-continuation-item-renderer"
+"""continuation item at the end of the grid, it disappears when all the videos of the tab are loaded"""
+
+rich_item_link_sel = "a#video-title-link, a#thumbnail, a[href*='/shorts/']"
+"""link to the video in a channel video card"""
+
+rich_item_title_sel = "#video-title"
+"""title of a channel video card"""
+
+rich_item_metadata_sel = "#metadata-line span.inline-metadata-item"
+"""metadata items(view count, publish time) of a channel video card"""
+
+rich_item_duration_sel = "ytd-thumbnail-overlay-time-status-renderer #text"
+"""duration overlay of a channel video card, not shown for shorts"""
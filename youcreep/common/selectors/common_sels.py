@@ -9,6 +9,9 @@ comment_card_sel = "ytd-comment-renderer"
 head_comment_card_sel = "ytd-comment-thread-renderer"
 """comment card for head comment"""
 
+thread_head_comment_card_sel = "ytd-comment-thread-renderer > ytd-comment-renderer"
+"""comment card of head comment only, excluding the replies in the same thread"""
+
 search_input_sel = "input#search"
 """search input"""
 
@@ -20,3 +23,6 @@ search_submit_sel = "#search-icon-legacy"
 
 dismiss_btn_sel = "#dismiss-button"
 """dismiss premium button, this button may pop up when you first visit a video page or other pages"""
+
+consent_accept_btn_sel = 'ytd-consent-bump-v2-lightbox button[aria-label^="Accept"], form[action*="consent.youtube.com"]:last-of-type button'
+"""accept button of the cookie consent dialog, it pops up on the first visit in some regions"""
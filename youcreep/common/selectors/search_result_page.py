@@ -10,3 +10,6 @@ filter_option_sel = "ytd-search-filter-renderer"
 """search filter option"""
 
 video_card_sel = "ytd-video-renderer"
+
+search_results_section_sel = "ytd-search ytd-section-list-renderer"
+"""search results container, the region needed by `SearchPageParser`"""
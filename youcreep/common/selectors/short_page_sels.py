@@ -11,3 +11,15 @@ comment_count_in_panel_sel = "ytd-engagement-panel-title-header-renderer #header
 comment_count_sel = "#comments-button > ytd-button-renderer > yt-button-shape > label > div > span"
 
 like_count_sel = "#like-button > yt-button-shape > label > div > span"
+
+active_reel_sel = "ytd-reel-video-renderer[is-active]"
+"""the short playing in the shorts player, the player keeps the shorts visited before in the DOM"""
+
+next_short_btn_sel = "#navigation-button-down button"
+"""button advancing the shorts player to the next short"""
+
+comment_panel_sel = 'ytd-engagement-panel-section-list-renderer[target-id="engagement-panel-comments-section"]'
+"""comment panel of a short, the region needed by `VideoPageParser`"""
+
+comment_panel_close_btn_sel = f"{comment_panel_sel} #visibility-button button"
+"""button closing the comment panel of a short"""
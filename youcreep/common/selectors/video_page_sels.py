@@ -15,3 +15,18 @@ view_count_sel = "#count .view-count.ytd-video-view-count-renderer"
 
 subtitle_btn_sel = ".ytp-subtitles-button"
 """video subtitle button"""
+
+more_replies_btn_sel = "#more-replies > yt-button-shape > button"
+"""button expanding the replies of a comment thread"""
+
+reply_continuation_btn_sel = "ytd-comment-replies-renderer ytd-continuation-item-renderer button"
+"""'Show more replies' button loading the next batch of replies of an expanded comment thread"""
+
+comments_section_sel = "ytd-comments#comments"
+"""comment section of the video page, the region needed by `VideoPageParser`"""
+
+playability_error_reason_sel = "yt-playability-error-supported-renderers #reason"
+"""reason shown instead of the player when the video is unavailable(deleted, private, blocked)"""
+
+comments_disabled_msg_sel = "ytd-comments#comments ytd-message-renderer"
+"""message shown in the comment section when the comments are turned off"""
@@ -0,0 +1 @@
+from ._sink import RecordSink, JsonLinesSink, AsyncIteratorSink
@@ -0,0 +1,142 @@
+import abc
+import gzip
+import json
+import asyncio
+import pathlib
+from typing import List, Union
+
+
+class RecordSink(abc.ABC):
+    """
+    A sink receiving records(dicts) while crawling, e.g. the comments streamed from the scroll callbacks.
+    """
+    @abc.abstractmethod
+    async def write(self, records: List[dict]) -> None:
+        """
+        Write a batch of records.
+
+        :param records: (List[dict]) the records
+        :return: (None)
+        """
+        raise NotImplementedError
+
+    async def close(self) -> None:
+        """Close the sink, no record can be written after closing."""
+        pass
+
+    async def __aenter__(self):
+        return self
+
+    async def __aexit__(self, exc_type, exc_val, exc_tb):
+        await self.close()
+
+
+class JsonLinesSink(RecordSink):
+    """
+    Append records to rotating JSON lines files, optionally gzip compressed.
+
+    The files are named `{stem}.part{index:04d}{suffix}[.gz]` after `file_path`, a new part is started once the current
+    one holds `max_records` records or `max_bytes` uncompressed bytes. Each batch is flushed to the disk, so the records
+    written before a crash can be read back(a truncated gzip file is readable up to its last flush).
+    """
+    def __init__(self,
+                 file_path: Union[str, pathlib.Path],
+                 compress: bool = False,
+                 max_records: int = 100000,
+                 max_bytes: int = None):
+        """
+        :param file_path: (str, pathlib.Path) the base file path, e.g. `output/abc.jsonl`
+        :param compress: (bool) whether to gzip the files
+        :param max_records: (int) the maximum number of records per file, None for no limit
+        :param max_bytes: (int) the maximum number of uncompressed bytes per file, None for no limit
+        """
+        self._file_path = pathlib.Path(file_path)
+        self._compress = compress
+        self._max_records = max_records
+        self._max_bytes = max_bytes
+        self._file = None
+        self._part_index = -1
+        self._part_records = 0
+        self._part_bytes = 0
+        self._n_records = 0
+        self._part_paths: List[pathlib.Path] = []
+
+    async def write(self, records: List[dict]) -> None:
+        for record in records:
+            if self._file is None or self._part_full():
+                self._rotate()
+            line = json.dumps(record, ensure_ascii=False) + "\n"
+            self._file.write(line)
+            self._part_records += 1
+            self._part_bytes += len(line.encode("utf-8"))
+        self._n_records += len(records)
+        if self._file is not None:
+            self._file.flush()
+
+    async def close(self) -> None:
+        if self._file is not None:
+            self._file.close()
+            self._file = None
+
+    @property
+    def n_records(self) -> int:
+        """the number of records written"""
+        return self._n_records
+
+    @property
+    def part_paths(self) -> List[pathlib.Path]:
+        """the paths of the written files, in order"""
+        return list(self._part_paths)
+
+    def _part_full(self) -> bool:
+        if self._max_records is not None and self._part_records >= self._max_records:
+            return True
+        return self._max_bytes is not None and self._part_bytes >= self._max_bytes
+
+    def _rotate(self) -> None:
+        if self._file is not None:
+            self._file.close()
+        self._part_index += 1
+        self._part_records, self._part_bytes = 0, 0
+        path = self._file_path.with_name(f"{self._file_path.stem}.part{self._part_index:04d}{self._file_path.suffix}")
+        if self._compress:
+            path = path.with_name(path.name + ".gz")
+        path.parent.mkdir(parents=True, exist_ok=True)
+        self._file = gzip.open(path, "at", encoding="utf-8") if self._compress else open(path, "a", encoding="utf-8")
+        self._part_paths.append(path)
+
+
+class AsyncIteratorSink(RecordSink):
+    """
+    Expose the records as an async iterator, e.g. `async for record in sink: ...` in another task.
+
+    With `maxsize`, writing waits when the consumer falls behind.
+    """
+    _end = object()
+
+    def __init__(self, maxsize: int = 0):
+        """
+        :param maxsize: (int) the maximum number of buffered records, 0 for no limit
+        """
+        self._queue: asyncio.Queue = asyncio.Queue(maxsize=maxsize)
+
+    async def write(self, records: List[dict]) -> None:
+        for record in records:
+            await self._queue.put(record)
+
+    async def close(self) -> None:
+        await self._queue.put(self._end)
+
+    def __aiter__(self):
+        return self
+
+    async def __anext__(self) -> dict:
+        record = await self._queue.get()
+        if record is self._end:
+            # keep the end mark for other consumers
+            self._queue.put_nowait(self._end)
+            raise StopAsyncIteration
+        return record
+
+
+__all__ = ['RecordSink', 'JsonLinesSink', 'AsyncIteratorSink']
@@ -0,0 +1,68 @@
+import re
+import time
+from typing import Union
+
+_unit_seconds = {
+    "秒": 1, "分钟": 60, "小时": 3600, "天": 86400, "周": 7 * 86400, "个月": 30 * 86400, "月": 30 * 86400, "年": 365 * 86400,
+    "second": 1, "minute": 60, "hour": 3600, "day": 86400, "week": 7 * 86400, "month": 30 * 86400, "year": 365 * 86400,
+}
+_relative_time_regexp = re.compile(r"(\d+)\s*(" + "|".join(_unit_seconds.keys()) + r")", re.IGNORECASE)
+
+_count_units = {"K": 1e3, "M": 1e6, "B": 1e9, "千": 1e3, "万": 1e4, "萬": 1e4, "亿": 1e8, "億": 1e8}
+# a latin unit must end the word, e.g. not the "m" of "1 month" or "12 members"
+_count_regexp = re.compile(r"(\d[\d,]*(?:\.\d+)?)\s*([KMB](?![A-Za-z])|[千万萬亿億])?", re.IGNORECASE)
+
+
+def parse_count_text(text: Union[str, None]) -> Union[int, None]:
+    """
+    Parse an abbreviated count, e.g. "1.2K views", "1,234 views", "3.4万次观看".
+
+    :param text: (str) the text
+    :return: (int | None) the count, None if no number is found
+    """
+    if not text:
+        return None
+    match = _count_regexp.search(text)
+    if match is None:
+        return None
+    number = float(match.group(1).replace(",", ""))
+    unit = match.group(2)
+    if unit is not None:
+        number *= _count_units[unit.upper()]
+    return int(round(number))
+
+
+def parse_like_count(text: Union[str, None]) -> Union[int, None]:
+    """
+    Parse the like count of a comment, YouTube shows no number(an empty `like_count`) for a comment without likes.
+
+    :param text: (str) the like count text, e.g. "", "12", "1.2K"
+    :return: (int | None) the count, 0 for an empty text, None if the text is missing or holds no number
+    """
+    if text is None:
+        return None
+    if not text.strip():
+        return 0
+    return parse_count_text(text)
+
+
+def parse_relative_time(text: Union[str, None], now: float = None) -> Union[float, None]:
+    """
+    Estimate the absolute time of a relative time text shown by YouTube, e.g. "3小时前", "2 days ago", "1年前（修改过）".
+
+    Months and years are approximated by 30 and 365 days, so the estimate is as coarse as the text.
+
+    :param text: (str) the relative time text
+    :param now: (float) the time the text was read, as a unix timestamp, default is the current time
+    :return: (float | None) the unix timestamp, None if the text is not a relative time
+    """
+    if not text:
+        return None
+    match = _relative_time_regexp.search(text)
+    if match is None:
+        return None
+    now = time.time() if now is None else now
+    return now - int(match.group(1)) * _unit_seconds[match.group(2).lower()]
+
+
+__all__ = ['parse_relative_time', 'parse_count_text', 'parse_like_count']
@@ -1,4 +1,12 @@
 from .video_info_crawler import YoutubeVideoInfoCrawler
 from .video_comment_crawler import YoutubeCommentCrawler
+from .channel_crawler import YoutubeChannelCrawler
+from .shorts_feed_crawler import YoutubeShortsFeedCrawler
+from .search_fan_out import fan_out_search
+from .job_worker import CrawlJobType, CrawlJobWorker, enqueue_crawl_jobs, run_workers
+from .job_scheduler import LARGE_LANE, prior_comment_counts, probe_comment_counts, enqueue_comment_jobs_by_cost, \
+    seed_negative_cache
 
-__all__ = ['YoutubeVideoInfoCrawler', 'YoutubeCommentCrawler']
+__all__ = ['YoutubeVideoInfoCrawler', 'YoutubeCommentCrawler', 'YoutubeChannelCrawler', 'YoutubeShortsFeedCrawler', 'fan_out_search', 'CrawlJobType', 'CrawlJobWorker', 'enqueue_crawl_jobs', 'run_workers',
+           'LARGE_LANE', 'prior_comment_counts', 'probe_comment_counts', 'enqueue_comment_jobs_by_cost',
+           'seed_negative_cache']
@@ -3,6 +3,7 @@ from abc import ABC
 from wrightyrion.base_class import BaseCrawler
 
 from youcreep.browser_agent import YoutubeAgent
+from youcreep.common.metrics import MetricsRecorder, CrawlProfiler
 
 
 class YoutubeBaseCrawler(BaseCrawler, ABC):
@@ -12,8 +13,27 @@ class YoutubeBaseCrawler(BaseCrawler, ABC):
     Crawler is responsible for interacting with the browser, save the webpage and parse the webpage to get data.
     """
     agent_cls = YoutubeAgent
+    profiler: CrawlProfiler = None
+    """opt-in profiling of a sample of the crawls, see `CrawlProfiler`"""
+
+    async def crawl(self, *args, **kwargs):
+        with self.metrics.timer("crawl", crawler=self.__class__.__name__):
+            if self.profiler is None or not self.profiler.should_profile():
+                await super().crawl(*args, **kwargs)
+                return
+            args_str = self._crawler_args_str(**kwargs) if not args else "crawl"
+            job_name = f"{self.__class__.__name__}_{args_str}"
+            async with self.profiler.profile(self.browser_agent.browser_mgr.context, job_name=job_name, meta=kwargs) as bundle_dir:
+                await super().crawl(*args, **kwargs)
+            self.metrics.incr("crawl_profiled", crawler=self.__class__.__name__)
+            self.debug_tool.info(f"Profile of {job_name} is saved to {bundle_dir}")
 
     # the following is for type hinting
     @property
     def browser_agent(self) -> YoutubeAgent:
         return self._browser_agent
+
+    @property
+    def metrics(self) -> MetricsRecorder:
+        """the metrics recorder of the browser agent"""
+        return self.browser_agent.metrics
@@ -0,0 +1,67 @@
+import pathlib
+
+from gembox.io import check_and_make_dir
+
+from youcreep.browser_agent.url_parser import YoutubeUrlParser
+from youcreep.browser_agent.modules import ScrollLoadReturnType, ChannelTab
+from .base_crawler import YoutubeBaseCrawler
+
+
+class YoutubeChannelCrawler(YoutubeBaseCrawler):
+    async def _crawl(self, channel_url: str, save_dir: (str, pathlib.Path), n_target: int = None, shorts: bool = False,
+                     full_page: bool = False):
+        """
+        Crawl the video list of a YouTube channel, one file per tab.
+
+        The saved pages can be parsed by `ChannelPageParser.parse_videos`.
+
+        :param channel_url: (str) The url of the channel, e.g. `https://www.youtube.com/@handle`.
+        :param save_dir: (str, pathlib.Path) the directory to save the channel pages
+        :param n_target: (int) Target number of videos of each tab, which may not be reached. If None, all videos will be crawled.
+        :param shorts: (bool) whether to crawl the shorts tab as well
+        :param full_page: (bool) whether to save the whole page, by default only the header and the video grid are saved
+        :return: (None)
+        """
+        save_dir = check_and_make_dir(save_dir)
+        tabs = [ChannelTab.VIDEOS, ChannelTab.SHORTS] if shorts else [ChannelTab.VIDEOS]
+
+        for tab in tabs:
+            # 打开频道的标签页
+            await self.browser_agent.channel_hdl.go_channel_page(url=channel_url, tab=tab)
+
+            # 加载视频卡片, 在 continuation 消失时停止
+            n_loaded = await self.browser_agent.channel_hdl.scroll_load_video_cards(n_target=n_target,
+                                                                                   return_type=ScrollLoadReturnType.COUNT)
+            self.debug_tool.info(f"Loaded {n_loaded} video cards in {tab.value} tab of {channel_url}")
+
+            # 保存到本地
+            save_name = f"{self._crawler_args_str(channel_url=channel_url, n_target=n_target, tab=tab)}.html"
+            await self.browser_agent.download_page(file_path=save_dir / save_name, section_only=not full_page)
+
+    @classmethod
+    def _crawler_args_str(cls, **kwargs) -> str:
+        channel_url = kwargs.pop("channel_url")
+        n_target = kwargs.pop("n_target", None)
+        tab = kwargs.pop("tab", ChannelTab.VIDEOS)
+
+        user_id = YoutubeUrlParser.parse_url(channel_url)["user_id"]
+        file_name = f"{user_id}_{n_target}_{tab.value}_channel"
+        return file_name
+
+    @classmethod
+    def required_fields(cls) -> dict:
+        return {
+            "channel_url": str,
+            "save_dir": (str, pathlib.Path),
+        }
+
+    @classmethod
+    def optional_fields(cls) -> dict:
+        return {
+            "n_target": (int, type(None)),
+            "shorts": bool,
+            "full_page": bool,
+        }
+
+
+__all__ = ['YoutubeChannelCrawler']
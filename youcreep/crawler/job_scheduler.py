@@ -0,0 +1,161 @@
+import re
+import time
+import heapq
+import pathlib
+import statistics
+from typing import Dict, List, Union, Tuple
+
+from youcreep.browser_agent import YoutubeAgent
+from youcreep.browser_agent.url_parser import YoutubeUrlParser, YouTubeUrlType
+from youcreep.common.db.sqlite import CrawlJobQueue, NegativeResultCache, NegativeReason
+from .job_worker import CrawlJobType, enqueue_crawl_jobs
+
+LARGE_LANE = "large"
+"""the lane of the videos with more than `large_th` comments, see `enqueue_comment_jobs_by_cost`"""
+
+_saved_name_regexp = re.compile(r"^(?P<prefix>NOTENOUGH_|EMPTY_)?(?P<video_id>[\w-]{11})_(?P<n_target>\d+)_(?:video|short)(?:_heads)?_video\.html$")
+
+
+def prior_comment_counts(save_dir: Union[str, pathlib.Path]) -> Dict[str, int]:
+    """
+    Get the comment count of the videos crawled before from the file names in `save_dir`.
+
+    `YoutubeCommentCrawler` names a page with the n_target it used, which is the comment count of the video when the
+    crawl was not capped, so it is a good estimate of the cost of crawling the video again.
+
+    :param save_dir: (str, pathlib.Path) the save_dir of a previous crawl
+    :return: (Dict[str, int]) {video_id: comment count}
+    """
+    counts = {}
+    save_dir = pathlib.Path(save_dir)
+    if not save_dir.is_dir():
+        return counts
+    for file_path in save_dir.iterdir():
+        match = _saved_name_regexp.match(file_path.name)
+        if match is not None:
+            video_id = match.group("video_id")
+            counts[video_id] = max(counts.get(video_id, 0), int(match.group("n_target")))
+    return counts
+
+
+def seed_negative_cache(cache: NegativeResultCache, save_dir: Union[str, pathlib.Path]) -> int:
+    """
+    Fill the negative cache from the `EMPTY_*` and `NOTENOUGH_*` pages saved by `YoutubeCommentCrawler`, so that the
+    videos found empty or failing by the crawls made before the cache existed are skipped as well.
+
+    An entry is dated by the modification time of its page, so old pages give entries which are already expired.
+
+    :param cache: (NegativeResultCache) the cache, it should be connected
+    :param save_dir: (str, pathlib.Path) the save_dir of a previous crawl
+    :return: (int) the number of unexpired entries added
+    """
+    n_added, now = 0, time.time()
+    save_dir = pathlib.Path(save_dir)
+    if not save_dir.is_dir():
+        return n_added
+    for file_path in save_dir.iterdir():
+        match = _saved_name_regexp.match(file_path.name)
+        if match is None or match.group("prefix") is None:
+            continue
+        reason = NegativeReason.EMPTY if match.group("prefix") == "EMPTY_" else NegativeReason.FAILED
+        observed_at = file_path.stat().st_mtime
+        if observed_at + cache.default_ttls[reason] > now:
+            cache.put(match.group("video_id"), reason, detail=f"seeded from {file_path.name}", observed_at=observed_at)
+            n_added += 1
+    return n_added
+
+
+async def probe_comment_counts(agent: YoutubeAgent, video_urls: List[str]) -> Dict[str, Union[int, None]]:
+    """
+    Open each video page and read its comment count with `parse_meta_info`, without loading the comments.
+
+    :param agent: (YoutubeAgent) a started agent
+    :param video_urls: (List[str]) the urls of the videos or shorts
+    :return: (Dict[str, int | None]) {video_id: comment count}, None if the comment count is not found
+    """
+    counts = {}
+    for video_url in video_urls:
+        parsed_result = YoutubeUrlParser.parse_url(video_url)
+        handler = agent.video_hdl if parsed_result["type"] == YouTubeUrlType.VIDEO else agent.short_hdl
+        try:
+            await agent.go_youtube_page(url=video_url)
+            counts[parsed_result["video_id"]] = (await handler.parse_meta_info())["comment_count"]
+        except Exception as e:
+            agent.debug_tool.warn(f"Failed to probe the comment count of {video_url}. Error: {e}")
+            counts[parsed_result["video_id"]] = None
+    return counts
+
+
+def estimate_comment_costs(crawl_args_list: List[dict], comment_counts: Dict[str, Union[int, None]]) -> List[float]:
+    """
+    Estimate the cost of each comment job, i.e. the number of comments to load.
+
+    The cost of a job is capped by its `n_target`. A video without a known count gets the median cost of the others,
+    so it is neither rushed nor left to the tail.
+
+    :param crawl_args_list: (List[dict]) the crawl arguments of `YoutubeCommentCrawler`
+    :param comment_counts: (Dict[str, int | None]) {video_id: comment count}, see `prior_comment_counts` and `probe_comment_counts`
+    :return: (List[float]) the cost of each job
+    """
+    costs = []
+    for crawl_args in crawl_args_list:
+        count = comment_counts.get(YoutubeUrlParser.parse_url(crawl_args["video_url"])["video_id"])
+        if count is not None and crawl_args.get("n_target") is not None:
+            count = min(count, crawl_args["n_target"])
+        costs.append(count)
+    known_costs = [cost for cost in costs if cost is not None]
+    default_cost = statistics.median(known_costs) if known_costs else 0.
+    return [float(default_cost if cost is None else cost) for cost in costs]
+
+
+def enqueue_comment_jobs_by_cost(queue: CrawlJobQueue,
+                                 crawl_args_list: List[dict],
+                                 comment_counts: Dict[str, Union[int, None]],
+                                 large_th: Union[int, None] = 20000,
+                                 priority: int = 0,
+                                 max_attempts: int = 3,
+                                 requeue: bool = False) -> List[Union[int, None]]:
+    """
+    Enqueue comment jobs with their expected cost, so that the workers claim the longest jobs first(LPT), and put
+    the videos with more than `large_th` comments into the `LARGE_LANE`.
+
+    Workers claiming all lanes take the large videos first as well, workers dedicated to the `LARGE_LANE`(see
+    `run_workers(lane_workers=...)`) make sure the giant videos start right away.
+
+    :param queue: (CrawlJobQueue) the job queue, it should be connected
+    :param crawl_args_list: (List[dict]) the crawl arguments of `YoutubeCommentCrawler`
+    :param comment_counts: (Dict[str, int | None]) {video_id: comment count}
+    :param large_th: (int) the cost from which a job goes to the `LARGE_LANE`, None for no large lane
+    :param priority: (int) jobs with higher priority are claimed first regardless of the cost
+    :param max_attempts: (int) the maximum number of attempts of each job
+    :param requeue: (bool) whether to reset the jobs which are already done or failed to pending
+    :return: (List[int | None]) the job ids, None for the jobs which already exist
+    """
+    costs = estimate_comment_costs(crawl_args_list, comment_counts)
+    job_ids = []
+    for crawl_args, cost in zip(crawl_args_list, costs):
+        lane = LARGE_LANE if large_th is not None and cost >= large_th else queue.default_lane
+        job_ids.extend(enqueue_crawl_jobs(queue, CrawlJobType.COMMENT, [crawl_args], priority=priority,
+                                          max_attempts=max_attempts, cost=cost, lane=lane, requeue=requeue))
+    return job_ids
+
+
+def simulate_makespan(costs: List[float], n_workers: int, longest_first: bool = True) -> Tuple[float, List[float]]:
+    """
+    Simulate the list scheduling of the jobs on `n_workers` workers, each idle worker takes the next job.
+
+    :param costs: (List[float]) the cost of each job, in the enqueue order
+    :param n_workers: (int) the number of workers
+    :param longest_first: (bool) whether the jobs are taken longest-first(LPT), otherwise in the enqueue order(FIFO)
+    :return: (float, List[float]) the makespan, and the load of each worker
+    """
+    loads = [(0., worker) for worker in range(n_workers)]
+    for cost in (sorted(costs, reverse=True) if longest_first else costs):
+        load, worker = heapq.heappop(loads)
+        heapq.heappush(loads, (load + cost, worker))
+    worker_loads = [load for load, _ in sorted(loads, key=lambda item: item[1])]
+    return max(worker_loads), worker_loads
+
+
+__all__ = ['LARGE_LANE', 'prior_comment_counts', 'seed_negative_cache', 'probe_comment_counts', 'estimate_comment_costs',
+           'enqueue_comment_jobs_by_cost', 'simulate_makespan']
@@ -0,0 +1,296 @@
+import enum
+import json
+import uuid
+import socket
+import pathlib
+import asyncio
+import logging
+import traceback
+import contextlib
+from typing import Dict, List, Union, Type
+
+from gembox.io import check_and_make_dir
+from gembox.debug_utils import Debugger, FileDebugger, FileConsoleDebugger
+from gembox.multiprocess import ParallelExecutor, Task
+
+from youcreep.browser_agent.agent_pool import AgentPool
+from youcreep.browser_agent.url_parser import YoutubeUrlParser
+from youcreep.common.search_filter import FilterSection, SECTION_OPTION_DICT
+from youcreep.common.db.sqlite import CrawlJobQueue, NegativeResultCache
+from youcreep.common.metrics import CrawlProfiler
+from .base_crawler import YoutubeBaseCrawler
+from .video_comment_crawler import YoutubeCommentCrawler
+from .video_info_crawler import YoutubeVideoInfoCrawler
+from .channel_crawler import YoutubeChannelCrawler
+from .shorts_feed_crawler import YoutubeShortsFeedCrawler
+
+
+class CrawlJobType(enum.Enum):
+    COMMENT = "comment"
+    SEARCH = "search"
+    CHANNEL = "channel"
+    SHORTS_FEED = "shorts_feed"
+
+
+JOB_CRAWLER_DICT: Dict[CrawlJobType, Type[YoutubeBaseCrawler]] = {
+    CrawlJobType.COMMENT: YoutubeCommentCrawler,
+    CrawlJobType.SEARCH: YoutubeVideoInfoCrawler,
+    CrawlJobType.CHANNEL: YoutubeChannelCrawler,
+    CrawlJobType.SHORTS_FEED: YoutubeShortsFeedCrawler,
+}
+
+
+def dump_crawl_args(crawl_args: dict) -> str:
+    """
+    Serialize crawl arguments to a json string, paths and search filter options included.
+
+    :param crawl_args: (dict) the crawl arguments
+    :return: (str) the json string
+    """
+    crawl_args = dict(crawl_args)
+    if crawl_args.get("filter_options") is not None:
+        crawl_args["filter_options"] = {section.name: option.name for section, option in crawl_args["filter_options"].items()}
+    return json.dumps(crawl_args, default=lambda obj: str(obj) if isinstance(obj, pathlib.PurePath) else obj, ensure_ascii=False)
+
+
+def load_crawl_args(crawl_args_str: str) -> dict:
+    """
+    Deserialize crawl arguments dumped by `dump_crawl_args`.
+
+    :param crawl_args_str: (str) the json string
+    :return: (dict) the crawl arguments
+    """
+    crawl_args = json.loads(crawl_args_str)
+    if crawl_args.get("filter_options") is not None:
+        crawl_args["filter_options"] = {
+            FilterSection[section]: SECTION_OPTION_DICT[FilterSection[section]][option]
+            for section, option in crawl_args["filter_options"].items()
+        }
+    return crawl_args
+
+
+def enqueue_crawl_jobs(queue: CrawlJobQueue,
+                       job_type: CrawlJobType,
+                       crawl_args_list: List[dict],
+                       priority: int = 0,
+                       max_attempts: int = 3,
+                       cost: float = 0.,
+                       lane: str = None,
+                       requeue: bool = False) -> List[Union[int, None]]:
+    """
+    Validate crawl arguments against the crawler's `required_fields`/`optional_fields`, and add them to the queue.
+
+    The job is identified by its `save_dir` and the crawler's `_crawler_args_str`, so the same job is never enqueued
+    twice, while the same crawl into another directory is a new job. Pass `requeue` to crawl a finished job again.
+
+    :param queue: (CrawlJobQueue) the job queue, it should be connected
+    :param job_type: (CrawlJobType) the job type
+    :param crawl_args_list: (List[dict]) the crawl arguments of each job
+    :param priority: (int) jobs with higher priority are claimed first
+    :param max_attempts: (int) the maximum number of attempts of each job
+    :param cost: (float) the expected cost of each job, see `job_scheduler.enqueue_comment_jobs_by_cost`
+    :param lane: (str) the lane of the jobs, None for the default lane
+    :param requeue: (bool) whether to reset the jobs which are already done or failed to pending, see `CrawlJobQueue.enqueue`
+    :return: (List[int | None]) the job ids, None for the jobs which already exist
+    """
+    crawler_cls = JOB_CRAWLER_DICT[job_type]
+    for crawl_args in crawl_args_list:
+        crawler_cls._validate_crawl_args(**crawl_args)
+    return [
+        queue.enqueue(job_type=job_type.value,
+                      crawl_args=dump_crawl_args(crawl_args),
+                      dedup_key=f"{job_type.value}:{pathlib.Path(crawl_args['save_dir']).as_posix()}:{crawler_cls._crawler_args_str(**crawl_args)}",
+                      priority=priority,
+                      max_attempts=max_attempts,
+                      cost=cost,
+                      lane=lane,
+                      requeue=requeue)
+        for crawl_args in crawl_args_list
+    ]
+
+
+class CrawlJobWorker:
+    """
+    A worker claiming jobs from a `CrawlJobQueue` and running them with the agents of an `AgentPool`.
+
+    Run several workers in separate processes to crawl in parallel, see `run_workers`. A worker holds a lease on the
+    job it runs and renews it by heartbeat, so the job of a crashed worker is reassigned when the lease expires. The
+    agents are recycled in the background after `max_pages` pages, so a long-running worker does not slow down.
+    """
+    def __init__(self,
+                 db_path: Union[str, pathlib.Path],
+                 worker_id: str = None,
+                 job_types: List[CrawlJobType] = None,
+                 lanes: List[str] = None,
+                 headless: bool = True,
+                 lease_seconds: float = 300.,
+                 heartbeat_interval: float = 60.,
+                 poll_interval: float = 5.,
+                 idle_timeout: Union[float, None] = 60.,
+                 max_jobs: int = None,
+                 pool_size: int = 1,
+                 max_pages: Union[int, None] = 50,
+                 max_js_heap_mb: Union[float, None] = 512.,
+                 storage_state_path: Union[str, pathlib.Path] = None,
+                 profiler: CrawlProfiler = None,
+                 negative_cache_path: Union[str, pathlib.Path] = None,
+                 allowed_hosts: List[str] = None,
+                 debug_tool: Debugger = None):
+        """
+        :param db_path: (str | pathlib.Path) the database file of the job queue
+        :param worker_id: (str) the worker id, default is `{hostname}-{random}`
+        :param job_types: (List[CrawlJobType]) the job types to run, None for all types
+        :param lanes: (List[str]) the lanes to claim jobs from, None for all lanes
+        :param headless: (bool) whether to run the browser in headless mode
+        :param lease_seconds: (float) the lease duration
+        :param heartbeat_interval: (float) the interval to renew the lease, it should be much shorter than `lease_seconds`
+        :param poll_interval: (float) the interval to poll the queue when it is empty
+        :param idle_timeout: (float) stop after the queue is empty for `idle_timeout` seconds, None to run forever
+        :param max_jobs: (int) stop after running `max_jobs` jobs, None for no limit
+        :param pool_size: (int) the number of warm agents, set it to 2 to hide the recycling behind a spare agent
+        :param max_pages: (int) recycle an agent after it opened `max_pages` pages, None for no limit
+        :param max_js_heap_mb: (float) recycle an agent when its JS heap exceeds `max_js_heap_mb` MB, None for no limit
+        :param storage_state_path: (str, pathlib.Path) the storage state file shared by the agents, None for not sharing
+        :param profiler: (CrawlProfiler) profile a sample of the jobs, None for no profiling
+        :param negative_cache_path: (str | pathlib.Path) the database file of the `NegativeResultCache`, e.g. `db_path`,
+            the comment jobs of the videos which gave no comments recently are skipped. None to disable
+        :param allowed_hosts: (List[str]) the hosts to register by `YoutubeUrlParser.allow_host` in the worker process,
+            e.g. of a stand-in site, as a worker process does not inherit those of the parent
+        :param debug_tool: (Debugger) the debugger
+        """
+        assert heartbeat_interval < lease_seconds, f"heartbeat_interval({heartbeat_interval}) should be less than lease_seconds({lease_seconds})"
+        if allowed_hosts:
+            YoutubeUrlParser.allow_host(*allowed_hosts)
+        self.db_path = db_path
+        self.worker_id = worker_id if worker_id is not None else f"{socket.gethostname()}-{uuid.uuid4().hex[:8]}"
+        self.job_types = list(JOB_CRAWLER_DICT.keys()) if job_types is None else job_types
+        self.lanes = lanes
+        self.headless = headless
+        self.lease_seconds = lease_seconds
+        self.heartbeat_interval = heartbeat_interval
+        self.poll_interval = poll_interval
+        self.idle_timeout = idle_timeout
+        self.max_jobs = max_jobs
+        self.pool_size = pool_size
+        self.max_pages = max_pages
+        self.max_js_heap_mb = max_js_heap_mb
+        self.storage_state_path = storage_state_path
+        self.profiler = profiler
+        self.negative_cache_path = negative_cache_path
+        self.debug_tool = Debugger() if debug_tool is None else debug_tool
+        self._pool: Union[AgentPool, None] = None
+
+    async def run(self) -> Dict[str, int]:
+        """
+        Claim and run jobs until the queue stays empty for `idle_timeout` seconds or `max_jobs` jobs are run.
+
+        :return: (Dict[str, int]) {'done': int, 'failed': int}
+        """
+        stats = {"done": 0, "failed": 0}
+        idle_time = 0.
+        negative_cache = None if self.negative_cache_path is None else NegativeResultCache(self.negative_cache_path)
+        with CrawlJobQueue(self.db_path) as queue, (contextlib.nullcontext() if negative_cache is None else negative_cache):
+            queue.create(allow_exist=True)
+            if negative_cache is not None:
+                negative_cache.create(allow_exist=True)
+            try:
+                while self.max_jobs is None or stats["done"] + stats["failed"] < self.max_jobs:
+                    job = queue.claim(worker_id=self.worker_id, lease_seconds=self.lease_seconds,
+                                      job_types=[job_type.value for job_type in self.job_types], lanes=self.lanes)
+                    if job is None:
+                        if self.idle_timeout is not None and idle_time >= self.idle_timeout:
+                            self.debug_tool.info(f"Queue is empty for {idle_time:.0f}s, worker {self.worker_id} stops.")
+                            break
+                        await asyncio.sleep(self.poll_interval)
+                        idle_time += self.poll_interval
+                        continue
+                    idle_time = 0.
+                    success = await self._run_job(queue, job, negative_cache)
+                    stats["done" if success else "failed"] += 1
+                    if self._pool is not None and self._pool.is_exhausted:
+                        # every job would fail without a browser, leave them to the other workers
+                        self.debug_tool.error(f"Agent pool of worker {self.worker_id} has no agent left, worker stops.")
+                        break
+            finally:
+                if self._pool is not None:
+                    await self._pool.stop()
+                    self._pool = None
+        self.debug_tool.info(f"Worker {self.worker_id} finished, stats: {stats}")
+        return stats
+
+    async def _run_job(self, queue: CrawlJobQueue, job: dict, negative_cache: NegativeResultCache = None) -> bool:
+        job_id, job_type = job["job_id"], CrawlJobType(job["job_type"])
+        self.debug_tool.info(f"Worker {self.worker_id} claimed job {job_id}({job_type.value}), attempt {job['n_attempts']}/{job['max_attempts']}")
+        heartbeat_task = asyncio.create_task(self._heartbeat(queue, job_id))
+        try:
+            crawl_args = load_crawl_args(job["crawl_args"])
+            # the pool recycles the agent if the job raises, since the browser may be broken
+            async with (await self._get_pool()).acquire() as agent:
+                crawler = JOB_CRAWLER_DICT[job_type](browser_agent=agent, debug_tool=self.debug_tool)
+                crawler.profiler = self.profiler
+                if isinstance(crawler, YoutubeCommentCrawler):
+                    crawler.negative_cache = negative_cache
+                await crawler.crawl(**crawl_args)
+        except Exception as e:
+            self.debug_tool.error(f"Job {job_id} failed. Error: {e}")
+            self.debug_tool.error(f"Stack Trace: {traceback.format_exc()}")
+            queue.fail(job_id=job_id, worker_id=self.worker_id, error=str(e))
+            return False
+        finally:
+            heartbeat_task.cancel()
+        queue.complete(job_id=job_id, worker_id=self.worker_id)
+        self.debug_tool.info(f"Job {job_id} is done")
+        return True
+
+    async def _heartbeat(self, queue: CrawlJobQueue, job_id: int) -> None:
+        while True:
+            await asyncio.sleep(self.heartbeat_interval)
+            if not queue.heartbeat(job_id=job_id, worker_id=self.worker_id, lease_seconds=self.lease_seconds):
+                self.debug_tool.warn(f"Lease of job {job_id} is lost, it may be run by another worker")
+                return
+
+    async def _get_pool(self) -> AgentPool:
+        if self._pool is None:
+            pool = AgentPool(size=self.pool_size, headless=self.headless, storage_state_path=self.storage_state_path,
+                             max_pages=self.max_pages, max_js_heap_mb=self.max_js_heap_mb, debug_tool=self.debug_tool)
+            await pool.start()
+            self._pool = pool
+        return self._pool
+
+
+async def _worker_main(db_path: Union[str, pathlib.Path], log_dir: Union[str, pathlib.Path, None], verbose: bool, worker_kwargs: dict) -> Dict[str, int]:
+    worker = CrawlJobWorker(db_path=db_path, **worker_kwargs)
+    if log_dir is not None:
+        log_path = check_and_make_dir(log_dir) / f"worker_{worker.worker_id}.log"
+        debugger_cls = FileConsoleDebugger if verbose else FileDebugger
+        worker.debug_tool = debugger_cls(filepath=log_path, level=logging.DEBUG)
+    return await worker.run()
+
+
+async def run_workers(db_path: Union[str, pathlib.Path],
+                      n_workers: int = 1,
+                      log_dir: Union[str, pathlib.Path] = None,
+                      verbose: bool = False,
+                      lane_workers: Dict[str, int] = None,
+                      **worker_kwargs) -> List[Dict[str, int]]:
+    """
+    Run `n_workers` `CrawlJobWorker` in separate processes until the queue is drained.
+
+    :param db_path: (str | pathlib.Path) the database file of the job queue
+    :param n_workers: (int) the number of worker processes claiming jobs of all lanes
+    :param log_dir: (str | pathlib.Path) the directory to save the worker logs, None to log to the console
+    :param verbose: (bool) whether to print the log on the console as well when `log_dir` is given
+    :param lane_workers: (Dict[str, int]) {lane: n}, the number of extra worker processes dedicated to each lane,
+        e.g. `{LARGE_LANE: 1}` to crawl the giant videos in parallel with the others from the start
+    :param worker_kwargs: the other arguments of `CrawlJobWorker`
+    :return: (List[Dict[str, int]]) the stats of each worker
+    """
+    kwargs_list = [worker_kwargs] * n_workers
+    for lane, n_lane_workers in (lane_workers or {}).items():
+        kwargs_list += [{**worker_kwargs, "lanes": [lane]}] * n_lane_workers
+    tasks = [Task(_worker_main, params={"db_path": db_path, "log_dir": log_dir, "verbose": verbose, "worker_kwargs": kwargs})
+             for kwargs in kwargs_list]
+    return await ParallelExecutor.run(tasks, n_workers=len(tasks))
+
+
+__all__ = ['CrawlJobType', 'CrawlJobWorker', 'enqueue_crawl_jobs', 'run_workers', 'dump_crawl_args', 'load_crawl_args']
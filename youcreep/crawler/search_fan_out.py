@@ -0,0 +1,101 @@
+import time
+import asyncio
+import pathlib
+import contextlib
+from typing import List, Union
+
+from gembox.io import check_and_make_dir
+from gembox.debug_utils import Debugger
+
+from youcreep.browser_agent.agent_pool import AgentPool
+from youcreep.common.sink import JsonLinesSink
+from youcreep.common.seen_set import SeenSet, HashSeenSet
+from .video_info_crawler import YoutubeVideoInfoCrawler
+
+
+async def fan_out_search(search_terms: List[str],
+                         save_dir: Union[str, pathlib.Path],
+                         n_target: int,
+                         filter_options: dict = None,
+                         pool: AgentPool = None,
+                         pool_size: int = 4,
+                         seen: SeenSet = None,
+                         seen_path: Union[str, pathlib.Path] = None,
+                         min_new_yield: float = None,
+                         full_page: bool = False,
+                         debug_tool: Debugger = None) -> List[dict]:
+    """
+    Search many related terms concurrently with `YoutubeVideoInfoCrawler`, de-duplicating the videos across the terms.
+
+    All the searches share one seen-set of video ids. Each search keeps the ids which no search found before it, and
+    with `min_new_yield` it stops scrolling as soon as it mostly finds videos already found, instead of loading
+    `n_target` cards of which a large part overlap other terms. The ids of a search are added to the seen-set only
+    once its page is saved, so a failed search leaves them to the other searches and to the next batch.
+
+    The page of each term is saved as by `YoutubeVideoInfoCrawler`, and the result of each term is appended to
+    `{save_dir}/search_fan_out.partXXXX.jsonl`: {'search_term', 'file', 'n_new', 'new_video_ids', 'stop_reason',
+    'seconds', 'error'}. Parse only the `new_video_ids` of each file to store each video once.
+
+    :param search_terms: (List[str]) the search terms
+    :param save_dir: (str, pathlib.Path) the directory to save the search result pages
+    :param n_target: (int) Target number of results of each term, which may not be reached.
+    :param filter_options: (dict) Filter options for the search results of every term.
+    :param pool: (AgentPool) a started pool of agents, the terms run on its agents concurrently. If None, a pool of
+        `pool_size` agents is started and stopped by the call
+    :param pool_size: (int) the size of the pool started when `pool` is None
+    :param seen: (SeenSet) the seen-set to share, e.g. a `BloomSeenSet` for millions of videos. Default is loaded from
+        `seen_path` if it exists, else a new `HashSeenSet`
+    :param seen_path: (str, pathlib.Path) the file the seen-set is saved to at the end, so that the next batch skips the
+        videos of this one. None for not saving
+    :param min_new_yield: (float) stop scrolling a term when fewer than `min_new_yield` videos per second are new,
+        None to always load `n_target` cards
+    :param full_page: (bool) whether to save the whole pages, by default only the search results are saved
+    :param debug_tool: (Debugger) the debugger
+    :return: (List[dict]) the result of each term, in the order of `search_terms`
+    """
+    debug_tool = Debugger() if debug_tool is None else debug_tool
+    save_dir = check_and_make_dir(save_dir)
+    if seen is None:
+        seen = SeenSet.load(seen_path) if seen_path is not None and pathlib.Path(seen_path).exists() else HashSeenSet()
+    n_seen_before = len(seen)
+
+    async def search_one(search_term: str, sink: JsonLinesSink) -> dict:
+        result = {"search_term": search_term, "file": None, "n_new": 0, "new_video_ids": [], "stop_reason": None, "seconds": None, "error": None}
+        start = time.perf_counter()
+        try:
+            async with pool.acquire() as agent:
+                crawler = YoutubeVideoInfoCrawler(browser_agent=agent, debug_tool=debug_tool)
+                crawler.seen_set = seen
+                await crawler.crawl(search_term=search_term, n_target=n_target, save_dir=save_dir, filter_options=filter_options,
+                                    full_page=full_page, min_new_yield=min_new_yield)
+                stop_reason = agent.search_hdl.last_stop_reason
+                result.update({
+                    "file": f"{crawler._crawler_args_str(search_term=search_term, n_target=n_target, filter_options=filter_options)}.html",
+                    "n_new": len(crawler.last_new_ids),
+                    "new_video_ids": crawler.last_new_ids,
+                    "stop_reason": None if stop_reason is None else stop_reason.value,
+                })
+        except Exception as e:
+            # one failed term does not stop the batch
+            debug_tool.error(f"Search {search_term!r} failed: {e!r}")
+            result["error"] = repr(e)
+        result["seconds"] = time.perf_counter() - start
+        await sink.write([result])
+        debug_tool.info(f"Search {search_term!r}: {result['n_new']} new videos, stop reason: {result['stop_reason']}")
+        return result
+
+    async with contextlib.AsyncExitStack() as stack:
+        if pool is None:
+            pool = await stack.enter_async_context(AgentPool(size=pool_size, debug_tool=debug_tool))
+        sink = await stack.enter_async_context(JsonLinesSink(save_dir / "search_fan_out.jsonl"))
+        try:
+            # the pool bounds the concurrency, a term waits for an idle agent
+            results = await asyncio.gather(*[search_one(search_term, sink) for search_term in search_terms])
+        finally:
+            if seen_path is not None:
+                seen.save(seen_path)
+    debug_tool.info(f"Searched {len(search_terms)} terms, {len(seen) - n_seen_before} new videos, {len(seen)} videos seen in total")
+    return results
+
+
+__all__ = ['fan_out_search']
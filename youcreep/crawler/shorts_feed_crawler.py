@@ -0,0 +1,139 @@
+import asyncio
+import pathlib
+from typing import Union
+
+import aiofiles
+from gembox.io import check_and_make_dir
+
+from youcreep.browser_agent.url_parser import YoutubeUrlParser, YouTubeUrlType
+from youcreep.browser_agent.modules import ScrollLoadReturnType, ChannelTab
+from youcreep.common.sink import JsonLinesSink
+from youcreep.common.selectors.channel_page_sels import rich_item_link_sel
+from .base_crawler import YoutubeBaseCrawler
+from .video_comment_crawler import YoutubeCommentCrawler
+
+
+class YoutubeShortsFeedCrawler(YoutubeBaseCrawler):
+    async def _crawl(self,
+                     start_url: str,
+                     save_dir: Union[str, pathlib.Path],
+                     n_shorts: int = 10,
+                     n_target: Union[int, None] = None,
+                     replies: bool = True,
+                     full_page: bool = False) -> None:
+        """
+        Crawl the comments of consecutive shorts by swiping through the shorts player, instead of loading a new page for
+        each short. The player stays open and only the next short is fetched, which saves the navigation, the page
+        initialization and the player bootstrap of every short after the first one.
+
+        The comment page of each short is saved under the same name as `YoutubeCommentCrawler`, so the files can be
+        parsed by `VideoPageParser.parse_comments` and are seen by `prior_comment_counts`. The meta info of the shorts
+        (video_id, url, comment_count, like_count, file) is written to `{save_name}.partXXXX.jsonl`.
+
+        :param start_url: (str) the url of the first short, or of a channel whose shorts tab is opened and whose first
+            short is played
+        :param save_dir: (str, pathlib.Path) the directory to save the comment pages
+        :param n_shorts: (int) the maximum number of shorts to crawl, fewer if the feed ends
+        :param n_target: (int) Target number of comments of each short, which may not be reached. If None, all comments will be crawled.
+        :param replies: (bool) whether to crawl the replies, if False, only the head comments are crawled(much faster)
+        :param full_page: (bool) whether to save the whole page, by default only the comment panel is saved
+        :return: (None)
+        """
+        save_dir = check_and_make_dir(save_dir)
+        handler = self.browser_agent.short_hdl
+
+        # Step 1: 打开 shorts 播放器
+        short_url = await self._first_short_url(start_url)
+        if short_url is None:
+            self.debug_tool.warn(f"No short is found from {start_url}")
+            return
+        await handler.go_short_page(url=short_url)
+
+        sink_name = self._crawler_args_str(start_url=start_url, n_shorts=n_shorts, n_target=n_target, replies=replies)
+        async with JsonLinesSink(save_dir / f"{sink_name}.jsonl") as sink:
+            for i in range(n_shorts):
+                await asyncio.sleep(1)  # 等待 meta info 区域的出现
+
+                # Step 2: 爬取当前 short 的评论
+                meta_info = await self._crawl_current_short(short_url, save_dir, n_target, replies, full_page)
+                await sink.write([meta_info])
+                self.metrics.incr("feed_shorts", crawler=self.__class__.__name__)
+
+                # Step 3: 滑到下一个 short
+                if i == n_shorts - 1:
+                    break
+                await handler.close_comment_panel()
+                short_url = await handler.swipe_next_short()
+                if short_url is None:
+                    self.debug_tool.info(f"The shorts feed ended after {i + 1} shorts")
+                    break
+        self.debug_tool.info(f"YoutubeShortsFeedCrawler crawling finished.")
+
+    async def _first_short_url(self, start_url: str) -> Union[str, None]:
+        if YoutubeUrlParser.parse_url(start_url)["type"] == YouTubeUrlType.SHORT:
+            return start_url
+        await self.browser_agent.channel_hdl.go_channel_page(url=start_url, tab=ChannelTab.SHORTS)
+        href = await self.browser_agent.page.eval_on_selector_all(rich_item_link_sel, "links => links.length ? links[0].href : null")
+        return href
+
+    async def _crawl_current_short(self,
+                                   short_url: str,
+                                   save_dir: pathlib.Path,
+                                   n_target: Union[int, None],
+                                   replies: bool,
+                                   full_page: bool) -> dict:
+        handler = self.browser_agent.short_hdl
+        meta_info = await handler.parse_meta_info()
+        n_comments = int(meta_info['comment_count'])
+        n_target = n_comments if n_target is None else min(n_target, n_comments)
+        save_name = f"{YoutubeCommentCrawler._crawler_args_str(video_url=short_url, n_target=n_target, replies=replies)}.html"
+        meta_info = {"video_id": YoutubeUrlParser.parse_url(short_url)["video_id"], "video_url": short_url, **meta_info}
+
+        # 没有评论则保存空文件
+        if n_comments == 0:
+            async with aiofiles.open(save_dir / f"EMPTY_{save_name}", mode='w', encoding='utf-8') as f:
+                await f.write("")
+            self.debug_tool.info(f"Empty file is saved to {save_dir / f'EMPTY_{save_name}'}")
+            return {**meta_info, "file": f"EMPTY_{save_name}"}
+
+        n_loaded = await handler.scroll_load_comment_cards(n_target=n_target, return_type=ScrollLoadReturnType.COUNT, replies=replies)
+        if handler.last_stop_reason is not None:
+            self.metrics.incr("comment_crawl_stop", reason=handler.last_stop_reason.value, page_type=handler.page_type.value)
+        if n_loaded == 0 or (replies and n_loaded < int(n_target * 0.7)):
+            # no retry in the feed, the short is saved as is and can be recrawled by `YoutubeCommentCrawler`
+            self.debug_tool.warn(f"Loaded {n_loaded} comments of {short_url}, n_target: {n_target}. Which is not enough(no less than 70%).")
+            save_name = f"NOTENOUGH_{save_name}"
+        await self.browser_agent.download_page(file_path=save_dir / save_name, section_only=not full_page)
+        return {**meta_info, "file": save_name}
+
+    @classmethod
+    def required_fields(cls) -> dict:
+        return {
+            "start_url": str,
+            "save_dir": (str, pathlib.Path),
+        }
+
+    @classmethod
+    def optional_fields(cls) -> dict:
+        return {
+            "n_shorts": int,
+            "n_target": (int, type(None)),
+            "replies": bool,
+            "full_page": bool,
+        }
+
+    @classmethod
+    def _crawler_args_str(cls, **kwargs) -> str:
+        start_url = kwargs.pop("start_url")
+        n_shorts = kwargs.pop("n_shorts", 10)
+        n_target = kwargs.pop("n_target", None)
+        replies = kwargs.pop("replies", True)
+
+        parsed_result = YoutubeUrlParser.parse_url(start_url)
+        start_id = parsed_result.get("video_id") or parsed_result.get("user_id")
+        if not replies:
+            return f"{start_id}_{n_shorts}_{n_target}_heads_shorts_feed"
+        return f"{start_id}_{n_shorts}_{n_target}_shorts_feed"
+
+
+__all__ = ['YoutubeShortsFeedCrawler']
@@ -1,3 +1,4 @@
+import time
 import asyncio
 import pathlib
 import aiofiles
@@ -5,78 +6,176 @@ from typing import Union
 
 from gembox.io import check_and_make_dir
 
-from youcreep.browser_agent.modules import VideoPageHandler, ShortPageHandler
+from youcreep.browser_agent.modules import VideoPageHandler, ShortPageHandler, ScrollLoadReturnType, ScrollStopReason, CommentStreamer
+from youcreep.common.sink import JsonLinesSink
+from youcreep.common.db.sqlite import NegativeResultCache, NegativeReason
 from youcreep.common import YoutubeUrlParser, YouTubeUrlType
 from youcreep.crawler.base_crawler import YoutubeBaseCrawler
 
 
 class YoutubeCommentCrawler(YoutubeBaseCrawler):
+    last_stop_reason: Union[ScrollStopReason, None] = None
+    """why the comment loading of the last crawl stopped, None if nothing was loaded(e.g. no comment)"""
+    negative_cache: NegativeResultCache = None
+    """a connected cache of the videos which gave no comments recently, they are skipped before any browser work"""
+
     async def _crawl(self,
                      video_url: str,
                      save_dir: Union[str, pathlib.Path],
-                     n_target: Union[int, None] = None) -> None:
+                     n_target: Union[int, None] = None,
+                     replies: bool = True,
+                     stream_jsonl: bool = False,
+                     full_page: bool = False,
+                     min_yield: Union[float, None] = None,
+                     time_budget: Union[float, None] = None) -> None:
         """
-        Crawl the video info from YouTube search result page.
+        Crawl the comments of a video(or short) page, and save the loaded comment section.
 
         :param video_url: (str) The target video_url
-        :param n_target: (int) Target number of results, which may not be reached. If None, all results will be crawled.
-        :param save_dir: (str, pathlib.Path) the directory to save the video info
+        :param n_target: (int) Target number of comments, which may not be reached. If None, all comments will be crawled.
+        :param save_dir: (str, pathlib.Path) the directory to save the comment page
+        :param replies: (bool) whether to crawl the replies, if False, only the head comments are crawled(much faster)
+        :param stream_jsonl: (bool) whether to stream the comments to `{save_name}.partXXXX.jsonl.gz` while scrolling, so
+            that the first comments are available early and the progress survives crashes
+        :param full_page: (bool) whether to save the whole page, by default only the comment section is saved
+        :param min_yield: (float) stop loading when fewer than `min_yield` comments per second are loaded, instead of
+            scrolling until the count stays unchanged. None to disable
+        :param time_budget: (float) the wall-clock budget of the crawl in seconds, retries included. When it is used up,
+            the comments loaded so far are saved. None for no budget
 
         :return: (None)
         """
-        save_dir = check_and_make_dir(save_dir)
+        deadline = None if time_budget is None else time.perf_counter() + time_budget
+        self.last_stop_reason = None
 
         parsed_result = YoutubeUrlParser.parse_url(video_url)
         url_type = parsed_result['type']
         assert url_type == YouTubeUrlType.SHORT or url_type == YouTubeUrlType.VIDEO, f"Invalid url type: {url_type}, it should be either SHORT or VIDEO."
+        if self.negative_cache is not None:
+            entry = self.negative_cache.check(parsed_result['video_id'])
+            if entry is not None:
+                self.metrics.incr("negative_cache_hit", reason=entry["reason"])
+                self.debug_tool.info(f"Skip {video_url}, it is cached as {entry['reason']} until {time.ctime(entry['expires_at'])}")
+                return
+        save_dir = check_and_make_dir(save_dir)
         handler: Union[VideoPageHandler, ShortPageHandler] = self.browser_agent.video_hdl if url_type == YouTubeUrlType.VIDEO else self.browser_agent.short_hdl
 
-        # Step 1: go to the target video page
-        n_retry, max_retry = 0, 3
-        while True:
-            await self.browser_agent.go_youtube_page(url=video_url)
-            await asyncio.sleep(1)  # 等待 meta info 区域的出现
-
-            # Step 2: 获取 meta info
-            meta_info = await handler.parse_meta_info()
-            # FIXME: meta_info["comment_count"] could be NoneType
-            n_comments = int(meta_info['comment_count'])
-            if n_target is None:
-                n_target = n_comments
-            else:
-                n_target = min(n_target, n_comments)
-            self.debug_tool.info(f"Meta Info is parsed: {meta_info}, we set n_target to {n_target}")
-
-            # Step 2.(1) 如果没有 comment, 直接返回
-            if n_target == 0:
-                self.debug_tool.info(f"No comment is found for {video_url}, skip.")
-                # 写一个空文件
-                save_name = f"EMPTY_{self._crawler_args_str(video_url=video_url, n_target=n_target)}.html"
-                async with aiofiles.open(save_dir / save_name, mode='w', encoding='utf-8') as f:
-                    await f.write("")
-                self.debug_tool.info(f"Empty file is saved to {save_dir / save_name}")
-                return
+        await self._crawl_page(handler, video_url, save_dir, n_target, replies, stream_jsonl, full_page, min_yield, deadline)
+        self.debug_tool.info(f"YoutubeCommentCrawler crawling finished.")
 
-            # Step 2.(2) 如果有 comment, 则开始爬取
-            comments = await handler.scroll_load_comment_cards(n_target=n_target)
-
-            if len(comments) > 0 and len(comments) >= int(n_target * 0.7):
-                self.debug_tool.info(f"Finally, we loaded {len(comments)} comments, n_target: {n_target}.")
-                save_name = f"{self._crawler_args_str(video_url=video_url, n_target=n_target)}.html"
-                await self.browser_agent.download_page(file_path=save_dir / save_name)
-                break
-            else:
-                n_retry += 1
-                self.debug_tool.warn(f"Finally, we loaded {len(comments)} comments, n_target: {n_target}. Which is not enough(no less than 70%).")
-                self.debug_tool.warn(f"Retry {n_retry} times...")
-                if n_retry >= max_retry:
-                    # 如果试了 max_retry 次, 都没有加载到足够的 comments, 则保存当前页面
-                    self.debug_tool.error(f"Retry {n_retry} times, but we cannot load enough comments, n_target: {n_target}.")
-                    save_name = f"NOTENOUGH_{self._crawler_args_str(video_url=video_url, n_target=n_target)}.html"
-                    await self.browser_agent.download_page(file_path=save_dir / save_name)
+    async def _crawl_page(self,
+                          handler: Union[VideoPageHandler, ShortPageHandler],
+                          video_url: str,
+                          save_dir: pathlib.Path,
+                          n_target: Union[int, None],
+                          replies: bool,
+                          stream_jsonl: bool,
+                          full_page: bool,
+                          min_yield: Union[float, None],
+                          deadline: Union[float, None]) -> None:
+        streamer = None
+        try:
+            # Step 1: go to the target video page
+            n_retry, max_retry = 0, 3
+            while True:
+                await self.browser_agent.go_youtube_page(url=video_url)
+                await asyncio.sleep(1)  # 等待 meta info 区域的出现
+
+                # Step 2: 获取 meta info
+                meta_info = await handler.parse_meta_info()
+                if meta_info['comment_count'] is None:
+                    # the count is not shown: the video is unavailable, the comments are turned off, or the page is not ready
+                    negative = await self._diagnose_no_comment_count(handler)
+                    if negative is not None:
+                        reason, detail = negative
+                        self.debug_tool.info(f"No comment can be crawled for {video_url}, {reason.value}: {detail}")
+                        self._remember_negative(video_url, reason, detail)
+                        return
+                    n_retry += 1
+                    self.metrics.incr("retries", crawler=self.__class__.__name__)
+                    if n_retry >= max_retry:
+                        raise RuntimeError(f"Cannot find the comment count of {video_url} after {n_retry} attempts")
+                    self.debug_tool.warn(f"Cannot find the comment count of {video_url}, retry {n_retry} times...")
+                    continue
+                n_comments = int(meta_info['comment_count'])
+                if n_target is None:
+                    n_target = n_comments
+                else:
+                    n_target = min(n_target, n_comments)
+                self.debug_tool.info(f"Meta Info is parsed: {meta_info}, we set n_target to {n_target}")
+
+                # Step 2.(1) 如果没有 comment, 直接返回
+                if n_target == 0:
+                    self.debug_tool.info(f"No comment is found for {video_url}, skip.")
+                    # 写一个空文件
+                    save_name = f"EMPTY_{self._crawler_args_str(video_url=video_url, n_target=n_target, replies=replies)}.html"
+                    async with aiofiles.open(save_dir / save_name, mode='w', encoding='utf-8') as f:
+                        await f.write("")
+                    self.debug_tool.info(f"Empty file is saved to {save_dir / save_name}")
+                    self._remember_negative(video_url, NegativeReason.EMPTY)
+                    return
+
+                # Step 2.(2) 如果有 comment, 则开始爬取
+                if stream_jsonl and streamer is None:
+                    # named after the resolved n_target like the page, and reused across the retries
+                    sink = JsonLinesSink(save_dir / f"{self._crawler_args_str(video_url=video_url, n_target=n_target, replies=replies)}.jsonl", compress=True)
+                    streamer = CommentStreamer(handler=handler, sink=sink)
+                callbacks = [] if streamer is None else [streamer.stream_new]
+                n_loaded = await handler.scroll_load_comment_cards(n_target=n_target, callbacks=callbacks, return_type=ScrollLoadReturnType.COUNT,
+                                                                   replies=replies, min_yield=min_yield, deadline=deadline)
+                self.last_stop_reason = handler.last_stop_reason
+                if self.last_stop_reason is not None:
+                    self.metrics.incr("comment_crawl_stop", reason=self.last_stop_reason.value, page_type=handler.page_type.value)
+                if streamer is not None:
+                    await streamer.stream_new()
+
+                # comment_count includes the replies, so the number of head comments is unknown and cannot be checked against it
+                if n_loaded > 0 and (not replies or n_loaded >= int(n_target * 0.7)):
+                    self.browser_agent.rate_limiter.report_success()
+                    self.debug_tool.info(f"Finally, we loaded {n_loaded} comments, n_target: {n_target}.")
+                    save_name = f"{self._crawler_args_str(video_url=video_url, n_target=n_target, replies=replies)}.html"
+                    await self.browser_agent.download_page(file_path=save_dir / save_name, section_only=not full_page)
                     break
-
-        self.debug_tool.info(f"YoutubeCommentCrawler crawling finished.")
+                else:
+                    n_retry += 1
+                    self.metrics.incr("retries", crawler=self.__class__.__name__)
+                    # back off before retrying, retrying at full speed makes the throttling worse
+                    self.browser_agent.rate_limiter.report_shortfall()
+                    self.debug_tool.warn(f"Finally, we loaded {n_loaded} comments, n_target: {n_target}. Which is not enough(no less than 70%).")
+                    self.debug_tool.warn(f"Retry {n_retry} times...")
+                    out_of_time = deadline is not None and time.perf_counter() >= deadline
+                    if n_retry >= max_retry or out_of_time:
+                        # 如果试了 max_retry 次, 都没有加载到足够的 comments, 则保存当前页面
+                        self.debug_tool.error(f"Retry {n_retry} times, but we cannot load enough comments, n_target: {n_target}, stop reason: {self.last_stop_reason}.")
+                        save_name = f"NOTENOUGH_{self._crawler_args_str(video_url=video_url, n_target=n_target, replies=replies)}.html"
+                        await self.browser_agent.download_page(file_path=save_dir / save_name, section_only=not full_page)
+                        if out_of_time or self.last_stop_reason == ScrollStopReason.TIME_BUDGET:
+                            # the page loaded fine, only the budget of this crawl ran out, a larger budget may succeed
+                            self.debug_tool.info(f"The time budget of {video_url} is used up, it is not cached as failed")
+                        else:
+                            self._remember_negative(video_url, NegativeReason.FAILED, detail=f"loaded {n_loaded} of {n_target} comments")
+                        break
+        finally:
+            if streamer is not None:
+                await streamer.sink.close()
+
+    @staticmethod
+    async def _diagnose_no_comment_count(handler: Union[VideoPageHandler, ShortPageHandler]) -> Union[tuple, None]:
+        if not isinstance(handler, VideoPageHandler):
+            return None
+        unavailable_reason = await handler.unavailable_reason()
+        if unavailable_reason is not None:
+            return NegativeReason.UNAVAILABLE, unavailable_reason
+        disabled_message = await handler.comments_disabled()
+        if disabled_message is not None:
+            return NegativeReason.COMMENTS_DISABLED, disabled_message
+        return None
+
+    def _remember_negative(self, video_url: str, reason: NegativeReason, detail: str = None) -> None:
+        if self.negative_cache is None:
+            return
+        self.negative_cache.put(YoutubeUrlParser.parse_url(video_url)['video_id'], reason, detail=detail)
+        self.metrics.incr("negative_cache_put", reason=reason.value)
 
     @classmethod
     def required_fields(cls) -> dict:
@@ -89,16 +188,24 @@ class YoutubeCommentCrawler(YoutubeBaseCrawler):
     def optional_fields(cls) -> dict:
         return {
             "n_target": (int, type(None)),
+            "replies": bool,
+            "stream_jsonl": bool,
+            "full_page": bool,
+            "min_yield": (float, int, type(None)),
+            "time_budget": (float, int, type(None)),
         }
 
     @classmethod
     def _crawler_args_str(cls, **kwargs) -> str:
         video_url = kwargs.pop("video_url")
         n_target = kwargs.pop("n_target", None)
+        replies = kwargs.pop("replies", True)
 
         parsed_result = YoutubeUrlParser.parse_url(video_url)
         video_type, video_id = parsed_result['type'], parsed_result['video_id']
 
+        if not replies:
+            return f"{video_id}_{n_target}_{video_type.value}_heads_video"
         return f"{video_id}_{n_target}_{video_type.value}_video"
 
 
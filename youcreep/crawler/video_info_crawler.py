@@ -1,12 +1,24 @@
 import pathlib
+from typing import List
 
 from gembox.io import check_and_make_dir
 
+from youcreep.browser_agent.modules import ScrollLoadReturnType
+from youcreep.common.seen_set import SeenSet
 from .base_crawler import YoutubeBaseCrawler
 
 
 class YoutubeVideoInfoCrawler(YoutubeBaseCrawler):
-    async def _crawl(self, search_term: str, n_target: int, save_dir: (str, pathlib.Path), filter_options: dict = None):
+    seen_set: SeenSet = None
+    """the video ids found so far, shared by concurrent searches, see `fan_out_search`"""
+
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        self.last_new_ids: List[str] = []
+        """the video ids added to `seen_set` by the last crawl, i.e. found by no other search before"""
+
+    async def _crawl(self, search_term: str, n_target: int, save_dir: (str, pathlib.Path), filter_options: dict = None, full_page: bool = False,
+                     min_new_yield: float = None):
         """
         Crawl the video info from YouTube search result page.
 
@@ -14,6 +26,9 @@ class YoutubeVideoInfoCrawler(YoutubeBaseCrawler):
         :param n_target: (int) Target number of results, which may not be reached. If None, all results will be crawled.
         :param save_dir: (str, pathlib.Path) the directory to save the video info
         :param filter_options: (dict) Filter options for the search result.
+        :param full_page: (bool) whether to save the whole page, by default only the search results are saved
+        :param min_new_yield: (float) stop scrolling when fewer than `min_new_yield` videos per second are new to
+            `seen_set`, i.e. the search mostly finds what other searches already found. None to disable
         :return: (List[VideoInfo]) the video info list
         """
         save_dir = check_and_make_dir(save_dir)
@@ -22,16 +37,22 @@ class YoutubeVideoInfoCrawler(YoutubeBaseCrawler):
         await self.browser_agent.search(search_term=search_term)
 
         # filter the search result
-        for filter_section, filter_option in filter_options.items():
+        for filter_section, filter_option in (filter_options or {}).items():
             await self.browser_agent.search_hdl.filter_search_result(filter_section=filter_section,
                                                                      filter_option=filter_option)
 
         # load the search result
-        await self.browser_agent.search_hdl.scroll_load_video_cards(n_target=n_target)
+        await self.browser_agent.search_hdl.scroll_load_video_cards(n_target=n_target, return_type=ScrollLoadReturnType.COUNT,
+                                                                    seen=self.seen_set, min_new_yield=min_new_yield)
+        self.last_new_ids = []
 
         # save to the disk
         save_name = f"{self._crawler_args_str(search_term=search_term, n_target=n_target, filter_options=filter_options)}.html"
-        await self.browser_agent.download_page(file_path=save_dir / save_name)
+        await self.browser_agent.download_page(file_path=save_dir / save_name, section_only=not full_page)
+
+        # the videos count as found only once the page is saved, a concurrent search may have saved some of them first
+        if self.seen_set is not None:
+            self.last_new_ids = self.seen_set.update(self.browser_agent.search_hdl.last_new_ids)
 
     @classmethod
     def _crawler_args_str(cls, **kwargs) -> str:
@@ -59,6 +80,8 @@ class YoutubeVideoInfoCrawler(YoutubeBaseCrawler):
     def optional_fields(cls) -> dict:
         return {
             "filter_options": (dict, type(None)),
+            "full_page": bool,
+            "min_new_yield": (float, int, type(None)),
         }
 
 
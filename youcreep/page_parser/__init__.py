@@ -1,4 +1,6 @@
 from .video_page_parser import VideoPageParser
+from .parse_cache import ParseCache, CacheValidation
+from .frame import records_to_frame, concat_frames
 
 
-__all__ = ['VideoPageParser']
+__all__ = ['VideoPageParser', 'ParseCache', 'CacheValidation', 'records_to_frame', 'concat_frames']
@@ -0,0 +1,92 @@
+import re
+import pathlib
+import concurrent.futures
+from typing import List, Union
+
+from youcreep.common.pojo import VideoInfo
+from youcreep.common.text_utils import parse_count_text
+from youcreep.page_parser.page_parser import PageParser
+from youcreep.page_parser.frame import records_to_frame
+from youcreep.browser_agent.url_parser import YoutubeUrlParser, YouTubeUrlType
+from youcreep.common.selectors.channel_page_sels import channel_name_sel, channel_header_sel, rich_item_sel, \
+    rich_item_link_sel, rich_item_title_sel, rich_item_metadata_sel, rich_item_duration_sel
+
+_handle_regexp = re.compile(r"@[\w.\-]+")
+
+
+class ChannelPageParser(PageParser):
+    record_cls = VideoInfo
+
+    def parse_videos(self, use_pandas: bool = False) -> List[VideoInfo]:
+        """
+        Parse all videos' info in the videos or shorts tab of a YouTube channel page.
+
+        :param use_pandas: (bool) whether to return a pandas.DataFrame
+        :return: (List[VideoInfo]) the list of videos
+        """
+        assert self.file_path is not None and self.soup is not None, "Please load webpage first"
+        self.debug_tool.info(f"[{self.__class__.__name__}] Parsing videos in {self.file_path}...")
+        with self.metrics.timer("parse", parser=self.__class__.__name__):
+            channel_name, channel_url = self._parse_channel()
+            videos = [parse_rich_item(video_card, channel_name=channel_name, channel_url=channel_url)
+                      for video_card in self.soup.select(rich_item_sel)]
+            videos = [video for video in videos if video is not None]
+        self.metrics.incr("records_parsed", len(videos), parser=self.__class__.__name__)
+        self.debug_tool.info(f"[{self.__class__.__name__}] Parsed {len(videos)} videos of channel {channel_name}")
+        if use_pandas:
+            self.debug_tool.info(f"[{self.__class__.__name__}] Converting videos to pandas.DataFrame...")
+            videos = records_to_frame(videos, self.record_cls)
+        return videos
+
+    async def aparse_videos(self,
+                            file_path: (str, pathlib.Path),
+                            use_pandas: bool = False,
+                            executor: concurrent.futures.Executor = None) -> List[VideoInfo]:
+        """
+        Load and parse videos of a channel page in an executor, without blocking the event loop.
+
+        :param file_path: (str, pathlib.Path) the path to the local file
+        :param use_pandas: (bool) whether to return a pandas.DataFrame
+        :param executor: (concurrent.futures.Executor) a thread or process pool, None for the default thread pool
+        :return: (List[VideoInfo]) the list of videos
+        """
+        return await self._aload_and_parse(file_path, "parse_videos", use_pandas=use_pandas, executor=executor)
+
+    def _parse_channel(self) -> (Union[str, None], Union[str, None]):
+        name_elem = self.soup.select_one(channel_name_sel)
+        channel_name = name_elem.text.strip() if name_elem is not None else None
+        header = self.soup.select_one(channel_header_sel)
+        handle_match = _handle_regexp.search(header.text) if header is not None else None
+        channel_url = f"/{handle_match.group(0)}" if handle_match is not None else None
+        return channel_name, channel_url
+
+
+def parse_rich_item(video_card, channel_name: str = None, channel_url: str = None) -> Union[VideoInfo, None]:
+    link = video_card.select_one(rich_item_link_sel)
+    if link is None or not link.get("href"):
+        # e.g. a placeholder card still loading
+        return None
+    video_url = link["href"].split("&pp=")[0]
+    url_parsed = YoutubeUrlParser.parse_url(video_url)
+
+    title_elem = video_card.select_one(rich_item_title_sel)
+    title = (title_elem.get("title") or title_elem.text.strip()) if title_elem is not None else None
+
+    metadata = [item.text.strip() for item in video_card.select(rich_item_metadata_sel)]
+    duration_elem = video_card.select_one(rich_item_duration_sel)
+
+    return VideoInfo.from_dict({
+        "video_id": url_parsed.get("video_id"),
+        "title": title,
+        "video_url": video_url,
+        "is_short": url_parsed["type"] == YouTubeUrlType.SHORT,
+        "view_count": parse_count_text(metadata[0]) if metadata else None,
+        "publish_time": metadata[1] if len(metadata) > 1 else None,
+        "duration": duration_elem.text.strip() if duration_elem is not None else None,
+        "channel_name": channel_name,
+        "channel_url": channel_url,
+        "desc_text": "",
+    })
+
+
+__all__ = ['ChannelPageParser']
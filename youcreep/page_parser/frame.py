@@ -0,0 +1,89 @@
+from typing import Dict, List, Type
+
+from youcreep.common.pojo import VideoComment, VideoInfo
+from youcreep.common.text_utils import parse_count_text, parse_like_count
+
+COMMENT_DTYPES: Dict[str, str] = {
+    "comment_id": "string",
+    "is_reply": "boolean",
+    "author_name": "category",
+    "author_url": "category",
+    "publish_time": "category",
+    "parent_comment_id": "category",
+    "video_id": "category",
+    "author_thumbnail": "category",
+    "content_text": "string",
+    "like_count": "Int64",
+}
+"""the dtype of each column of a comment DataFrame"""
+
+VIDEO_DTYPES: Dict[str, str] = {
+    "video_id": "string",
+    "title": "string",
+    "video_url": "string",
+    "is_short": "boolean",
+    "view_count": "Int64",
+    "publish_time": "category",
+    "duration": "category",
+    "channel_name": "category",
+    "channel_url": "category",
+    "desc_text": "string",
+    "comment_count": "Int64",
+}
+"""the dtype of each column of a video DataFrame"""
+
+_record_dtypes = {VideoComment: COMMENT_DTYPES, VideoInfo: VIDEO_DTYPES}
+
+
+def records_to_frame(records: List, record_cls: Type):
+    """
+    Build a DataFrame from records column by column, with compact dtypes instead of `object`:
+
+    - `category` for the values repeated across rows(video_id, author, channel, relative publish time, ...)
+    - nullable `boolean` and `Int64` for the flags and the counts, the count texts(e.g. "1.2K") are parsed, an empty
+      `like_count` is 0
+    - `string` for the free text
+
+    :param records: (List[VideoComment] | List[VideoInfo]) the records
+    :param record_cls: (Type) the class of the records, which decides the columns and their dtypes
+    :return: (pandas.DataFrame) the DataFrame, with the columns of `record_cls.to_dict()`
+    """
+    import pandas as pd
+
+    columns = {}
+    for field, dtype in _record_dtypes[record_cls].items():
+        values = [getattr(record, field) for record in records]
+        if dtype == "Int64":
+            # an empty like count is a comment without likes, not a missing value
+            parse = parse_like_count if field == "like_count" else parse_count_text
+            values = [value if value is None or isinstance(value, int) else parse(str(value)) for value in values]
+        if dtype == "category":
+            columns[field] = pd.Categorical(values)
+        else:
+            columns[field] = pd.array(values, dtype=dtype)
+    return pd.DataFrame(columns)
+
+
+def concat_frames(frames: List):
+    """
+    Concatenate the DataFrames of many pages, keeping the categorical columns categorical.
+
+    `pandas.concat` turns a categorical column into `object` when the categories of the frames differ, which is
+    almost always the case across pages. The categories are unioned instead.
+
+    :param frames: (List[pandas.DataFrame]) the DataFrames built by `records_to_frame`
+    :return: (pandas.DataFrame) the concatenated DataFrame, with a new RangeIndex
+    """
+    import pandas as pd
+    from pandas.api.types import union_categoricals
+
+    if not frames:
+        return pd.DataFrame()
+    categorical_columns = [column for column, dtype in frames[0].dtypes.items() if isinstance(dtype, pd.CategoricalDtype)]
+    result = pd.concat([frame.drop(columns=categorical_columns) for frame in frames], ignore_index=True)
+    for column in categorical_columns:
+        result[column] = union_categoricals([frame[column] for frame in frames], ignore_order=True)
+    return result[list(frames[0].columns)]
+
+
+__all__ = ['records_to_frame', 'concat_frames', 'COMMENT_DTYPES', 'VIDEO_DTYPES']
@@ -1,12 +1,18 @@
 import abc
+import asyncio
 import pathlib
+import functools
+import concurrent.futures
+from typing import Type, Union, List, Dict, Tuple
 
 from bs4 import BeautifulSoup
 from gembox.debug_utils import Debugger
-from gembox.io import ensure_pathlib_path
 
 from youcreep.common.pojo import VideoComment
+from youcreep.common.metrics import MetricsRecorder
 from .exception import FailedToLoadWebpageException
+from .parse_cache import ParseCache
+from .frame import records_to_frame, concat_frames
 from youcreep.browser_agent.url_parser import YoutubeUrlParser
 
 
@@ -17,10 +23,19 @@ class PageParser(abc.ABC):
     Page Parser is responsible for reading webpages from local files, and parsing the webpages to get the information.
 
     After `load_webpage`, you can always access the `soup` property to get the BeautifulSoup object.
+
+    With a `ParseCache`, `parse_files` and the `aparse_*` methods skip the snapshots parsed before.
     """
-    def __init__(self, debug_tool: Debugger = None, encoding="utf-8"):
+    schema_version: int = 1
+    """the version of the records returned by the parse methods, bump it whenever they change to invalidate `ParseCache`"""
+    record_cls: Type = None
+    """the class of the records returned by the parse method, which decides the dtypes of its DataFrame"""
+
+    def __init__(self, debug_tool: Debugger = None, encoding="utf-8", metrics: MetricsRecorder = None, cache: ParseCache = None):
         self._encoding = encoding
         self._debug_tool = debug_tool if debug_tool is not None else Debugger()
+        self._metrics = metrics if metrics is not None else MetricsRecorder()
+        self._cache = cache
         self._file_path = None
         self._soup = None
 
@@ -33,8 +48,9 @@ class PageParser(abc.ABC):
         """
         self.debug_tool.info(f"[{self.__class__.__name__}] Loading webpage from {file_path}...")
         try:
-            self._file_path = ensure_pathlib_path(file_path)
-            self._soup = self._read_webpage_from_file(file_path=file_path)
+            self._file_path = pathlib.Path(file_path)
+            with self.metrics.timer("load_webpage", parser=self.__class__.__name__):
+                self._soup = self._read_webpage_from_file(file_path=file_path)
             self.debug_tool.info(f"[{self.__class__.__name__}] Loaded webpage from {file_path} successfully")
         except Exception:
             self._soup = None
@@ -42,6 +58,71 @@ class PageParser(abc.ABC):
             self.debug_tool.error(f"[{self.__class__.__name__}] Failed to load webpage from {file_path}")
             raise FailedToLoadWebpageException(f"Failed to load webpage from {file_path}")
 
+    def parse_files(self, file_paths: List[Union[str, pathlib.Path]], parse_method: str) -> Dict[pathlib.Path, list]:
+        """
+        Load and parse the snapshots one by one, the unchanged ones are read from the `ParseCache` if any.
+
+        `self.file_path` and `self.soup` are left untouched.
+
+        :param file_paths: (List[str | pathlib.Path]) the snapshots, e.g. `sorted(save_dir.glob("*.html"))`
+        :param parse_method: (str) the name of the parse method, e.g. "parse_comments"
+        :return: (Dict[pathlib.Path, list]) {snapshot: records}
+        """
+        return {
+            pathlib.Path(file_path): load_and_parse(self.__class__, file_path, parse_method, encoding=self.encoding,
+                                                    debug_tool=self.debug_tool, metrics=self.metrics, cache=self.cache)
+            for file_path in file_paths
+        }
+
+    def parse_files_to_frame(self, file_paths: List[Union[str, pathlib.Path]], parse_method: str):
+        """
+        Load and parse the snapshots one by one into a single DataFrame, see `frame.concat_frames`.
+
+        Each page is converted to a compact DataFrame(see `frame.records_to_frame`) right after it is parsed, so the
+        records of all the pages are never held as Python objects at the same time.
+
+        :param file_paths: (List[str | pathlib.Path]) the snapshots
+        :param parse_method: (str) the name of the parse method, e.g. "parse_comments"
+        :return: (pandas.DataFrame) the records of all the snapshots
+        """
+        frames = [load_and_parse(self.__class__, file_path, parse_method, encoding=self.encoding, use_pandas=True,
+                                 debug_tool=self.debug_tool, metrics=self.metrics, cache=self.cache)
+                  for file_path in file_paths]
+        if not frames:
+            return records_to_frame([], self.record_cls)
+        return concat_frames(frames)
+
+    async def _aload_and_parse(self,
+                               file_path: (str, pathlib.Path),
+                               parse_method: str,
+                               use_pandas: bool = False,
+                               executor: concurrent.futures.Executor = None):
+        """
+        Load and parse a webpage in an executor, so that the event loop(e.g. the one driving `YoutubeAgent`) keeps running.
+
+        The work is done by a new parser of the same class, `self.file_path` and `self.soup` are left untouched, so
+        multiple calls can run concurrently. With a `ProcessPoolExecutor`, the parsing runs in parallel with the
+        crawling, but the logs of the worker process do not go to `self.debug_tool`.
+
+        :param file_path: (str, pathlib.Path) the path to the local file
+        :param parse_method: (str) the name of the parse method, e.g. "parse_comments"
+        :param use_pandas: (bool) whether to return a pandas.DataFrame
+        :param executor: (concurrent.futures.Executor) the executor, None for the default thread pool of the event loop
+        :return: the result of the parse method
+        """
+        in_process = isinstance(executor, concurrent.futures.ProcessPoolExecutor)
+        func = functools.partial(load_and_parse, self.__class__, file_path, parse_method, encoding=self.encoding,
+                                 use_pandas=use_pandas,
+                                 debug_tool=None if in_process else self.debug_tool,
+                                 metrics=None if in_process else self.metrics,
+                                 cache=self.cache,
+                                 allowed_hosts=YoutubeUrlParser.allowed_hosts if in_process else None)
+        with self.metrics.timer("aparse", parser=self.__class__.__name__, executor="process" if in_process else "thread"):
+            result = await asyncio.get_running_loop().run_in_executor(executor, func)
+        if in_process:
+            self.metrics.incr("records_parsed", len(result), parser=self.__class__.__name__)
+        return result
+
     def _read_webpage_from_file(self, file_path: (str, pathlib.Path)) -> BeautifulSoup:
         self.debug_tool.info(f"[{self.__class__.__name__}] Reading webpage from {file_path}...")
         with open(file_path, "r", encoding=self._encoding) as file:
@@ -53,10 +134,18 @@ class PageParser(abc.ABC):
     def debug_tool(self) -> Debugger:
         return self._debug_tool
 
+    @property
+    def metrics(self) -> MetricsRecorder:
+        return self._metrics
+
     @property
     def encoding(self) -> str:
         return self._encoding
 
+    @property
+    def cache(self) -> Union[ParseCache, None]:
+        return self._cache
+
     @property
     def file_path(self) -> pathlib.Path:
         return self._file_path
@@ -66,6 +155,53 @@ class PageParser(abc.ABC):
         return self._soup
 
 
+def load_and_parse(parser_cls: Type[PageParser],
+                   file_path: (str, pathlib.Path),
+                   parse_method: str,
+                   encoding: str = "utf-8",
+                   use_pandas: bool = False,
+                   debug_tool: Union[Debugger, None] = None,
+                   metrics: Union[MetricsRecorder, None] = None,
+                   cache: Union[ParseCache, None] = None,
+                   allowed_hosts: Tuple[str, ...] = None):
+    """
+    Load a webpage and parse it with a new parser, this is the picklable entry point run by executors.
+
+    With a `cache`, the records of an unchanged snapshot are read from the cache instead, and the records of a new or
+    changed one are written to it.
+
+    :param parser_cls: (Type[PageParser]) the parser class
+    :param file_path: (str, pathlib.Path) the path to the local file
+    :param parse_method: (str) the name of the parse method, e.g. "parse_comments"
+    :param encoding: (str) the encoding of the file
+    :param use_pandas: (bool) whether to return a pandas.DataFrame
+    :param debug_tool: (Debugger) the debugger, None for a new one
+    :param metrics: (MetricsRecorder) the metrics recorder, None for a new one
+    :param cache: (ParseCache) the parse cache, None for no cache
+    :param allowed_hosts: (Tuple[str, ...]) the `YoutubeUrlParser.allowed_hosts` of the calling process, which a
+        worker process does not inherit. None to keep the hosts of the current process
+    :return: the result of the parse method
+    """
+    if allowed_hosts is not None:
+        YoutubeUrlParser.allow_host(*allowed_hosts)
+    parser = parser_cls(debug_tool=debug_tool, encoding=encoding, metrics=metrics)
+    if cache is None:
+        parser.load_webpage(file_path)
+        return getattr(parser, parse_method)(use_pandas=use_pandas)
+
+    records = cache.get(parser_cls, file_path, parse_method)
+    parser.metrics.incr("parse_cache", result="miss" if records is None else "hit", parser=parser_cls.__name__)
+    if records is None:
+        parser.load_webpage(file_path)
+        records = getattr(parser, parse_method)()
+        cache.put(parser_cls, file_path, parse_method, records)
+    else:
+        parser.debug_tool.info(f"[{parser_cls.__name__}] Read {len(records)} records of {file_path} from the parse cache")
+    if use_pandas:
+        records = records_to_frame(records, parser_cls.record_cls)
+    return records
+
+
 def parse_comment_card(comment_card) -> VideoComment:
     is_reply = 'ytd-comment-replies-renderer' in comment_card.get('class', [])
 
@@ -0,0 +1,132 @@
+import os
+import enum
+import gzip
+import json
+import hashlib
+import pathlib
+from typing import List, Union, Type
+
+from youcreep.common import pojo
+
+
+class CacheValidation(enum.Enum):
+    """
+    How `ParseCache` decides whether a snapshot is unchanged since it was parsed.
+
+    - `STAT`: the size and the modification time of the file, no need to read the file
+    - `HASH`: the blake2b digest of the content, robust to copies and `touch`, but the file is read
+    """
+    STAT = "stat"
+    HASH = "hash"
+
+
+class ParseCache:
+    """
+    An on-disk cache of parsed records, so that re-parsing a `save_dir` only parses the new or changed snapshots.
+
+    An entry is keyed by the parser class, the parse method and the snapshot path, and is valid as long as the snapshot
+    is unchanged(see `CacheValidation`) and the `schema_version` of the parser is the same. Bump the `schema_version`
+    of a parser whenever its records change(e.g. a field is added or a bug is fixed), to invalidate its entries.
+
+    Records are stored column-wise(field names once, a list of values per field) in gzipped JSON, which is several
+    times smaller than the snapshot and much faster to load than re-parsing the HTML.
+    """
+    def __init__(self, cache_dir: Union[str, pathlib.Path], validation: CacheValidation = CacheValidation.STAT):
+        """
+        :param cache_dir: (str, pathlib.Path) the directory of the cache
+        :param validation: (CacheValidation) how to detect the changed snapshots
+        """
+        self._cache_dir = pathlib.Path(cache_dir)
+        self._validation = validation
+
+    def get(self, parser_cls: Type, file_path: Union[str, pathlib.Path], parse_method: str) -> Union[List, None]:
+        """
+        Get the cached records of a snapshot.
+
+        :param parser_cls: (Type[PageParser]) the parser class
+        :param file_path: (str, pathlib.Path) the snapshot
+        :param parse_method: (str) the name of the parse method, e.g. "parse_comments"
+        :return: (List | None) the records, None if there is no valid entry
+        """
+        entry_path = self._entry_path(parser_cls, file_path, parse_method)
+        if not entry_path.exists():
+            return None
+        try:
+            with gzip.open(entry_path, "rt", encoding="utf-8") as f:
+                entry = json.load(f)
+        except (OSError, ValueError):
+            # e.g. truncated by a crash, it is overwritten by the next `put`
+            return None
+        if entry["schema_version"] != parser_cls.schema_version or entry["key"] != self._snapshot_key(file_path):
+            return None
+        if entry["n_records"] == 0:
+            return []
+        record_cls = getattr(pojo, entry["record_type"])
+        fields = entry["fields"]
+        return [record_cls.from_dict(dict(zip(fields, values))) for values in zip(*entry["columns"])]
+
+    def put(self, parser_cls: Type, file_path: Union[str, pathlib.Path], parse_method: str, records: List) -> pathlib.Path:
+        """
+        Cache the records parsed from a snapshot.
+
+        :param parser_cls: (Type[PageParser]) the parser class
+        :param file_path: (str, pathlib.Path) the snapshot
+        :param parse_method: (str) the name of the parse method
+        :param records: (List) the records, e.g. `List[VideoComment]`
+        :return: (pathlib.Path) the entry path
+        """
+        dicts = [record.to_dict() for record in records]
+        fields = list(dicts[0].keys()) if dicts else []
+        entry = {
+            "schema_version": parser_cls.schema_version,
+            "key": self._snapshot_key(file_path),
+            "record_type": type(records[0]).__name__ if records else None,
+            "n_records": len(dicts),
+            "fields": fields,
+            "columns": [[record_dict[field] for record_dict in dicts] for field in fields],
+        }
+        entry_path = self._entry_path(parser_cls, file_path, parse_method)
+        entry_path.parent.mkdir(parents=True, exist_ok=True)
+        # write to a temp file then rename, so that a crash never leaves a partial entry
+        tmp_path = entry_path.with_name(f".{entry_path.name}.tmp")
+        with gzip.open(tmp_path, "wt", encoding="utf-8", compresslevel=6) as f:
+            json.dump(entry, f, ensure_ascii=False, separators=(",", ":"))
+        os.replace(tmp_path, entry_path)
+        return entry_path
+
+    def clear(self) -> int:
+        """
+        Remove all the entries.
+
+        :return: (int) the number of removed entries
+        """
+        n_removed = 0
+        for entry_path in self._cache_dir.glob("*/*.json.gz"):
+            entry_path.unlink()
+            n_removed += 1
+        return n_removed
+
+    def _entry_path(self, parser_cls: Type, file_path: Union[str, pathlib.Path], parse_method: str) -> pathlib.Path:
+        path_digest = hashlib.blake2b(str(pathlib.Path(file_path).resolve()).encode("utf-8"), digest_size=16).hexdigest()
+        return self._cache_dir / f"{parser_cls.__name__}.{parse_method}" / f"{path_digest}.json.gz"
+
+    def _snapshot_key(self, file_path: Union[str, pathlib.Path]) -> str:
+        if self._validation == CacheValidation.HASH:
+            digest = hashlib.blake2b(digest_size=16)
+            with open(file_path, "rb") as f:
+                for chunk in iter(lambda: f.read(1 << 20), b""):
+                    digest.update(chunk)
+            return digest.hexdigest()
+        stat = os.stat(file_path)
+        return f"{stat.st_size}:{stat.st_mtime_ns}"
+
+    @property
+    def cache_dir(self) -> pathlib.Path:
+        return self._cache_dir
+
+    @property
+    def validation(self) -> CacheValidation:
+        return self._validation
+
+
+__all__ = ['ParseCache', 'CacheValidation']
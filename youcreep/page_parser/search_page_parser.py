@@ -1,15 +1,19 @@
-import pandas as pd
+import pathlib
+import concurrent.futures
 from typing import List
 
 from gembox.re_utils import search_comma_sep_num
 
 from youcreep.common.pojo import VideoInfo
 from youcreep.page_parser.page_parser import PageParser
+from youcreep.page_parser.frame import records_to_frame
 from youcreep.common.selectors.search_result_page import video_card_sel
 from youcreep.browser_agent.url_parser import YoutubeUrlParser, YouTubeUrlType
 
 
 class SearchPageParser(PageParser):
+    record_cls = VideoInfo
+
     def parse_videos(self, use_pandas: bool = False) -> List[VideoInfo]:
         """
         Parse all videos' info in the YouTube search Page.
@@ -19,14 +23,32 @@ class SearchPageParser(PageParser):
         """
         assert self.file_path is not None and self.soup is not None, "Please load webpage first"
         self.debug_tool.info(f"[{self.__class__.__name__}] Parsing videos in {self.file_path}...")
-        video_cards = self.soup.find_all(video_card_sel)
-        videos = [parse_video_card(video_card) for video_card in video_cards]
+        with self.metrics.timer("parse", parser=self.__class__.__name__):
+            video_cards = self.soup.find_all(video_card_sel)
+            videos = [parse_video_card(video_card) for video_card in video_cards]
+        self.metrics.incr("records_parsed", len(videos), parser=self.__class__.__name__)
         self.debug_tool.info(f"[{self.__class__.__name__}] Parsed {len(videos)} videos")
         if use_pandas:
-            self.debug_tool.info(f"[{self.__class__.__name__}] Converting comments to pandas.DataFrame...")
-            videos = pd.DataFrame([comment.to_dict() for comment in videos])
+            self.debug_tool.info(f"[{self.__class__.__name__}] Converting videos to pandas.DataFrame...")
+            videos = records_to_frame(videos, self.record_cls)
         return videos
 
+    async def aparse_videos(self,
+                            file_path: (str, pathlib.Path),
+                            use_pandas: bool = False,
+                            executor: concurrent.futures.Executor = None) -> List[VideoInfo]:
+        """
+        Load and parse videos of a webpage in an executor, without blocking the event loop.
+
+        e.g. `videos = await parser.aparse_videos(path)` while the crawler keeps scrolling the next page.
+
+        :param file_path: (str, pathlib.Path) the path to the local file
+        :param use_pandas: (bool) whether to return a pandas.DataFrame
+        :param executor: (concurrent.futures.Executor) a thread or process pool, None for the default thread pool
+        :return: (List[VideoInfo]) the list of videos
+        """
+        return await self._aload_and_parse(file_path, "parse_videos", use_pandas=use_pandas, executor=executor)
+
 
 def parse_video_card(video_card) -> VideoInfo:
     data_dict = {}
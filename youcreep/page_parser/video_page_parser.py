@@ -1,13 +1,19 @@
-import pandas as pd
+import pathlib
+import concurrent.futures
 from typing import List
 
+from bs4 import BeautifulSoup
+
 from youcreep.common.pojo import VideoComment
 from youcreep.page_parser.page_parser import PageParser
+from youcreep.page_parser.frame import records_to_frame
 from youcreep.browser_agent.url_parser import YoutubeUrlParser
 from youcreep.common.selectors.common_sels import comment_card_sel
 
 
 class VideoPageParser(PageParser):
+    record_cls = VideoComment
+
     def parse_comments(self, use_pandas: bool = False) -> List[VideoComment]:
         """
         Parse all comments in the YouTube video Page.
@@ -18,14 +24,45 @@ class VideoPageParser(PageParser):
         assert self.file_path is not None and self.soup is not None, "Please load webpage first"
         self.debug_tool.info(f"[{self.__class__.__name__}] Parsing comments in {self.file_path}...")
         # 查找所有的 ytd-comment-renderer 标签
-        comment_renderers = self.soup.find_all(comment_card_sel)
-        comments = [parse_comment_card(comment_card) for comment_card in comment_renderers]
+        with self.metrics.timer("parse", parser=self.__class__.__name__):
+            comment_renderers = self.soup.find_all(comment_card_sel)
+            comments = [parse_comment_card(comment_card) for comment_card in comment_renderers]
+        self.metrics.incr("records_parsed", len(comments), parser=self.__class__.__name__)
         self.debug_tool.info(f"[{self.__class__.__name__}] Parsed {len(comments)} comments")
         if use_pandas:
             self.debug_tool.info(f"[{self.__class__.__name__}] Converting comments to pandas.DataFrame...")
-            comments = pd.DataFrame([comment.to_dict() for comment in comments])
+            comments = records_to_frame(comments, self.record_cls)
         return comments
 
+    async def aparse_comments(self,
+                              file_path: (str, pathlib.Path),
+                              use_pandas: bool = False,
+                              executor: concurrent.futures.Executor = None) -> List[VideoComment]:
+        """
+        Load and parse comments of a webpage in an executor, without blocking the event loop.
+
+        e.g. `comments = await parser.aparse_comments(path)` while the crawler keeps scrolling the next page.
+
+        :param file_path: (str, pathlib.Path) the path to the local file
+        :param use_pandas: (bool) whether to return a pandas.DataFrame
+        :param executor: (concurrent.futures.Executor) a thread or process pool, None for the default thread pool
+        :return: (List[VideoComment]) the list of comments
+        """
+        return await self._aload_and_parse(file_path, "parse_comments", use_pandas=use_pandas, executor=executor)
+
+
+def parse_comment_cards_html(htmls: List[str]) -> List[VideoComment]:
+    """
+    Parse comment cards from their outerHTML, e.g. the cards streamed while scrolling.
+
+    :param htmls: (List[str]) the outerHTML of `ytd-comment-renderer` elements
+    :return: (List[VideoComment]) the comments
+    """
+    if not htmls:
+        return []
+    soup = BeautifulSoup("".join(htmls), 'lxml')
+    return [parse_comment_card(comment_card) for comment_card in soup.find_all(comment_card_sel)]
+
 
 def parse_comment_card(comment_card) -> VideoComment:
     is_reply = 'ytd-comment-replies-renderer' in comment_card.get('class', [])